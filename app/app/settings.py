@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import json
 import os
 from pathlib import Path
 
@@ -34,6 +35,33 @@ CSRF_TRUSTED_ORIGINS = (
 ).split(";")
 
 LOG_BATCH_SIZE = int(os.environ.get("LOG_BATCH_SIZE") or "200")
+# Bounds and the target storing time of one batch for `import --batch-size auto`
+LOG_BATCH_SIZE_MIN = int(os.environ.get("LOG_BATCH_SIZE_MIN") or "10")
+LOG_BATCH_SIZE_MAX = int(os.environ.get("LOG_BATCH_SIZE_MAX") or "20000")
+LOG_BATCH_TARGET_LATENCY = float(os.environ.get("LOG_BATCH_TARGET_LATENCY") or "0.5")
+# The bearer token of `POST /api/v1/logs/ingest`, the endpoint is disabled without it
+LOG_INGEST_TOKEN = os.environ.get("LOG_INGEST_TOKEN") or ""
+# The maximum size of one ingested (decompressed) request body and of one log line in bytes
+LOG_INGEST_MAX_SIZE = int(os.environ.get("LOG_INGEST_MAX_SIZE") or "268435456")
+LOG_INGEST_MAX_LINE_SIZE = int(os.environ.get("LOG_INGEST_MAX_LINE_SIZE") or "65536")
+# Maps the columns of log records to the keys of JSON log lines and the converters of their values
+# (see nginx_logs.utils.field_mapping). A JSON object in LOG_FIELD_MAPPING replaces some of them,
+# e.g. {"date": ["time_iso8601", "time_iso8601"], "host": null}
+LOG_FIELD_MAPPING = {
+    "ip": ("remote_ip", "raw"),
+    "date": ("time", "time_local"),
+    "request": ("request", "request_line"),
+    "status": ("response", "http_status"),
+    "bytes_sent": ("bytes", "raw"),
+    "request_time": ("request_time", "float"),
+    "upstream_response_time": ("upstream_response_time", "seconds"),
+    "user_agent": ("http_user_agent", "str"),
+    "referer": ("http_referer", "str"),
+    "host": ("host", "str"),
+}
+LOG_FIELD_MAPPING.update(json.loads(os.environ.get("LOG_FIELD_MAPPING") or "{}"))
+# The period of one partition of the log records table, `day` or `month` (see `log_partitions` command)
+LOG_PARTITION_INTERVAL = os.environ.get("LOG_PARTITION_INTERVAL") or "month"
 
 
 # Application definition
@@ -45,6 +73,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "django_filters",
     "drf_spectacular",
@@ -1,4 +1,14 @@
+from .adaptive_batch_size import AdaptiveBatchSize
 from .batch_model_writer import BatchModelWriter
+from .copy_model_writer import CopyModelWriter
+from .latency_histogram import LatencyHistogram
+from .pipelined_model_writer import PipelinedModelWriter
 
 
-__all__ = ["BatchModelWriter"]
+__all__ = [
+    "AdaptiveBatchSize",
+    "BatchModelWriter",
+    "CopyModelWriter",
+    "LatencyHistogram",
+    "PipelinedModelWriter",
+]
@@ -0,0 +1,83 @@
+class AdaptiveBatchSize:
+    """The batch size adjusted after each stored batch to store batches in the target time.
+
+    The storing time of one record is smoothed over the batches, and the next batch size is the number
+    of records stored in `target_latency` at that rate. The size changes at most twice per batch and
+    stays within the bounds. Batches smaller than `min_size` (e.g. flushed on idle) aren't measured,
+    as the fixed cost of a query dominates their time.
+
+    An instance keeps the measurements, so it must be used by one writer at a time.
+    A writer given it instead of a fixed batch size starts with its current size.
+
+    Args:
+        initial_size (int): The size of the first batch.
+        min_size (int): The minimal batch size.
+        max_size (int): The maximal batch size.
+        target_latency (float): The target time of storing one batch in seconds.
+        smoothing (float): The weight of the latest measurement, from 0 to 1.
+    """
+
+    def __init__(
+        self,
+        initial_size: int,
+        min_size: int = 10,
+        max_size: int = 10000,
+        target_latency: float = 0.5,
+        smoothing: float = 0.3,
+    ) -> None:
+        if not 0 < min_size <= max_size:
+            raise ValueError("Batch size bounds must be positive and ordered")
+        self.__min_size = min_size
+        self.__max_size = max_size
+        self.__target_latency = target_latency
+        self.__smoothing = smoothing
+        self.__size = self.__bounded(initial_size)
+        self.__record_time: float | None = None
+
+    @property
+    def size(self) -> int:
+        """int: Returns the size of the next batch."""
+        return self.__size
+
+    @property
+    def min_size(self) -> int:
+        """int: Returns the minimal batch size."""
+        return self.__min_size
+
+    @property
+    def max_size(self) -> int:
+        """int: Returns the maximal batch size."""
+        return self.__max_size
+
+    @property
+    def target_latency(self) -> float:
+        """float: Returns the target time of storing one batch in seconds."""
+        return self.__target_latency
+
+    def update(self, records_count: int, elapsed: float) -> int:
+        """Adjust the batch size to the storing time of a batch.
+
+        Args:
+            records_count (int): The number of the stored records.
+            elapsed (float): The storing time in seconds.
+
+        Returns:
+            The size of the next batch.
+        """
+        if records_count < self.__min_size:
+            return self.__size
+
+        record_time = max(elapsed, 1e-9) / records_count
+        if self.__record_time is None:
+            self.__record_time = record_time
+        else:
+            self.__record_time += self.__smoothing * (record_time - self.__record_time)
+
+        size = self.__target_latency / self.__record_time
+        size = min(max(size, self.__size / 2), self.__size * 2)
+        self.__size = self.__bounded(size)
+        return self.__size
+
+    def __bounded(self, size: float) -> int:
+        """Round the size and put it within the bounds."""
+        return min(max(round(size), self.__min_size), self.__max_size)
@@ -1,44 +1,138 @@
-from typing import Generic, TypeVar
+import time
+from collections.abc import Callable, Sequence
+from typing import Any, Generic, TypeVar
 
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, router, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import Field
 from django.db.models import Model as DjangoModel
+from django.db.models.constants import OnConflict
+
+from .adaptive_batch_size import AdaptiveBatchSize
+from .latency_histogram import LatencyHistogram
 
 
 SomeModel = TypeVar("SomeModel", bound=DjangoModel)
 
+# Only the latest incomplete batches are kept in stats, so long-running imports use constant memory
+MAX_INCOMPLETE_BATCHES = 1000
+# The same for the batch size changes
+MAX_BATCH_SIZE_CHANGES = 1000
+
 
 class BatchModelWriter(Generic[SomeModel]):
     """Collects models to store them into DB in one bulk operation.
 
+    If `fields` are given, the writer collects tuples of these fields values instead of
+    model instances and inserts them without making models. The omitted nullable fields
+    are left NULL by DB. Model instances are still made on storing if the model needs them
+    to fill the fields (defaults of the omitted fields or `auto_now`).
+
+    If `ignore_conflicts` is set, records violating unique constraints are not stored
+    (`ON CONFLICT DO NOTHING`) and they are counted as duplicates.
+
+    If `batch_size` is an `AdaptiveBatchSize`, the storing time of each batch is measured
+    and the size of the next batches is adjusted to it.
+
+    The storing times of the batches are collected in the `flush_latency` histogram anyway.
+
     Args:
         model_class (type(Model)): The model class reference.
-        batch_size (int): A size of one batch.
+        batch_size (int | AdaptiveBatchSize): A size of one batch or the adaptive batch size.
+        on_flushed (Callable | None): A function called with a batch number and
+            a stored records count after each batch is stored.
+        fields (Sequence[str] | None): Names of the fields in the order of the row values.
+        ignore_conflicts (bool): Skip the records violating unique constraints.
     """
 
-    def __init__(self, model_class: type[SomeModel], batch_size: int) -> None:
+    def __init__(
+        self,
+        model_class: type[SomeModel],
+        batch_size: int | AdaptiveBatchSize,
+        on_flushed: Callable[[int, int], None] | None = None,
+        fields: Sequence[str] | None = None,
+        ignore_conflicts: bool = False,
+    ) -> None:
         self.__model_class = model_class
-        self.__batch_size = batch_size
+        if isinstance(batch_size, AdaptiveBatchSize):
+            self.__batch_sizer: AdaptiveBatchSize | None = batch_size
+            self.__batch_size = batch_size.size
+        else:
+            self.__batch_sizer = None
+            self.__batch_size = batch_size
+        self.__on_flushed = on_flushed
+        self.__field_names = None if fields is None else tuple(fields)
+        self.__fields = (
+            None
+            if fields is None
+            else [_row_field(model_class, name) for name in fields]
+        )
+        self.__rows_need_models = self.__fields is not None and _rows_need_models(
+            model_class, self.__fields
+        )
+        self.__ignore_conflicts = ignore_conflicts
         self.__batch_number = 0
         self.__total_models = 0
+        self.__duplicates = 0
         self.__incomplete_batches: dict[int, int] = {}
+        self.__flush_latency = LatencyHistogram()
         self.__new_batch()
+        self.__batch_sizes = {self.__batch_number: self.__batch_size}
 
     def __new_batch(self) -> None:
         """Initialize a new batch"""
-        self.__records: list[SomeModel] = []
+        self.__records: list[Any] = []
         self.__batch_items_count = 0
         self.__batch_number += 1
 
+    @property
+    def model_class(self) -> type[SomeModel]:
+        """type(Model): Returns the model class reference."""
+        return self.__model_class
+
+    @property
+    def fields(self) -> list[Field] | None:
+        """list(Field) | None: Returns the fields of the row values or None if models are collected."""
+        return self.__fields
+
+    @property
+    def ignore_conflicts(self) -> bool:
+        """bool: Returns whether the records violating unique constraints are skipped."""
+        return self.__ignore_conflicts
+
+    @property
+    def batch_size(self) -> int:
+        """int: Returns a size of the current batch."""
+        return self.__batch_size
+
+    @property
+    def batch_sizer(self) -> AdaptiveBatchSize | None:
+        """AdaptiveBatchSize | None: Returns the adaptive batch size or None if the size is fixed."""
+        return self.__batch_sizer
+
+    @property
+    def flush_latency(self) -> LatencyHistogram:
+        """LatencyHistogram: Returns the histogram of the batch storing times."""
+        return self.__flush_latency
+
     @property
     def current_batch_number(self) -> int:
         """int: Returns a number of a current batch."""
         return self.__batch_number
 
-    def add(self, record: SomeModel) -> int:
-        """Adds a new model instance to a current batch.
+    def add(
+        self,
+        record: SomeModel | tuple,
+        commit_action: Callable[[], None] | None = None,
+    ) -> int:
+        """Adds a new model instance (or a row of field values) to a current batch.
         If the batch size exceeds it automatically flushes to DB and the new batch starts.
 
         Args:
-            record (Model): model instance
+            record (Model | tuple): model instance or a tuple of `fields` values
+            commit_action (Callable | None): A function called in the DB transaction storing
+                the batch if this record completes it.
 
         Returns:
             Stored records count if the batch flushes or 0 otherwise.
@@ -48,28 +142,269 @@ class BatchModelWriter(Generic[SomeModel]):
         self.__total_models += 1
 
         if self.__batch_items_count >= self.__batch_size:
-            return self.flush()
+            return self.__flush_batch(commit_action)
         return 0
 
-    def flush(self) -> int:
+    def flush(self, commit_action: Callable[[], None] | None = None) -> int:
         """Store a rest of model instances into DB.
 
+        Args:
+            commit_action (Callable | None): A function called in the DB transaction storing
+                the batch, it's called even if the batch is empty.
+
         Returns:
             A number of stored records.
         """
+        return self.__flush_batch(commit_action)
+
+    def __flush_batch(self, commit_action: Callable[[], None] | None) -> int:
+        """Store the current batch and start a new one."""
         records_count = self.__batch_items_count
+        if records_count == 0 and commit_action is not None:
+            self._store_batch([], commit_action)
         if records_count > 0:
-            self.__model_class.objects.bulk_create(self.__records)  # type: ignore
+            started = time.perf_counter()
+            self.__duplicates += self._store_batch(self.__records, commit_action)
+            elapsed = time.perf_counter() - started
             if records_count < self.__batch_size:
                 self.__incomplete_batches[self.current_batch_number] = records_count
+                if len(self.__incomplete_batches) > MAX_INCOMPLETE_BATCHES:
+                    del self.__incomplete_batches[next(iter(self.__incomplete_batches))]
             self.__new_batch()
+            self._batch_stored(records_count, elapsed)
+            if self.__on_flushed is not None:
+                self.__on_flushed(self.current_batch_number - 1, records_count)
         # Return how many records were stored into DB
         return records_count
 
+    def is_incomplete_batch(self, batch_number: int) -> bool:
+        """Check whether a stored batch is smaller than the batch size was.
+
+        Args:
+            batch_number (int): The batch number, only the latest incomplete batches are remembered.
+
+        Returns:
+            True if the batch is incomplete.
+        """
+        return batch_number in self.__incomplete_batches
+
+    def close(self) -> None:
+        """Release the resources used for storing. Nothing to do for synchronous writers."""
+
+    def _batch_stored(self, records_count: int, elapsed: float) -> None:
+        """Measure the storing time of a batch and adjust the size of the next batches to it if it's adaptive.
+
+        Args:
+            records_count (int): The number of the stored records.
+            elapsed (float): The storing time in seconds.
+        """
+        self.__flush_latency.add(elapsed)
+        if self.__batch_sizer is None:
+            return
+        batch_size = self.__batch_sizer.update(records_count, elapsed)
+        if batch_size != self.__batch_size:
+            self.__batch_size = batch_size
+            self.__batch_sizes[self.__batch_number] = batch_size
+            if len(self.__batch_sizes) > MAX_BATCH_SIZE_CHANGES:
+                del self.__batch_sizes[next(iter(self.__batch_sizes))]
+
+    def _store_batch(
+        self, records: list[Any], commit_action: Callable[[], None] | None
+    ) -> int:
+        """Store a batch and run the commit action in the same DB transaction.
+
+        Args:
+            records (list[Model | tuple]): model instances or rows of field values
+            commit_action (Callable | None): A function to call in the transaction.
+
+        Returns:
+            The number of records skipped as duplicates.
+        """
+        # Writers returning nothing don't skip records
+        if commit_action is None:
+            return self._write_batch(records) or 0
+        duplicates = 0
+        with transaction.atomic(using=router.db_for_write(self.__model_class)):
+            if records:
+                duplicates = self._write_batch(records) or 0
+            commit_action()
+        return duplicates
+
+    def _write_batch(self, records: list[Any]) -> int:
+        """Store a batch of model instances or rows into DB.
+
+        Args:
+            records (list[Model | tuple]): model instances or rows of field values
+
+        Returns:
+            The number of records skipped as duplicates.
+        """
+        if self.__ignore_conflicts or (
+            self.__fields is not None and not self.__rows_need_models
+        ):
+            # bulk_create doesn't tell how many records are skipped
+            return len(records) - self.__insert_rows(records)
+        self.__model_class.objects.bulk_create(self._as_models(records))  # type: ignore
+        return 0
+
+    def _as_models(self, records: list[Any]) -> list[SomeModel]:
+        """Make model instances of rows if the writer collects rows.
+
+        Args:
+            records (list[Model | tuple]): model instances or rows of field values
+
+        Returns:
+            A list of model instances.
+        """
+        if self.__field_names is None:
+            return records
+        names = self.__field_names
+        return [self.__model_class(**dict(zip(names, row))) for row in records]
+
+    def _prepared_rows(
+        self, records: list[Any], connection: BaseDatabaseWrapper
+    ) -> tuple[list[Field], list[list[Any]]]:
+        """Prepare values of a batch for a DB query.
+
+        Args:
+            records (list[Model | tuple]): model instances or rows of field values
+            connection (BaseDatabaseWrapper): DB connection
+
+        Returns:
+            The stored fields and a list of rows of values prepared for DB.
+        """
+        if self.__fields is not None and not self.__rows_need_models:
+            fields = self.__fields
+            prepare = [field.get_db_prep_save for field in fields]
+            return fields, [
+                [
+                    prepare_value(value, connection)
+                    for prepare_value, value in zip(prepare, row)
+                ]
+                for row in records
+            ]
+
+        fields = _stored_fields(self.__model_class)
+        return fields, [
+            [
+                field.get_db_prep_save(field.pre_save(model, True), connection)
+                for field in fields
+            ]
+            for model in self._as_models(records)
+        ]
+
+    def __insert_rows(self, records: list[Any]) -> int:
+        """Insert records with multi-row INSERT statements, rows are inserted without making
+        model instances.
+
+        Args:
+            records (list[Model | tuple]): model instances or rows of field values
+
+        Returns:
+            The number of inserted rows.
+        """
+        connection = connections[router.db_for_write(self.__model_class)]
+        fields, values = self._prepared_rows(records, connection)
+        quote_name = connection.ops.quote_name
+        on_conflict = OnConflict.IGNORE if self.__ignore_conflicts else None
+        insert_sql = "{} {} ({}) VALUES ".format(
+            connection.ops.insert_statement(on_conflict=on_conflict),
+            quote_name(self.__model_class._meta.db_table),
+            ", ".join(quote_name(field.column) for field in fields),
+        )
+        # "ON CONFLICT DO NOTHING" on PostgreSQL, "INSERT OR IGNORE" on SQLite
+        suffix_sql = connection.ops.on_conflict_suffix_sql(
+            fields, on_conflict, None, None
+        )
+        row_placeholder = "(" + ", ".join(["%s"] * len(fields)) + ")"
+        max_rows = max(connection.ops.bulk_batch_size(fields, values), 1)
+
+        inserted = 0
+        with transaction.atomic(
+            using=connection.alias, savepoint=False
+        ), connection.cursor() as cursor:
+            for start in range(0, len(values), max_rows):
+                chunk = values[start : start + max_rows]
+                cursor.execute(
+                    insert_sql
+                    + ", ".join([row_placeholder] * len(chunk))
+                    + (" " + suffix_sql if suffix_sql else ""),
+                    [value for row in chunk for value in row],
+                )
+                inserted += cursor.rowcount if on_conflict else len(chunk)
+        return inserted
+
     @property
     def stats(self):
-        """Returns a number of a current batch."""
+        """Returns the numbers of stored records and duplicates, the incomplete batches
+        and the batch sizes by the numbers of the batches they are set from."""
         return {
             "total": self.__total_models,
             "incomplete_batches": self.__incomplete_batches.copy(),
+            "duplicates": self.__duplicates,
+            "batch_sizes": self.__batch_sizes.copy(),
         }
+
+
+def _stored_fields(model_class: type[DjangoModel]) -> list[Field]:
+    """Get the fields stored on insert, i.e. all the concrete fields except the auto primary key.
+
+    Args:
+        model_class (type(Model)): The model class reference.
+
+    Returns:
+        A list of fields.
+    """
+    return [
+        field
+        for field in model_class._meta.fields
+        if field.concrete and not (field.primary_key and field.auto_created)
+    ]
+
+
+def _row_field(model_class: type[DjangoModel], name: str) -> Field:
+    """Get a field of the row values by its name.
+
+    Args:
+        model_class (type(Model)): The model class reference.
+        name (str): The field name.
+
+    Returns:
+        The field.
+
+    Raises:
+        ValueError: If the field isn't stored in the table of the model, e.g. it's a reverse relation.
+    """
+    field = model_class._meta.get_field(name)
+    if not isinstance(field, Field) or not field.concrete:
+        raise ValueError(f"{model_class.__name__}.{name} isn't a stored field")
+    return field
+
+
+def _rows_need_models(model_class: type[DjangoModel], fields: list[Field]) -> bool:
+    """Check whether model instances must be made of rows to fill the stored fields.
+
+    Args:
+        model_class (type(Model)): The model class reference.
+        fields (list[Field]): The fields of the row values.
+
+    Returns:
+        True if a field is filled by Python (a default of an omitted field or `auto_now`).
+
+    Raises:
+        ImproperlyConfigured: If an omitted field cannot be NULL and has no default.
+    """
+    need_models = False
+    for field in _stored_fields(model_class):
+        filled_on_save = getattr(field, "auto_now", False) or getattr(
+            field, "auto_now_add", False
+        )
+        if field in fields:
+            need_models = need_models or filled_on_save
+        elif field.has_default() or filled_on_save:
+            need_models = True
+        elif not field.null:
+            raise ImproperlyConfigured(
+                f"{model_class.__name__}.{field.name} isn't nullable, it must be in the row fields"
+            )
+    return need_models
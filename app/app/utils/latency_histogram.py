@@ -0,0 +1,82 @@
+import bisect
+from typing import Any
+
+
+# The upper bounds of the histogram buckets in seconds, the last bucket is unbounded
+LATENCY_BUCKETS = (
+    0.001,
+    0.002,
+    0.005,
+    0.01,
+    0.02,
+    0.05,
+    0.1,
+    0.2,
+    0.5,
+    1.0,
+    2.0,
+    5.0,
+    10.0,
+)
+
+
+def _bucket_name(bound: float) -> str:
+    """Name a bucket by its upper bound, e.g. `<=5ms` or `<=2s`."""
+    if bound < 1:
+        return f"<={bound * 1000:g}ms"
+    return f"<={bound:g}s"
+
+
+class LatencyHistogram:
+    """A histogram of latencies with fixed bucket bounds, it takes constant memory.
+
+    Args:
+        buckets (tuple[float, ...]): The ascending upper bounds of the buckets in seconds.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.__bounds = buckets
+        self.__counts = [0] * (len(buckets) + 1)
+        self.__count = 0
+        self.__total = 0.0
+        self.__max = 0.0
+
+    @property
+    def count(self) -> int:
+        """int: Returns the number of measurements."""
+        return self.__count
+
+    @property
+    def total(self) -> float:
+        """float: Returns the sum of the measurements in seconds."""
+        return self.__total
+
+    def add(self, seconds: float) -> None:
+        """Add a measurement.
+
+        Args:
+            seconds (float): The latency in seconds.
+        """
+        self.__counts[bisect.bisect_left(self.__bounds, seconds)] += 1
+        self.__count += 1
+        self.__total += seconds
+        if seconds > self.__max:
+            self.__max = seconds
+
+    def as_dict(self) -> dict[str, Any]:
+        """Summarize the histogram.
+
+        Returns:
+            A dictionary containing the number of measurements, the mean and maximal latencies
+            in seconds, and the counts of the non-empty buckets named by their upper bounds.
+        """
+        names = [_bucket_name(bound) for bound in self.__bounds]
+        names.append(f">{self.__bounds[-1]:g}s")
+        return {
+            "count": self.__count,
+            "mean": self.__total / self.__count if self.__count else 0.0,
+            "max": self.__max,
+            "buckets": {
+                name: count for name, count in zip(names, self.__counts) if count
+            },
+        }
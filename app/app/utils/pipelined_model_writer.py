@@ -0,0 +1,215 @@
+import queue
+import threading
+import time
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from django.db import connections
+
+from .adaptive_batch_size import AdaptiveBatchSize
+from .batch_model_writer import BatchModelWriter, SomeModel
+
+
+class PipelinedModelWriter(BatchModelWriter[SomeModel]):
+    """Collects models to store them into DB by background threads.
+
+    Full batches are passed to the writer threads through a bounded queue, so the caller
+    keeps preparing the next batch while the previous ones are being stored, and `add` blocks
+    when the threads fall behind. Every writer thread uses its own DB connection.
+    `on_flushed` is still called from the caller's thread and in the batch order,
+    `flush` waits until all the queued batches and commit actions are stored.
+    The adaptive batch size is adjusted to the storing time measured by the writer threads.
+
+    Args:
+        model_class (type(Model)): The model class reference.
+        batch_size (int | AdaptiveBatchSize): A size of one batch or the adaptive batch size.
+        on_flushed (Callable | None): A function called with a batch number and
+            a stored records count after each batch is stored.
+        threads (int): The number of writer threads.
+        queue_size (int): The number of full batches waiting for a free writer thread.
+        writer_class (type(BatchModelWriter)): The writer class used to store batches.
+        fields (Sequence[str] | None): Names of the fields in the order of the row values.
+        ignore_conflicts (bool): Skip the records violating unique constraints.
+    """
+
+    def __init__(
+        self,
+        model_class: type[SomeModel],
+        batch_size: int | AdaptiveBatchSize,
+        on_flushed: Callable[[int, int], None] | None = None,
+        threads: int = 1,
+        queue_size: int = 2,
+        writer_class: type[BatchModelWriter] = BatchModelWriter,
+        fields: Sequence[str] | None = None,
+        ignore_conflicts: bool = False,
+    ) -> None:
+        super().__init__(
+            model_class, batch_size, fields=fields, ignore_conflicts=ignore_conflicts
+        )
+        self.__on_flushed = on_flushed
+        self.__storage = writer_class(
+            model_class,
+            self.batch_size,
+            fields=fields,
+            ignore_conflicts=ignore_conflicts,
+        )
+        self.__threads_count = threads
+        self.__threads: list[threading.Thread] = []
+        self.__tasks: queue.Queue[
+            tuple[int | None, list[Any], Callable[[], None] | None] | None
+        ] = queue.Queue(queue_size)
+        self.__results: queue.SimpleQueue[
+            tuple[int | None, int, int, float, Exception | None]
+        ] = queue.SimpleQueue()
+        self.__stored_batches: dict[int, int] = {}
+        self.__duplicates = 0
+        self.__queued_batch_number = 0
+        self.__reported_batch_number = 0
+        self.__queued_actions = 0
+
+    def add(
+        self,
+        record: SomeModel | tuple,
+        commit_action: Callable[[], None] | None = None,
+    ) -> int:
+        """Adds a new model instance (or a row of field values) to a current batch.
+        If the batch size exceeds it is queued for storing and the new batch starts.
+
+        Args:
+            record (Model | tuple): model instance or a tuple of `fields` values
+            commit_action (Callable | None): A function called in the DB transaction storing
+                the batch if this record completes it.
+
+        Returns:
+            A number of records stored by the writer threads since the previous call.
+        """
+        super().add(record, commit_action)
+        return self.__report_stored(wait=False)
+
+    def flush(self, commit_action: Callable[[], None] | None = None) -> int:
+        """Queue a rest of model instances and wait until all the queued batches are stored.
+
+        Args:
+            commit_action (Callable | None): A function called in the DB transaction storing
+                the batch, it's called even if the batch is empty.
+
+        Returns:
+            A number of records stored by the writer threads since the previous call.
+        """
+        super().flush(commit_action)
+        return self.__report_stored(wait=True)
+
+    def close(self) -> None:
+        """Stop the writer threads after storing the queued batches."""
+        for _ in self.__threads:
+            self.__tasks.put(None)
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = []
+        self.__report_stored(wait=False)
+
+    @property
+    def stats(self):
+        """Returns the statistics of the stored batches."""
+        return {**super().stats, "duplicates": self.__duplicates}
+
+    def _store_batch(
+        self, records: list[Any], commit_action: Callable[[], None] | None
+    ) -> int:
+        """Queue a batch of model instances or rows for storing.
+
+        Args:
+            records (list[Model | tuple]): model instances or rows of field values
+            commit_action (Callable | None): A function to call in the transaction storing the batch.
+
+        Returns:
+            0, the duplicates are counted when the batch is stored.
+        """
+        if not self.__threads:
+            self.__start_threads()
+        if records:
+            self.__queued_batch_number = self.current_batch_number
+            self.__tasks.put((self.current_batch_number, records, commit_action))
+        else:
+            # Only the commit action, it's not reported as a batch, but it's waited for
+            self.__queued_actions += 1
+            self.__tasks.put((None, records, commit_action))
+        return 0
+
+    def _batch_stored(self, records_count: int, elapsed: float) -> None:
+        """Queueing time isn't the storing time, it's measured when batches are stored.
+
+        Args:
+            records_count (int): The number of the queued records.
+            elapsed (float): The queueing time in seconds.
+        """
+
+    def __start_threads(self) -> None:
+        """Start the writer threads."""
+        for _ in range(self.__threads_count):
+            thread = threading.Thread(target=self.__store_batches, daemon=True)
+            thread.start()
+            self.__threads.append(thread)
+
+    def __store_batches(self) -> None:
+        """Writer thread loop."""
+        try:
+            while (task := self.__tasks.get()) is not None:
+                batch_number, records, commit_action = task
+                started = time.perf_counter()
+                try:
+                    duplicates = self.__storage._store_batch(records, commit_action)
+                except Exception as error:
+                    self.__results.put((batch_number, len(records), 0, 0.0, error))
+                else:
+                    elapsed = time.perf_counter() - started
+                    self.__results.put(
+                        (batch_number, len(records), duplicates, elapsed, None)
+                    )
+        finally:
+            # Every thread has its own DB connection
+            connections.close_all()
+
+    def __report_stored(self, wait: bool) -> int:
+        """Call `on_flushed` for the stored batches in the batch order.
+
+        Args:
+            wait (bool): Whether to wait until all the queued batches and commit actions are stored.
+
+        Returns:
+            A number of reported records.
+
+        Raises:
+            Exception: An exception raised by a writer thread.
+        """
+        records_stored = 0
+        while True:
+            try:
+                if wait and (
+                    self.__reported_batch_number < self.__queued_batch_number
+                    or self.__queued_actions
+                ):
+                    result = self.__results.get()
+                else:
+                    result = self.__results.get_nowait()
+            except queue.Empty:
+                return records_stored
+
+            batch_number, records_count, duplicates, elapsed, error = result
+            if batch_number is None:
+                # Only the commit actions have no batch number, they are reported only if they fail
+                self.__queued_actions -= 1
+            if error is not None:
+                raise error
+            if batch_number is None:
+                continue
+            self.__duplicates += duplicates
+            super()._batch_stored(records_count, elapsed)
+            self.__stored_batches[batch_number] = records_count
+            # Report only the batches which all the previous ones are stored too
+            while self.__reported_batch_number + 1 in self.__stored_batches:
+                self.__reported_batch_number += 1
+                records_count = self.__stored_batches.pop(self.__reported_batch_number)
+                records_stored += records_count
+                if self.__on_flushed is not None:
+                    self.__on_flushed(self.__reported_batch_number, records_count)
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.db.models import Model as DBModel
 from django.http import HttpRequest
 
-from .models import NginxLog
+from .models import ImportCheckpoint, NginxLog, QuarantinedLine
 
 
 # Register your models here.
@@ -13,8 +13,9 @@ class NginxLogAdmin(admin.ModelAdmin):
 
     list_display = ("date", "ip", "method", "uri", "status")
     list_filter = ("method", "uri", "status", "date")
-    search_fields = ("uri", "ip", "date")
+    search_fields = ("uri__value", "ip", "date")
     ordering = ("-date",)
+    list_select_related = ("uri",)
 
     def get_readonly_fields(
         self, request: HttpRequest, obj: DBModel | None = None
@@ -30,3 +31,34 @@ class NginxLogAdmin(admin.ModelAdmin):
 
 
 admin.site.register(NginxLog, NginxLogAdmin)
+
+
+class ImportCheckpointAdmin(admin.ModelAdmin):
+    """Admin panel view of ImportCheckpoint model. Delete a checkpoint to import the file again."""
+
+    list_display = ("path", "line_number", "offset", "completed_size", "updated")
+    search_fields = ("path",)
+    ordering = ("-updated",)
+    readonly_fields = [field.name for field in ImportCheckpoint._meta.fields]
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+
+admin.site.register(ImportCheckpoint, ImportCheckpointAdmin)
+
+
+class QuarantinedLineAdmin(admin.ModelAdmin):
+    """Admin panel view of QuarantinedLine model. Use `reprocess_quarantine` command to import the lines again."""
+
+    list_display = ("source", "line_number", "batch_number", "reason", "created")
+    list_filter = ("reason",)
+    search_fields = ("source", "text")
+    ordering = ("-created",)
+    readonly_fields = [field.name for field in QuarantinedLine._meta.fields]
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+
+admin.site.register(QuarantinedLine, QuarantinedLineAdmin)
@@ -5,7 +5,17 @@ from nginx_logs.models import NginxLog
 
 class NginxLogSerializer(serializers.ModelSerializer):
     date = serializers.DateTimeField(format="%d/%b/%Y:%H:%M:%S %z")
+    uri = serializers.CharField(source="uri.value")
 
     class Meta:
         model = NginxLog
-        fields = "__all__"
+        # The fingerprint is only used to reject duplicates on import
+        exclude = ("fingerprint",)
+
+
+class IngestStatsSerializer(serializers.Serializer):
+    """The statistics of the ingested lines."""
+
+    total = serializers.IntegerField()
+    skipped = serializers.IntegerField()
+    stored = serializers.IntegerField()
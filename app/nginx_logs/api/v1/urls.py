@@ -1,7 +1,7 @@
-from django.urls import path
+from django.urls import path, re_path
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 
-from .views import NginxLogsView
+from .views import NginxLogsIngestView, NginxLogsView
 
 
 urlpatterns = [
@@ -12,4 +12,8 @@ urlpatterns = [
         name="api-v1-swagger-ui",
     ),
     path("logs/", NginxLogsView.as_view(), name="api-v1-logs"),
+    # Log shippers post without the trailing slash, and POST requests can't be redirected
+    re_path(
+        r"^logs/ingest/?$", NginxLogsIngestView.as_view(), name="api-v1-logs-ingest"
+    ),
 ]
@@ -1,10 +1,27 @@
-from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, generics
+import hmac
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from django_filters.rest_framework import CharFilter, DjangoFilterBackend, FilterSet
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema
+from rest_framework import filters, generics, status
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import BasePermission
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from nginx_logs.models import NginxLog
+from nginx_logs.utils import (
+    LogImporter,
+    NdjsonLines,
+    StreamTooLarge,
+    parse_projected_json_log_record,
+    uri_id,
+)
 
-from .serializers import NginxLogSerializer
+from .serializers import IngestStatsSerializer, NginxLogSerializer
 
 class NginxLogsPagination(PageNumberPagination):
     """Pagination class for Nginx logs."""
@@ -13,12 +30,143 @@ class NginxLogsPagination(PageNumberPagination):
     page_size_query_param = 'size'
     max_page_size = 1000
 
+
+class NginxLogsFilterSet(FilterSet):
+    """
+    Filters of Nginx logs. A URI is filtered by its id, so the URI table isn't searched.
+    The date range (`date__gte`, `date__lt`) limits the scanned partitions of a partitioned table.
+    A method isn't limited to the stored ones, a method which isn't in `HTTP_METHODS`
+    selects the records stored with the unknown method "-".
+    """
+
+    uri = CharFilter(method="filter_uri")
+    method = CharFilter()
+
+    class Meta:
+        model = NginxLog
+        fields = {
+            "method": ["exact"],
+            "uri": ["exact"],
+            "status": ["exact"],
+            "date": ["gte", "lt"],
+        }
+
+    def filter_uri(self, queryset, name, value):
+        return queryset.filter(uri_id=uri_id(value))
+
+
+class NginxLogsSearchFilter(filters.SearchFilter):
+    """
+    Search of Nginx logs. A field of a related model (e.g. `uri__value`) is searched in its table,
+    and the records are filtered by the keys found, so each URI is matched once
+    (by the trigram index on PostgreSQL) instead of being joined with every record.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+
+        for term in search_terms:
+            conditions = Q()
+            for search_field in search_fields:
+                relation, _, related_field = search_field.partition(LOOKUP_SEP)
+                if not related_field:
+                    lookup = self.construct_search(search_field, queryset)
+                    conditions |= Q(**{lookup: term})
+                    continue
+                model = queryset.model._meta.get_field(relation).related_model
+                lookup = self.construct_search(related_field, model.objects.all())
+                keys = model.objects.filter(**{lookup: term}).values("pk")
+                conditions |= Q(**{f"{relation}__in": keys})
+            queryset = queryset.filter(conditions)
+        return queryset
+
+
 class NginxLogsView(generics.ListAPIView):
     """API view for listing Nginx logs."""
 
-    queryset = NginxLog.objects.all()
+    queryset = NginxLog.objects.select_related("uri")
     serializer_class = NginxLogSerializer
     pagination_class = NginxLogsPagination
-    filter_backends = (filters.SearchFilter, DjangoFilterBackend)
-    filterset_fields = ("method", "uri", "status")
-    search_fields = ("uri", "ip", "date")
+    filter_backends = (NginxLogsSearchFilter, DjangoFilterBackend)
+    filterset_class = NginxLogsFilterSet
+    search_fields = ("uri__value", "ip", "date")
+
+
+class IngestTokenPermission(BasePermission):
+    """Allows requests with the `LOG_INGEST_TOKEN` bearer token, nothing is allowed if it's not set."""
+
+    def has_permission(self, request, view):
+        token = settings.LOG_INGEST_TOKEN
+        return bool(token) and hmac.compare_digest(
+            request.META.get("HTTP_AUTHORIZATION", "").encode(),
+            f"Bearer {token}".encode(),
+        )
+
+
+def request_body_stream(request):
+    """
+    Returns the stream of a request body which is read without buffering it.
+
+    A chunked body has no Content-Length, so Django sees it as empty. WSGI servers which
+    decode chunked bodies mark the end of the input, and then it's read from the input directly.
+
+    Args:
+        request (HttpRequest): The request.
+
+    Returns:
+        A stream with the `read` method.
+    """
+    meta = request.META
+    if "CONTENT_LENGTH" not in meta and meta.get("wsgi.input_terminated"):
+        return meta["wsgi.input"]
+    return request
+
+
+class NginxLogsIngestView(APIView):
+    """
+    API view for storing Nginx JSON logs pushed as an NDJSON body, plain or gzip-encoded.
+
+    The body is parsed while it's read and stored by batches, so a request takes the memory
+    of one batch however large it is, and the client isn't read faster than the records are stored.
+    The lines stored before an error stay stored, the response tells how many of them there are.
+    """
+
+    authentication_classes = ()
+    permission_classes = (IngestTokenPermission,)
+
+    @extend_schema(
+        request={"application/x-ndjson": OpenApiTypes.BINARY},
+        responses={200: IngestStatsSerializer},
+    )
+    def post(self, request):
+        encoding = request.META.get("HTTP_CONTENT_ENCODING", "identity").strip().lower()
+        if encoding not in ("identity", "gzip"):
+            return Response(
+                {"detail": f"Unsupported content encoding: {encoding}."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+
+        lines = NdjsonLines(
+            request_body_stream(request),
+            gzip=encoding == "gzip",
+            max_size=settings.LOG_INGEST_MAX_SIZE,
+            max_line_size=settings.LOG_INGEST_MAX_LINE_SIZE,
+        )
+        importer = LogImporter(parse_projected_json_log_record, settings.LOG_BATCH_SIZE)
+        importer.parse(lines)
+        stats = importer.stats
+        data = {key: stats[key] for key in ("total", "skipped", "stored")}
+
+        if lines.error is not None:
+            return Response(
+                {"detail": str(lines.error), **data},
+                status=(
+                    status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                    if isinstance(lines.error, StreamTooLarge)
+                    else status.HTTP_400_BAD_REQUEST
+                ),
+            )
+        return Response(data)
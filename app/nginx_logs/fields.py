@@ -0,0 +1,75 @@
+from typing import Any
+
+from django.db import models
+from django.utils.functional import cached_property
+
+
+# HTTP methods stored by their index. The codes are stored in DB, so new methods may only be appended.
+# The first one stands for any method which isn't in the list (e.g. a custom verb), the records
+# with such methods are stored with it
+HTTP_METHODS = (
+    "-",
+    "GET",
+    "HEAD",
+    "POST",
+    "PUT",
+    "DELETE",
+    "OPTIONS",
+    "PATCH",
+    "CONNECT",
+    "TRACE",
+    "PROPFIND",
+    "PROPPATCH",
+    "MKCOL",
+    "COPY",
+    "MOVE",
+    "LOCK",
+    "UNLOCK",
+    "PURGE",
+    "SEARCH",
+    "REPORT",
+)
+
+HTTP_METHOD_CODES = {method: code for code, method in enumerate(HTTP_METHODS)}
+
+
+class HttpMethodField(models.SmallIntegerField):
+    """
+    An HTTP method stored as a small integer code (see `HTTP_METHODS`).
+
+    The value of the field is the method name, it's encoded on saving and in lookups,
+    and decoded on loading, so the code is never seen outside DB. A method which isn't
+    in the list is stored with the code of "-", so it's loaded as "-".
+    """
+
+    description = "HTTP method stored as a small integer"
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        kwargs["choices"] = [(method, method) for method in HTTP_METHODS]
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        # The choices are the list of methods, adding a method doesn't need a migration
+        kwargs.pop("choices", None)
+        return name, path, args, kwargs
+
+    @cached_property
+    def validators(self):
+        # The value is a method name, so the range of the code isn't validated
+        return [*self.default_validators, *self._validators]
+
+    def from_db_value(self, value: int | None, expression, connection) -> str | None:
+        return None if value is None else HTTP_METHODS[value]
+
+    def to_python(self, value: Any) -> str | None:
+        if value is None or isinstance(value, str):
+            return value
+        return HTTP_METHODS[value]
+
+    def get_prep_value(self, value: Any) -> int | None:
+        value = models.Field.get_prep_value(self, value)
+        if value is None:
+            return None
+        # Unknown methods are stored (and looked up) as "-"
+        return HTTP_METHOD_CODES.get(value, 0)
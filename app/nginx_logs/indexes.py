@@ -0,0 +1,50 @@
+from django.contrib.postgres.indexes import BrinIndex, GinIndex, OpClass
+from django.db import models
+from django.db.models.functions import Upper
+
+
+# PostgreSQL indexes used in production. SQLite (development and tests) has no such index types,
+# so it gets the nearest plain indexes instead, and the same migrations work on both
+
+
+class PortableBrinIndex(BrinIndex):
+    """
+    A BRIN index on PostgreSQL, a plain index on other databases.
+
+    A BRIN index stores the range of values of each block of pages, so it's tiny and cheap to update,
+    and it selects the blocks of a range of values as long as the rows are stored in the order
+    of the field, e.g. log records by their date.
+    """
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor != "postgresql":
+            return models.Index.create_sql(self, model, schema_editor, **kwargs)
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
+
+
+class UpperTrigramIndex(GinIndex):
+    """
+    A GIN index of the trigrams of an upper-cased text field on PostgreSQL (it needs `pg_trgm` extension),
+    a plain index of the upper-cased field on other databases.
+
+    PostgreSQL lookups `icontains` are made as `UPPER(field) LIKE UPPER('%...%')`, so they use the index.
+
+    Args:
+        field_name (str): The name of the text field.
+        name (str): The name of the index.
+    """
+
+    def __init__(self, field_name: str, *, name: str) -> None:
+        self.field_name = field_name
+        super().__init__(OpClass(Upper(field_name), name="gin_trgm_ops"), name=name)
+
+    def deconstruct(self):
+        path, _, _ = super().deconstruct()
+        return path, (self.field_name,), {"name": self.name}
+
+    def create_sql(self, model, schema_editor, using="", **kwargs):
+        if schema_editor.connection.vendor != "postgresql":
+            return models.Index(Upper(self.field_name), name=self.name).create_sql(
+                model, schema_editor, **kwargs
+            )
+        return super().create_sql(model, schema_editor, using=using, **kwargs)
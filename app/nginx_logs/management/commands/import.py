@@ -1,21 +1,99 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
+from app.utils import AdaptiveBatchSize, BatchModelWriter, CopyModelWriter
 from nginx_logs.utils import (
+    FINGERPRINTS,
+    FileCheckpoint,
     LogImporter,
+    LogRecord,
+    batch_parsed_signal,
+    detect_compression,
+    expand_log_paths,
+    follow_lines,
     flushed_signal,
-    malformed_line_signal,
+    import_file_sharded,
+    iter_binary_lines,
+    make_shards,
+    merge_shard_stats,
+    open_log_file,
     parse_json_log_record,
+    parse_projected_json_log_record,
 )
+from nginx_logs.utils.log_types import LogLine
+from nginx_logs.utils.sharded_import import FileShard
+
+
+LOG_PARSERS: dict[str, Callable[[LogLine], LogRecord | None]] = {
+    "json": parse_json_log_record,
+    "projected": parse_projected_json_log_record,
+}
+
+MODEL_WRITERS = {
+    "bulk": BatchModelWriter,
+    "copy": CopyModelWriter,
+}
+
+# The number of malformed lines of an import printed in full, the rest are only counted
+MALFORMED_SAMPLES = 10
+
+
+def quarantine_source(filename: str | int) -> str:
+    """
+    Gets the source name which malformed lines of a log file are quarantined with.
+
+    Args:
+        filename (str | int): The log file path or 0 for stdin.
+
+    Returns:
+        str: The absolute path of the file, or "-" for stdin.
+    """
+    return "-" if isinstance(filename, int) else os.path.abspath(filename)
+
+
+def batch_size_argument(value: str) -> int | str:
+    """
+    Parses the batch size option.
+
+    Args:
+        value (str): A positive number or "auto".
+
+    Returns:
+        int | str: The batch size or "auto".
+    """
+    if value == "auto":
+        return value
+    try:
+        batch_size = int(value)
+    except ValueError:
+        batch_size = 0
+    if batch_size <= 0:
+        raise argparse.ArgumentTypeError("must be a positive number or 'auto'")
+    return batch_size
 
 
 class Command(BaseCommand):
     """
-    This Django management command imports Nginx log file into the database.
-    It can read log data either from a file or standard input.
+    This Django management command imports Nginx log files into the database.
+    It can read log data either from files (plain or compressed) or standard input.
     """
 
-    help = "Imports Nginx log file into the database. Log data may be read from a file or stdin."
+    help = (
+        "Imports Nginx log files into the database. Log data may be read from files "
+        "(paths or glob patterns, gzip/bz2/xz/zstd compressed) or stdin."
+    )
+
+    # Seconds between the progress lines, they aren't printed if it's 0
+    progress_interval = 0.0
+    # Seconds between the lines counting the malformed lines which aren't printed
+    malformed_summary_interval = 10.0
 
     def add_arguments(self, parser):  # pragma: no cover
         """
@@ -27,18 +105,96 @@ class Command(BaseCommand):
         Returns:
             None
         """
-        parser.add_argument("filename", type=str)
+        parser.add_argument(
+            "filename",
+            type=str,
+            nargs="+",
+            help="Log files or glob patterns, rotated files are imported from the oldest one; '-' for stdin",
+        )
         parser.add_argument(
             "--batch-size",
+            type=batch_size_argument,
+            default=None,
+            help="The number of records to store into DB at once, or 'auto' to adjust it to the storing time",
+        )
+        parser.add_argument(
+            "--parser",
+            choices=LOG_PARSERS.keys(),
+            default=None,
+            help="Decode full JSON lines or only the fields being stored (default in binary mode)",
+        )
+        parser.add_argument(
+            "--writer",
+            choices=MODEL_WRITERS.keys(),
+            default="bulk",
+            help="Store batches with INSERT or PostgreSQL COPY (falls back to INSERT on other DBs)",
+        )
+        parser.add_argument(
+            "--writer-threads",
+            type=int,
+            default=0,
+            help="The number of threads storing batches into DB while the next ones are parsed",
+        )
+        parser.add_argument(
+            "--workers",
             type=int,
+            default=1,
+            help="The number of processes importing parts of a regular file in parallel",
+        )
+        parser.add_argument(
+            "--fingerprint",
+            choices=FINGERPRINTS.keys(),
             default=None,
-            help="The number of records to store into DB at once",
+            help="Drop the records which are already stored, identifying them by the raw line or by the stored fields",
+        )
+        parser.add_argument(
+            "--checkpoints",
+            action="store_true",
+            help="Save the positions of the imports, resume interrupted imports and skip imported files",
+        )
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            help="Keep importing lines appended to the file until interrupted, like `tail -F`",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds between checks for new data in follow mode",
+        )
+        parser.add_argument(
+            "--idle-timeout",
+            type=float,
+            default=5.0,
+            help="Seconds without new lines after which an incomplete batch is stored in follow mode",
+        )
+        parser.add_argument(
+            "--binary",
+            action="store_true",
+            help="Read the log without decoding whole lines (memory-mapped for regular files)",
+        )
+        parser.add_argument(
+            "--no-quarantine",
+            action="store_true",
+            help="Don't store malformed lines into the quarantine table, only count them",
+        )
+        parser.add_argument(
+            "--stats-json",
+            default=None,
+            help="Measure the import stages and write the statistics of the files to this JSON file",
+        )
+        parser.add_argument(
+            "--progress",
+            type=float,
+            default=0.0,
+            help="Print the number of imported lines and the throughput every this many seconds",
         )
 
     def handle(self, *args, **options):
         """
         Main function that runs the import process.
-        It connects signal handlers for malformed_line and flushed signals,
+        It connects signal handlers for batch_parsed and flushed signals,
         and then it uses the LogImporter utility to parse the JSON file and store the records
         in batches into the Django database.
 
@@ -49,39 +205,576 @@ class Command(BaseCommand):
         Returns:
             None
         """
-        filename = options["filename"]
-        if filename.strip() == "-":
+        filenames = options["filename"]
+        if isinstance(filenames, str):
+            filenames = [filenames]
+        if [filename.strip() for filename in filenames] == ["-"]:
             # If we are told to use the standard input, use its handle as a file name
-            filename = 0
+            paths: list[str | int] = [0]
+        else:
+            try:
+                paths = list(expand_log_paths(filenames))
+            except FileNotFoundError as error:
+                raise CommandError(str(error))
 
-        batch_size = options.get("batch_size", settings.LOG_BATCH_SIZE)
-        try:
-            importer = LogImporter(parse_json_log_record, batch_size)
-        except Exception:
+        binary = options.get("binary", False)
+        workers = options.get("workers") or 1
+        parser_name = options.get("parser") or (
+            "projected" if binary or workers > 1 else "json"
+        )
+        batch_size = options.get("batch_size") or settings.LOG_BATCH_SIZE
+        if batch_size == "auto":
+            batch_size = AdaptiveBatchSize(
+                settings.LOG_BATCH_SIZE,
+                settings.LOG_BATCH_SIZE_MIN,
+                settings.LOG_BATCH_SIZE_MAX,
+                settings.LOG_BATCH_TARGET_LATENCY,
+            )
+        writer_class = MODEL_WRITERS[options.get("writer") or "bulk"]
+        writer_threads = options.get("writer_threads") or 0
+        fingerprint = options.get("fingerprint")
+        stats_json = options.get("stats_json")
+        timings = stats_json is not None
+        quarantine = not options.get("no_quarantine")
+        self.progress_interval = options.get("progress") or 0.0
+
+        if workers > 1 and paths == [0]:
+            raise CommandError("Parallel import requires a regular file.")
+
+        if options.get("follow"):
+            if len(paths) != 1 or paths == [0] or workers > 1:
+                raise CommandError("Follow mode requires one file and one worker.")
+            stats = self.follow_file(
+                paths[0],
+                parser_name,
+                batch_size,
+                writer_class,
+                writer_threads,
+                options.get("poll_interval") or 1.0,
+                options.get("idle_timeout") or 5.0,
+                fingerprint=fingerprint,
+                timings=timings,
+                quarantine=quarantine,
+            )
+            if stats_json is not None:
+                self.write_stats_json(stats_json, paths, [stats])
             return
 
+        use_checkpoints = options.get("checkpoints", False)
+        if use_checkpoints and writer_threads > 1:
+            # Batches stored out of order would save positions beyond unstored lines
+            self.stderr.write(
+                "Checkpoints require storing batches in order, so one writer thread is used."
+            )
+            writer_threads = 1
+
+        all_stats = []
+        imported_paths = []
+        started = time.perf_counter()
+        for path in paths:
+            if len(paths) > 1:
+                self.stdout.write(f"\nImporting {path}")
+            compressed = False
+            checkpoint = None
+            shards = None
+            if path != 0 and os.path.isfile(path):
+                compressed = detect_compression(path) is not None
+                if use_checkpoints:
+                    checkpoint = FileCheckpoint(path, compressed)
+                    if checkpoint.is_complete:
+                        self.stdout.write(
+                            f"Skipping {path}: it's already imported "
+                            "(import it without --checkpoints to import it again)."
+                        )
+                        continue
+                    shards = checkpoint.shards
+                    if shards:
+                        self.stdout.write(
+                            f"Resuming {path}: {len(shards)} parts aren't imported completely."
+                        )
+
+            if shards or (
+                workers > 1
+                and path != 0
+                and not compressed
+                and os.path.getsize(path) > 0
+                and (checkpoint is None or checkpoint.offset == 0)
+            ):
+                on_shard_commit = None
+                if checkpoint is not None:
+                    if not shards:
+                        # The shards are saved before any of them is imported
+                        shards = make_shards(path, workers)
+                        checkpoint.save_shards(shards)
+                    on_shard_commit = checkpoint.shard_committer()
+                stats = self.import_sharded(
+                    path,
+                    workers,
+                    parser_name,
+                    batch_size,
+                    writer_class,
+                    writer_threads,
+                    fingerprint,
+                    quarantine,
+                    shards,
+                    on_shard_commit,
+                )
+                if checkpoint is not None:
+                    checkpoint.complete_shards()
+            else:
+                # Compressed and partially imported files are imported by one process
+                stats = self.import_file(
+                    path,
+                    binary,
+                    parser_name,
+                    batch_size,
+                    writer_class,
+                    writer_threads,
+                    checkpoint,
+                    fingerprint,
+                    timings,
+                    quarantine,
+                )
+            all_stats.append(stats)
+            imported_paths.append(path)
+
+        if len(paths) > 1:
+            self.stdout.write(f"\nAll {len(paths)} files:")
+            self.write_stats(
+                {
+                    key: sum(stats.get(key, 0) for stats in all_stats)
+                    for key in (
+                        "total",
+                        "bytes",
+                        "skipped",
+                        "stored",
+                        "duplicates",
+                        "quarantined",
+                    )
+                },
+                time.perf_counter() - started,
+            )
+        if stats_json is not None:
+            self.write_stats_json(stats_json, imported_paths, all_stats)
+
+    def import_file(
+        self,
+        filename: str | int,
+        binary: bool,
+        parser_name: str,
+        batch_size: int | AdaptiveBatchSize,
+        writer_class: type[BatchModelWriter] = BatchModelWriter,
+        writer_threads: int = 0,
+        checkpoint: FileCheckpoint | None = None,
+        fingerprint: str | None = None,
+        timings: bool = False,
+        quarantine: bool = False,
+    ) -> dict:
+        """
+        Imports one log file by one LogImporter.
+        Compressed files are decompressed in a background thread.
+        If a checkpoint is given, the import starts from its position and the position is saved
+        with every stored batch. Such files are read in binary mode to count bytes.
+
+        Args:
+            filename (str | int): The log file path or 0 for stdin.
+            binary (bool): Whether to read the log without decoding whole lines.
+            parser_name (str): The log line parser name.
+            batch_size (int | AdaptiveBatchSize): The number of records to store into DB at once.
+            writer_class (type(BatchModelWriter)): The class of the writer storing batches into DB.
+            writer_threads (int): The number of threads storing batches into DB.
+            checkpoint (FileCheckpoint | None): The saved position of the file import.
+            fingerprint (str | None): The name of the fingerprint function to drop duplicates with.
+            timings (bool): Whether to measure the import stages.
+            quarantine (bool): Whether to store malformed lines into the quarantine table.
+
+        Returns:
+            dict: LogImporter statistics.
+        """
+        start_offset = start_line_number = 0
+        on_commit = None
+        if checkpoint is not None:
+            start_offset = checkpoint.offset
+            start_line_number = checkpoint.line_number
+            if start_offset > 0:
+                self.stdout.write(
+                    f"Resuming {filename} from line #{start_line_number + 1}."
+                )
+
+            def on_commit(bytes_parsed: int, lines_parsed: int):
+                checkpoint.commit(
+                    start_offset + bytes_parsed, start_line_number + lines_parsed
+                )
+
+        importer = LogImporter(
+            LOG_PARSERS[parser_name],
+            batch_size,
+            start_line_number + 1,
+            writer_class=writer_class,
+            writer_threads=writer_threads,
+            on_commit=on_commit,
+            fingerprint=FINGERPRINTS[fingerprint] if fingerprint else None,
+            timings=timings,
+            quarantine=quarantine_source(filename) if quarantine else None,
+        )
+
         # Connect signal handlers for the importer instance
-        malformed_line_signal.connect(self.malformed_line_handler, sender=importer)
+        batch_parsed_signal.connect(self.batch_parsed_handler, sender=importer)
         flushed_signal.connect(self.flushed_handler, sender=importer)
 
+        started = time.perf_counter()
+        self.start_progress()
+        self.start_malformed_summary(quarantine)
         try:
             # Do import
-            importer.parse(open(filename, "r"))
+            if isinstance(filename, int):
+                file = open(filename, "rb" if binary else "r")
+            else:
+                try:
+                    file = open_log_file(filename, binary or checkpoint is not None)
+                except ValueError as error:
+                    raise CommandError(str(error))
+            with file:
+                if checkpoint is not None:
+                    importer.parse(iter_binary_lines(file, start=start_offset))
+                    stats = importer.stats
+                    checkpoint.complete(
+                        start_offset + stats["bytes"],
+                        start_line_number + stats["total"],
+                    )
+                else:
+                    importer.parse(iter_binary_lines(file) if binary else file)
         finally:
             # Print the final statistics
-            stats = importer.stats
-            if stats["total"] == 0:
-                self.stdout.write("No records were read.")
-            else:
+            self.write_malformed_summary()
+            self.write_stats(importer.stats, time.perf_counter() - started)
+
+            # Disconnect signal handlers
+            batch_parsed_signal.disconnect(self.batch_parsed_handler, sender=importer)
+            flushed_signal.disconnect(self.flushed_handler, sender=importer)
+        return importer.stats
+
+    def follow_file(
+        self,
+        filename: str,
+        parser_name: str,
+        batch_size: int | AdaptiveBatchSize,
+        writer_class: type[BatchModelWriter] = BatchModelWriter,
+        writer_threads: int = 0,
+        poll_interval: float = 1.0,
+        idle_timeout: float = 5.0,
+        stop_event: threading.Event | None = None,
+        fingerprint: str | None = None,
+        timings: bool = False,
+        quarantine: bool = False,
+    ) -> dict:
+        """
+        Imports a log file and then the lines appended to it until interrupted (or the stop event is set).
+        An incomplete batch is stored when no new lines appear for the idle timeout.
+
+        Args:
+            filename (str): The log file path.
+            parser_name (str): The log line parser name.
+            batch_size (int | AdaptiveBatchSize): The number of records to store into DB at once.
+            writer_class (type(BatchModelWriter)): The class of the writer storing batches into DB.
+            writer_threads (int): The number of threads storing batches into DB.
+            poll_interval (float): Seconds between checks for new data.
+            idle_timeout (float): Seconds without new lines after which an incomplete batch is stored.
+            stop_event (threading.Event | None): An event to stop following.
+            fingerprint (str | None): The name of the fingerprint function to drop duplicates with.
+            timings (bool): Whether to measure the import stages.
+            quarantine (bool): Whether to store malformed lines into the quarantine table.
+
+        Returns:
+            dict: LogImporter statistics.
+        """
+        importer = LogImporter(
+            LOG_PARSERS[parser_name],
+            batch_size,
+            writer_class=writer_class,
+            writer_threads=writer_threads,
+            fingerprint=FINGERPRINTS[fingerprint] if fingerprint else None,
+            timings=timings,
+            quarantine=quarantine_source(filename) if quarantine else None,
+        )
+
+        # Connect signal handlers for the importer instance
+        batch_parsed_signal.connect(self.batch_parsed_handler, sender=importer)
+        flushed_signal.connect(self.flushed_handler, sender=importer)
+
+        started = time.perf_counter()
+        self.start_progress()
+        self.start_malformed_summary(quarantine)
+        try:
+            try:
+                for line in follow_lines(
+                    filename, poll_interval, idle_timeout, stop_event
+                ):
+                    if line is None:
+                        # Make the new records available without waiting for a full batch
+                        importer.flush()
+                    else:
+                        importer.parse_line(line)
+            except KeyboardInterrupt:
+                # Following is stopped by Ctrl+C
+                pass
+            importer.flush()
+        finally:
+            importer.close()
+
+            # Print the final statistics
+            self.write_malformed_summary()
+            self.write_stats(importer.stats, time.perf_counter() - started)
+
+            # Disconnect signal handlers
+            batch_parsed_signal.disconnect(self.batch_parsed_handler, sender=importer)
+            flushed_signal.disconnect(self.flushed_handler, sender=importer)
+        return importer.stats
+
+    def import_sharded(
+        self,
+        filename: str,
+        workers: int,
+        parser_name: str,
+        batch_size: int | AdaptiveBatchSize,
+        writer_class: type[BatchModelWriter] = BatchModelWriter,
+        writer_threads: int = 0,
+        fingerprint: str | None = None,
+        quarantine: bool = False,
+        shards: list[FileShard] | None = None,
+        on_shard_commit: Callable[[FileShard, int, int], None] | None = None,
+    ):
+        """
+        Imports a regular file by several worker processes.
+        Messages of each part are printed as soon as the part and all the previous ones are imported.
+        Batch numbers are counted through all the parts.
+
+        Args:
+            filename (str): The log file path.
+            workers (int): The number of worker processes.
+            parser_name (str): The log line parser name.
+            batch_size (int | AdaptiveBatchSize): The number of records to store into DB at once.
+            writer_class (type(BatchModelWriter)): The class of the writer storing batches into DB.
+            writer_threads (int): The number of threads storing batches in each worker process.
+            fingerprint (str | None): The name of the fingerprint function to drop duplicates with.
+            quarantine (bool): Whether to store malformed lines into the quarantine table.
+            shards (list[FileShard] | None): The parts to import, by default the file is split into `workers` parts.
+            on_shard_commit (Callable | None): A function saving the position of a part with its records.
+
+        Returns:
+            dict: Merged statistics of the parts.
+        """
+        started = time.perf_counter()
+        self.start_malformed_summary(quarantine)
+        results = []
+        batch_offset = 0
+        try:
+            for result in import_file_sharded(
+                filename,
+                workers,
+                LOG_PARSERS[parser_name],
+                batch_size,
+                writer_class=writer_class,
+                writer_threads=writer_threads,
+                fingerprint=FINGERPRINTS[fingerprint] if fingerprint else None,
+                quarantine=quarantine_source(filename) if quarantine else None,
+                shards=shards,
+                on_shard_commit=on_shard_commit,
+            ):
+                results.append(result)
+                for (
+                    batch_number,
+                    lines_parsed,
+                    lines_malformed,
+                    malformed_lines,
+                ) in result.parsed_batches:
+                    self.batch_parsed_handler(
+                        batch_number=batch_offset + batch_number,
+                        lines_parsed=lines_parsed,
+                        lines_malformed=lines_malformed,
+                        malformed_lines=malformed_lines,
+                    )
+                for batch_number, records_stored, batch_incomplete in result.flushes:
+                    self.flushed_handler(
+                        batch_number=batch_offset + batch_number,
+                        records_stored=records_stored,
+                        batch_incomplete=batch_incomplete,
+                    )
+                batch_offset += result.batches
+        finally:
+            self.write_malformed_summary()
+            stats = merge_shard_stats(results)
+            self.write_stats(stats, time.perf_counter() - started)
+        return stats
+
+    def write_stats(self, stats: dict, elapsed: float):
+        """
+        Prints the final statistics of the import.
+
+        Args:
+            stats (dict): LogImporter statistics.
+            elapsed (float): Import duration in seconds.
+
+        Returns:
+            None
+        """
+        if stats["total"] == 0:
+            self.stdout.write("No records were read.")
+        else:
+            self.stdout.write(
+                f"\nTotal {stats['total']} records read, {stats['skipped']} skipped and {stats['stored']} stored."
+            )
+            if stats.get("duplicates"):
+                self.stdout.write(f"{stats['duplicates']} duplicate records dropped.")
+            if stats.get("quarantined"):
                 self.stdout.write(
-                    f"\nTotal {stats['total']} records read, {stats['skipped']} skipped and {stats['stored']} stored."
+                    f"{stats['quarantined']} malformed lines quarantined."
                 )
+            megabytes = stats["bytes"] / 1024 / 1024
+            self.stdout.write(
+                f"Read {megabytes:.2f} MB in {elapsed:.2f} s ({megabytes / max(elapsed, 1e-9):.2f} MB/s)."
+            )
 
-            # Disconnect signal handlers
-            malformed_line_signal.disconnect(
-                self.malformed_line_handler, sender=importer
+    def write_stats_json(self, filename: str, paths: list, all_stats: list[dict]):
+        """
+        Writes the statistics of the imported files to a JSON file.
+
+        Args:
+            filename (str): The JSON file path.
+            paths (list[str | int]): The imported log file paths, 0 for stdin.
+            all_stats (list[dict]): The statistics of the files.
+
+        Returns:
+            None
+        """
+        files = [
+            {"path": "-" if path == 0 else path, **stats}
+            for path, stats in zip(paths, all_stats)
+        ]
+        with open(filename, "w") as file:
+            json.dump({"files": files}, file, indent=2)
+            file.write("\n")
+
+    def start_progress(self):
+        """
+        Starts counting the progress of a file import.
+
+        Returns:
+            None
+        """
+        self.progress_at = time.perf_counter()
+        self.progress_lines = self.progress_bytes = 0
+
+    def write_progress(self, stats: dict):
+        """
+        Prints the number of the lines read so far and the throughput since the previous progress line.
+
+        Args:
+            stats (dict): LogImporter statistics.
+
+        Returns:
+            None
+        """
+        now = time.perf_counter()
+        elapsed = max(now - self.progress_at, 1e-9)
+        lines_per_sec = (stats["total"] - self.progress_lines) / elapsed
+        megabytes_per_sec = (
+            (stats["bytes"] - self.progress_bytes) / elapsed / 1024 / 1024
+        )
+        self.stdout.write(
+            f"Progress: {stats['total']} lines read, {stats['skipped']} skipped "
+            f"({lines_per_sec:.0f} lines/s, {megabytes_per_sec:.2f} MB/s)."
+        )
+        self.progress_at = now
+        self.progress_lines = stats["total"]
+        self.progress_bytes = stats["bytes"]
+
+    def start_malformed_summary(self, quarantine: bool = False):
+        """
+        Starts counting the malformed lines of a file import which aren't printed.
+
+        Args:
+            quarantine (bool): Whether malformed lines are stored into the quarantine table.
+
+        Returns:
+            None
+        """
+        self.malformed_quarantined = quarantine
+        self.malformed_samples_left = MALFORMED_SAMPLES
+        self.malformed_skipped = 0
+        self.malformed_skipped_batches = [0, 0]
+        self.malformed_summary_at = time.perf_counter()
+
+    def write_malformed_summary(self):
+        """
+        Prints the number of malformed lines counted since the previous summary, if there are any.
+
+        Returns:
+            None
+        """
+        if self.malformed_skipped:
+            first, last = self.malformed_skipped_batches
+            batches = (
+                f"batch #{first}" if first == last else f"batches #{first}-#{last}"
             )
-            flushed_signal.disconnect(self.flushed_handler, sender=importer)
+            where = (
+                "they're quarantined"
+                if self.malformed_quarantined
+                else "they're dropped"
+            )
+            self.stderr.write(
+                f"Skipping {self.malformed_skipped} more malformed lines of {batches}, {where}.\n"
+            )
+        self.malformed_skipped = 0
+        self.malformed_summary_at = time.perf_counter()
+
+    def batch_parsed_handler(
+        self,
+        /,
+        batch_number: int,
+        lines_parsed: int,
+        lines_malformed: int,
+        malformed_lines: list[tuple[int, str]],
+        **kwargs,
+    ):
+        """
+        Signal handler for batch_parsed.
+        Logs the malformed lines of the batch while fewer than `MALFORMED_SAMPLES` lines of the import
+        are logged, and counts the rest ones, their number is logged once in the summary interval.
+        If the progress interval has passed, prints the progress of the importer sending the signal.
+
+        Args:
+            batch_number (int): The batch number.
+            lines_parsed (int): The number of parsed lines of the batch.
+            lines_malformed (int): The number of malformed lines of the batch.
+            malformed_lines (list[tuple[int, str]]): Line numbers and texts of the first malformed lines.
+            **kwargs: Arbitrary keyword arguments, `sender` is the importer.
+
+        Returns:
+            None
+        """
+        samples = malformed_lines[: self.malformed_samples_left]
+        for line_number, text in samples:
+            self.malformed_line_handler(
+                batch_number=batch_number, line_number=line_number, text=text
+            )
+        self.malformed_samples_left -= len(samples)
+        if lines_malformed > len(samples):
+            if not self.malformed_skipped:
+                self.malformed_skipped_batches = [batch_number, batch_number]
+            self.malformed_skipped += lines_malformed - len(samples)
+            self.malformed_skipped_batches[1] = batch_number
+            if (
+                time.perf_counter() - self.malformed_summary_at
+                >= self.malformed_summary_interval
+            ):
+                self.write_malformed_summary()
+        if (
+            self.progress_interval
+            and "sender" in kwargs
+            and time.perf_counter() - self.progress_at >= self.progress_interval
+        ):
+            self.write_progress(kwargs["sender"].stats)
 
     def malformed_line_handler(
         self, /, batch_number: int, line_number: int, text: str, **kwargs
@@ -93,12 +786,14 @@ class Command(BaseCommand):
         Args:
             batch_number (int): The batch number.
             line_number (int): The line number of the malformed line.
-            text (str): The text of the malformed line.
+            text (str | bytes | memoryview): The text of the malformed line.
             **kwargs: Arbitrary keyword arguments.
 
         Returns:
             None
         """
+        if not isinstance(text, str):
+            text = bytes(text).decode("utf-8", errors="replace")
         self.stderr.write(
             f"Batch #{batch_number}: Skipping malformed line #{line_number}:\n{text}\n"
         )
@@ -119,7 +814,7 @@ class Command(BaseCommand):
             batch_number (int): The batch number.
             records_stored (int): The number of records stored in the batch.
             batch_incomplete (bool): Whether the batch is incomplete.
-            **kwargs: Arbitrary keyword arguments.
+            **kwargs: Arbitrary keyword arguments, `batch_size` is the size of the next batch.
 
         Returns:
             None
@@ -129,5 +824,13 @@ class Command(BaseCommand):
                 self.stdout.write(
                     f"Stored extra {records_stored} records from incomplete batch #{batch_number}."
                 )
+        elif kwargs.get("batch_size", records_stored) != records_stored:
+            # The batch size is adaptive and it's changed after this batch
+            self.stdout.write(
+                f"Batch #{batch_number}: Stored {records_stored} records, "
+                f"the next batch size is {kwargs['batch_size']}."
+            )
         else:
-            self.stdout.write(f"Batch #{batch_number}: Stored {records_stored} records.")
+            self.stdout.write(
+                f"Batch #{batch_number}: Stored {records_stored} records."
+            )
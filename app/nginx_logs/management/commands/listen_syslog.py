@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.utils import BatchModelWriter, CopyModelWriter
+from nginx_logs.utils import SyslogBatchStorer, SyslogProtocol, parse_json_log_record
+
+
+MODEL_WRITERS = {
+    "bulk": BatchModelWriter,
+    "copy": CopyModelWriter,
+}
+
+# Seconds between the checks of the stop event, the batch age and the stats interval
+TICK_INTERVAL = 0.05
+
+
+def bind_address_argument(value: str) -> tuple[str, int]:
+    """
+    Parses the address to listen on.
+
+    Args:
+        value (str): `host:port`, an IPv6 host is enclosed in brackets (`[::]:5140`).
+
+    Returns:
+        tuple[str, int]: The host and the port.
+    """
+    host, _, port = value.rpartition(":")
+    host = host.removeprefix("[").removesuffix("]")
+    if not host or not port.isdigit() or int(port) > 65535:
+        raise argparse.ArgumentTypeError("must be host:port")
+    return host, int(port)
+
+
+class Command(BaseCommand):
+    """
+    This Django management command receives Nginx JSON logs sent over syslog UDP
+    (`access_log syslog:server=host:port json_log;`) and stores them into the database.
+    """
+
+    help = (
+        "Receives Nginx JSON logs over syslog UDP and stores them into the database by batches, "
+        "until interrupted."
+    )
+
+    def add_arguments(self, parser):  # pragma: no cover
+        """
+        Adds the listening address and the batching options to the command line parser.
+
+        Args:
+            parser (django.core.management.base.ArgumentParser): The command line parser.
+
+        Returns:
+            None
+        """
+        parser.add_argument(
+            "--bind",
+            type=bind_address_argument,
+            default=("0.0.0.0", 5140),
+            help="The UDP address to listen on, host:port (0.0.0.0:5140 by default)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="The number of records to store into DB at once",
+        )
+        parser.add_argument(
+            "--flush-interval",
+            type=float,
+            default=1.0,
+            help="Seconds after which an incomplete batch is stored",
+        )
+        parser.add_argument(
+            "--queue-size",
+            type=int,
+            default=10,
+            help="The number of batches waiting to be stored, new batches are dropped when it's full",
+        )
+        parser.add_argument(
+            "--writer",
+            choices=MODEL_WRITERS.keys(),
+            default="bulk",
+            help="Store batches with INSERT or PostgreSQL COPY (falls back to INSERT on other DBs)",
+        )
+        parser.add_argument(
+            "--stats-interval",
+            type=float,
+            default=10.0,
+            help="Seconds between the statistics lines, 0 to print them only on exit",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Main function that runs the listener until it's interrupted by SIGINT or SIGTERM.
+
+        Args:
+            *args: Variable length argument list.
+            **options: Arbitrary keyword arguments.
+
+        Returns:
+            None
+        """
+        host, port = options.get("bind") or ("0.0.0.0", 5140)
+        self.listen(
+            host,
+            port,
+            options.get("batch_size") or settings.LOG_BATCH_SIZE,
+            options.get("flush_interval") or 1.0,
+            options.get("queue_size") or 10,
+            MODEL_WRITERS[options.get("writer") or "bulk"],
+            options.get("stats_interval") or 0.0,
+        )
+
+    def listen(
+        self,
+        host: str,
+        port: int,
+        batch_size: int,
+        flush_interval: float = 1.0,
+        queue_size: int = 10,
+        writer_class: type[BatchModelWriter] = BatchModelWriter,
+        stats_interval: float = 0.0,
+        stop_event: threading.Event | None = None,
+        ready_event: threading.Event | None = None,
+    ) -> dict:
+        """
+        Receives logs until the stop event is set or the process is interrupted.
+        The last batch is stored on exit.
+
+        Args:
+            host (str): The host to listen on.
+            port (int): The UDP port, 0 for any free one (see the `address` attribute).
+            batch_size (int): The number of records to store into DB at once.
+            flush_interval (float): Seconds after which an incomplete batch is stored.
+            queue_size (int): The number of batches waiting to be stored.
+            writer_class (type(BatchModelWriter)): The class of the writer storing batches into DB.
+            stats_interval (float): Seconds between the statistics lines, 0 to print them only on exit.
+            stop_event (threading.Event | None): An event to stop listening.
+            ready_event (threading.Event | None): An event set when the socket is bound.
+
+        Returns:
+            dict: The statistics of the listener.
+        """
+        storer = SyslogBatchStorer(
+            batch_size,
+            queue_size,
+            writer_class,
+            on_error=lambda error: self.stderr.write(
+                f"Failed to store a batch: {error}"
+            ),
+        )
+        protocol = SyslogProtocol(
+            parse_json_log_record, storer, batch_size, flush_interval
+        )
+        started = time.perf_counter()
+        try:
+            asyncio.run(
+                self.serve(
+                    protocol,
+                    host,
+                    port,
+                    stats_interval,
+                    stop_event or threading.Event(),
+                    ready_event,
+                )
+            )
+        except KeyboardInterrupt:
+            pass
+        finally:
+            protocol.flush()
+            storer.close()
+            self.stdout.write("Stopped.")
+            self.write_stats(protocol.stats, time.perf_counter() - started)
+        return protocol.stats
+
+    async def serve(
+        self,
+        protocol: SyslogProtocol,
+        host: str,
+        port: int,
+        stats_interval: float,
+        stop_event: threading.Event,
+        ready_event: threading.Event | None,
+    ):
+        """
+        Runs the datagram endpoint and stores incomplete batches on time.
+
+        Args:
+            protocol (SyslogProtocol): The protocol receiving logs.
+            host (str): The host to listen on.
+            port (int): The UDP port.
+            stats_interval (float): Seconds between the statistics lines.
+            stop_event (threading.Event): An event to stop listening.
+            ready_event (threading.Event | None): An event set when the socket is bound.
+
+        Returns:
+            None
+        """
+        loop = asyncio.get_running_loop()
+        if threading.current_thread() is threading.main_thread():
+            for signal_number in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(signal_number, stop_event.set)
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: protocol, local_addr=(host, port)
+        )
+        self.address = transport.get_extra_info("sockname")
+        self.stdout.write(f"Listening on {self.address[0]}:{self.address[1]}.")
+        if ready_event is not None:
+            ready_event.set()
+
+        stats_at = time.perf_counter()
+        stats = protocol.stats
+        try:
+            while not stop_event.is_set():
+                await asyncio.sleep(TICK_INTERVAL)
+                protocol.flush_expired()
+                now = time.perf_counter()
+                if stats_interval and now - stats_at >= stats_interval:
+                    # The rate since the previous statistics line
+                    packets = protocol.stats["packets"] - stats["packets"]
+                    stats = protocol.stats
+                    self.write_stats(stats, now - stats_at, packets)
+                    stats_at = now
+        finally:
+            transport.close()
+
+    def write_stats(self, stats: dict, elapsed: float, packets: int | None = None):
+        """
+        Prints the statistics of the listener.
+
+        Args:
+            stats (dict): SyslogProtocol statistics.
+            elapsed (float): The duration in seconds the rate is counted for.
+            packets (int | None): The number of packets received in this time, all of them by default.
+
+        Returns:
+            None
+        """
+        if packets is None:
+            packets = stats["packets"]
+        self.stdout.write(
+            f"Received {stats['packets']} packets ({packets / max(elapsed, 1e-9):.1f} packets/s), "
+            f"{stats['malformed']} malformed. Stored {stats['stored']} records, "
+            f"dropped {stats['dropped']}, failed to store {stats['failed']}."
+        )
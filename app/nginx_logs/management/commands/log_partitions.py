@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from nginx_logs.utils import PARTITION_INTERVALS, LogPartitions, partition_name
+
+
+class Command(BaseCommand):
+    """
+    This Django management command maintains PostgreSQL partitions of the log records table by date.
+    Run it before imports (e.g. daily by cron), so the records are stored into their partitions.
+    """
+
+    help = (
+        "Creates the partitions of the log records table for the upcoming periods and moves "
+        "the records of the default partition to new partitions of their periods."
+    )
+
+    def add_arguments(self, parser):  # pragma: no cover
+        """
+        Adds the partitioning options to the command line parser.
+
+        Args:
+            parser (django.core.management.base.ArgumentParser): The command line parser.
+
+        Returns:
+            None
+        """
+        parser.add_argument(
+            "--interval",
+            choices=PARTITION_INTERVALS,
+            default=None,
+            help="The period of one partition (LOG_PARTITION_INTERVAL setting by default)",
+        )
+        parser.add_argument(
+            "--ahead",
+            type=int,
+            default=3,
+            help="The number of periods after the current one to create partitions for",
+        )
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Replace the table with a partitioned one if it isn't partitioned yet. "
+            "The table is locked while its records are copied.",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Main function that converts the table if it's asked, moves the records of the default partition
+        and creates the partitions of the current and the upcoming periods.
+
+        Args:
+            *args: Variable length argument list.
+            **options: Arbitrary keyword arguments.
+
+        Returns:
+            None
+        """
+        interval = options.get("interval") or settings.LOG_PARTITION_INTERVAL
+        try:
+            partitions = LogPartitions(interval)
+        except ValueError as error:
+            raise CommandError(str(error)) from None
+
+        if not partitions.is_partitioned():
+            if not options.get("convert"):
+                raise CommandError(
+                    f"{partitions.table} isn't partitioned, use --convert to partition it."
+                )
+            try:
+                copied = partitions.convert()
+            except ValueError as error:
+                raise CommandError(str(error)) from None
+            self.stdout.write(
+                f"Partitioned {partitions.table} by {interval}, copied {copied} records."
+            )
+
+        existing = [p for p in partitions.partitions() if p.start is not None]
+        if existing and existing[0].name != partition_name(existing[0].start, interval):
+            raise CommandError(
+                f"{partitions.table} is partitioned by another interval."
+            )
+
+        for name, moved in partitions.attach_missing():
+            self.stdout.write(
+                f"Attached {name} with {moved} records of the default partition."
+            )
+        ahead = options.get("ahead")
+        created = partitions.ensure_partitions(
+            timezone.now(), 1 + (3 if ahead is None else ahead)
+        )
+        for name in created:
+            self.stdout.write(f"Created {name}.")
+        self.stdout.write(
+            f"{len(partitions.partitions())} partitions, {len(created)} created."
+        )
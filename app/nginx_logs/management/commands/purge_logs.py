@@ -0,0 +1,122 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router
+from django.utils import timezone
+
+from nginx_logs.models import NginxLog
+from nginx_logs.utils import (
+    PURGE_CHUNK_SIZE,
+    LogPartitions,
+    delete_records_before,
+    parse_age,
+)
+
+
+class Command(BaseCommand):
+    """
+    This Django management command deletes the log records older than the given age.
+    The partitions of the old periods are dropped as a whole, the rest of the old records are deleted
+    by small chunks, so it may run along with imports.
+    """
+
+    help = (
+        "Deletes the log records older than the given age, e.g. --older-than 90d. "
+        "Old partitions are dropped, other records are deleted by chunks."
+    )
+
+    def add_arguments(self, parser):  # pragma: no cover
+        """
+        Adds the age and the throttling options to the command line parser.
+
+        Args:
+            parser (django.core.management.base.ArgumentParser): The command line parser.
+
+        Returns:
+            None
+        """
+        parser.add_argument(
+            "--older-than",
+            required=True,
+            help="The age of the records to delete: a number with a unit s, m, h, d or w, e.g. 90d",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=PURGE_CHUNK_SIZE,
+            help="The maximum number of records deleted by one query",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.0,
+            help="The pause after each deleted chunk, in seconds",
+        )
+        parser.add_argument(
+            "--lock-timeout",
+            type=float,
+            default=5.0,
+            help="The maximum time to wait for the table lock to detach a partition, in seconds",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the records to delete",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Main function that drops the old partitions if the table is partitioned
+        and deletes the rest of the old records by chunks, reporting the progress.
+
+        Args:
+            *args: Variable length argument list.
+            **options: Arbitrary keyword arguments.
+
+        Returns:
+            None
+        """
+        try:
+            cutoff = timezone.now() - parse_age(options.get("older_than") or "")
+        except ValueError as error:
+            raise CommandError(str(error)) from None
+        chunk_size = options.get("chunk_size") or PURGE_CHUNK_SIZE
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be positive.")
+
+        if options.get("dry_run"):
+            count = NginxLog.objects.filter(date__lt=cutoff).count()
+            self.stdout.write(f"{count} records are older than {cutoff.isoformat()}.")
+            return
+
+        started = time.perf_counter()
+        dropped = []
+        if connections[router.db_for_write(NginxLog)].vendor == "postgresql":
+            partitions = LogPartitions(settings.LOG_PARTITION_INTERVAL)
+            if partitions.is_partitioned():
+                dropped, locked = partitions.drop_before(
+                    cutoff, options.get("lock_timeout") or 5.0
+                )
+                for partition in dropped:
+                    self.stdout.write(f"Dropped {partition.name}.")
+                for partition in locked:
+                    self.stdout.write(
+                        f"{partition.name} is locked, its records are deleted by chunks."
+                    )
+
+        deleted = 0
+        chunks = delete_records_before(cutoff, chunk_size, options.get("sleep") or 0.0)
+        for chunk_number, count in enumerate(chunks, 1):
+            deleted += count
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"Chunk #{chunk_number}: Deleted {count} records, "
+                f"{deleted} in total ({deleted / elapsed:,.0f} records/s)."
+            )
+
+        self.stdout.write(
+            f"Purged the records older than {cutoff.isoformat()}: "
+            f"{len(dropped)} partitions dropped, {deleted} records deleted "
+            f"in {time.perf_counter() - started:.1f}s."
+        )
@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+
+from app.utils import BatchModelWriter
+from nginx_logs.models import NginxLog, QuarantinedLine
+from nginx_logs.utils import (
+    NGINX_LOG_ROW_FIELDS,
+    UriInterner,
+    parse_json_log_record,
+    parse_projected_json_log_record,
+)
+
+
+LOG_PARSERS = {
+    "json": parse_json_log_record,
+    "projected": parse_projected_json_log_record,
+}
+
+
+class Command(BaseCommand):
+    """
+    This Django management command parses the quarantined log lines again, e.g. after the parser
+    or the `log_format` is fixed, and moves the lines which are parsed now into the log records.
+    """
+
+    help = (
+        "Parses the quarantined log lines again. The parsed lines are stored as log records "
+        "and removed from quarantine, the rest stay there."
+    )
+
+    def add_arguments(self, parser):  # pragma: no cover
+        """
+        Adds the source filter and the batching options to the command line parser.
+
+        Args:
+            parser (django.core.management.base.ArgumentParser): The command line parser.
+
+        Returns:
+            None
+        """
+        parser.add_argument(
+            "--source",
+            default=None,
+            help="Reprocess only the lines of this source (the absolute log file path or '-' for stdin)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="The number of lines to reprocess and store into DB at once",
+        )
+        parser.add_argument(
+            "--parser",
+            choices=LOG_PARSERS.keys(),
+            default="json",
+            help="Decode full JSON lines or only the fields being stored",
+        )
+
+    def handle(self, *args, **options):
+        """
+        Main function that reprocesses the quarantined lines by batches in the order they were quarantined.
+        Each batch of records is stored in the same DB transaction which removes its lines from quarantine.
+
+        Args:
+            *args: Variable length argument list.
+            **options: Arbitrary keyword arguments.
+
+        Returns:
+            None
+        """
+        parser = LOG_PARSERS[options.get("parser") or "json"]
+        batch_size = options.get("batch_size") or settings.LOG_BATCH_SIZE
+        queryset = QuarantinedLine.objects.order_by("pk")
+        if options.get("source") is not None:
+            queryset = queryset.filter(source=options["source"])
+
+        uris = UriInterner()
+        total = stored = 0
+        batch_number = 0
+        last_pk = 0
+        while lines := list(
+            queryset.filter(pk__gt=last_pk).values_list("pk", "text")[:batch_size]
+        ):
+            last_pk = lines[-1][0]
+            total += len(lines)
+            parsed = [(pk, parser(text)) for pk, text in lines]
+            parsed = [(pk, record) for pk, record in parsed if record is not None]
+            if not parsed:
+                continue
+
+            batch_number += 1
+            writer = BatchModelWriter[NginxLog](
+                NginxLog, batch_size, fields=NGINX_LOG_ROW_FIELDS
+            )
+            with transaction.atomic(using=router.db_for_write(NginxLog)):
+                rows = [uris.row(record) for _, record in parsed]
+                uris.flush()
+                for row in rows:
+                    writer.add(row)
+                writer.flush()
+                QuarantinedLine.objects.filter(pk__in=[pk for pk, _ in parsed]).delete()
+            stored += len(parsed)
+            self.stdout.write(f"Batch #{batch_number}: Stored {len(parsed)} records.")
+
+        self.stdout.write(
+            f"Reprocessed {total} quarantined lines: {stored} stored, {total - stored} still malformed."
+        )
@@ -0,0 +1,70 @@
+# Generated by Django 5.1.1 on 2026-10-18 08:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nginx_logs", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="nginxlog",
+            name="bytes_sent",
+            field=models.BigIntegerField(verbose_name="Bytes sent"),
+        ),
+        migrations.CreateModel(
+            name="ImportCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("device", models.BigIntegerField(verbose_name="Device")),
+                ("inode", models.BigIntegerField(verbose_name="Inode")),
+                (
+                    "first_block_size",
+                    models.IntegerField(verbose_name="First block size"),
+                ),
+                (
+                    "first_block_hash",
+                    models.CharField(max_length=64, verbose_name="First block SHA-256"),
+                ),
+                (
+                    "offset",
+                    models.BigIntegerField(default=0, verbose_name="Imported bytes"),
+                ),
+                (
+                    "line_number",
+                    models.BigIntegerField(default=0, verbose_name="Imported lines"),
+                ),
+                (
+                    "completed_size",
+                    models.BigIntegerField(
+                        blank=True,
+                        null=True,
+                        verbose_name="File size when imported completely",
+                    ),
+                ),
+                ("path", models.CharField(max_length=4096, verbose_name="Path")),
+                (
+                    "updated",
+                    models.DateTimeField(auto_now=True, verbose_name="Updated"),
+                ),
+            ],
+            options={
+                "verbose_name": "Import checkpoint",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("device", "inode"), name="unique_import_checkpoint_file"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 08:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nginx_logs", "0002_import_checkpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="nginxlog",
+            name="fingerprint",
+            field=models.BigIntegerField(
+                blank=True,
+                editable=False,
+                null=True,
+                unique=True,
+                verbose_name="Fingerprint",
+            ),
+        ),
+    ]
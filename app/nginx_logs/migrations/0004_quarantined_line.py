@@ -0,0 +1,53 @@
+# Generated by Django 5.1.1 on 2026-10-18 09:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nginx_logs", "0003_nginxlog_fingerprint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuarantinedLine",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source",
+                    models.CharField(
+                        db_index=True, max_length=4096, verbose_name="Source"
+                    ),
+                ),
+                (
+                    "line_number",
+                    models.BigIntegerField(
+                        blank=True, null=True, verbose_name="Line number"
+                    ),
+                ),
+                (
+                    "batch_number",
+                    models.IntegerField(
+                        blank=True, null=True, verbose_name="Batch number"
+                    ),
+                ),
+                ("reason", models.CharField(max_length=255, verbose_name="Reason")),
+                ("text", models.TextField(verbose_name="Line")),
+                (
+                    "created",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Quarantined"),
+                ),
+            ],
+            options={
+                "verbose_name": "Quarantined log line",
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-18 09:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nginx_logs", "0004_quarantined_line"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="nginxlog",
+            name="host",
+            field=models.TextField(blank=True, null=True, verbose_name="Host"),
+        ),
+        migrations.AddField(
+            model_name="nginxlog",
+            name="referer",
+            field=models.TextField(blank=True, null=True, verbose_name="Referer"),
+        ),
+        migrations.AddField(
+            model_name="nginxlog",
+            name="request_time",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Request time, s"
+            ),
+        ),
+        migrations.AddField(
+            model_name="nginxlog",
+            name="upstream_response_time",
+            field=models.FloatField(
+                blank=True, null=True, verbose_name="Upstream response time, s"
+            ),
+        ),
+        migrations.AddField(
+            model_name="nginxlog",
+            name="user_agent",
+            field=models.TextField(blank=True, null=True, verbose_name="User agent"),
+        ),
+    ]
@@ -0,0 +1,111 @@
+import hashlib
+from itertools import islice
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# The URIs stored at once
+BATCH_SIZE = 1000
+
+
+def uri_id(uri):
+    """The hash of a URI, a copy of `nginx_logs.utils.uri_interning.uri_id`."""
+    return int.from_bytes(
+        hashlib.blake2b(uri.encode(errors="surrogatepass"), digest_size=8).digest(),
+        "little",
+        signed=True,
+    )
+
+
+def intern_uris(apps, schema_editor):
+    NginxLog = apps.get_model("nginx_logs", "NginxLog")
+    Uri = apps.get_model("nginx_logs", "Uri")
+    db = schema_editor.connection.alias
+    # The hash is computed in Python, so the distinct URIs are read and stored by batches
+    uris = (
+        NginxLog.objects.using(db)
+        .order_by()
+        .values_list("uri", flat=True)
+        .distinct()
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    while batch := list(islice(uris, BATCH_SIZE)):
+        Uri.objects.using(db).bulk_create(
+            (Uri(id=uri_id(uri), value=uri) for uri in batch), ignore_conflicts=True
+        )
+
+    # The records refer to the URIs by one joined update instead of an update of each URI
+    quote = schema_editor.quote_name
+    log_table = quote(NginxLog._meta.db_table)
+    schema_editor.execute(
+        f"UPDATE {log_table} SET {quote('uri_ref_id')} = u.{quote('id')} "
+        f"FROM {quote(Uri._meta.db_table)} AS u WHERE u.{quote('value')} = {log_table}.{quote('uri')}"
+    )
+    # A URI having the hash of another one isn't stored, its records refer to the stored one
+    collided = (
+        NginxLog.objects.using(db)
+        .filter(uri__isnull=False, uri_ref__isnull=True)
+        .order_by()
+        .values_list("uri", flat=True)
+        .distinct()
+    )
+    for uri in list(collided):
+        NginxLog.objects.using(db).filter(uri=uri).update(uri_ref_id=uri_id(uri))
+
+
+def restore_uris(apps, schema_editor):
+    NginxLog = apps.get_model("nginx_logs", "NginxLog")
+    Uri = apps.get_model("nginx_logs", "Uri")
+    db = schema_editor.connection.alias
+    NginxLog.objects.using(db).update(
+        uri=models.Subquery(
+            Uri.objects.using(db)
+            .filter(pk=models.OuterRef("uri_ref_id"))
+            .values("value")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nginx_logs", "0005_nginxlog_optional_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Uri",
+            fields=[
+                (
+                    "id",
+                    models.BigIntegerField(
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Hash",
+                    ),
+                ),
+                ("value", models.CharField(max_length=8192, verbose_name="URI")),
+            ],
+            options={
+                "verbose_name": "URI",
+            },
+        ),
+        # The column is nullable until it's removed, so the migration can be reversed
+        migrations.AlterField(
+            model_name="nginxlog",
+            name="uri",
+            field=models.CharField(max_length=8192, null=True, verbose_name="URI"),
+        ),
+        migrations.AddField(
+            model_name="nginxlog",
+            name="uri_ref",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="nginx_logs.uri",
+                verbose_name="URI",
+            ),
+        ),
+        migrations.RunPython(intern_uris, restore_uris),
+    ]
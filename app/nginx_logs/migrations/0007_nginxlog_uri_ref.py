@@ -0,0 +1,31 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# The column is replaced in a separate migration, so the records referring to the URIs are
+# committed before the table is altered (PostgreSQL can't alter it with pending FK checks)
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nginx_logs", "0006_uri"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="nginxlog",
+            name="uri",
+        ),
+        migrations.RenameField(
+            model_name="nginxlog",
+            old_name="uri_ref",
+            new_name="uri",
+        ),
+        migrations.AlterField(
+            model_name="nginxlog",
+            name="uri",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.PROTECT,
+                to="nginx_logs.uri",
+                verbose_name="URI",
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+import nginx_logs.fields
+
+
+def encode_methods(apps, schema_editor):
+    NginxLog = apps.get_model("nginx_logs", "NginxLog")
+    db = schema_editor.connection.alias
+    for method in nginx_logs.fields.HTTP_METHODS[1:]:
+        NginxLog.objects.using(db).filter(method=method).update(method_code=method)
+    # Methods out of the list can't be coded, the records are kept with the unknown method
+    NginxLog.objects.using(db).filter(method_code__isnull=True).update(
+        method_code=nginx_logs.fields.HTTP_METHODS[0]
+    )
+
+
+def decode_methods(apps, schema_editor):
+    NginxLog = apps.get_model("nginx_logs", "NginxLog")
+    db = schema_editor.connection.alias
+    for method in nginx_logs.fields.HTTP_METHODS:
+        NginxLog.objects.using(db).filter(method_code=method).update(method=method)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nginx_logs", "0007_nginxlog_uri_ref"),
+    ]
+
+    operations = [
+        # The column is nullable until it's removed, so the migration can be reversed
+        migrations.AlterField(
+            model_name="nginxlog",
+            name="method",
+            field=models.CharField(
+                db_index=True, max_length=12, null=True, verbose_name="HTTP Method"
+            ),
+        ),
+        migrations.AddField(
+            model_name="nginxlog",
+            name="method_code",
+            field=nginx_logs.fields.HttpMethodField(
+                null=True, verbose_name="HTTP Method"
+            ),
+        ),
+        migrations.RunPython(encode_methods, decode_methods),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+import nginx_logs.fields
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nginx_logs", "0008_nginxlog_method_code"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="nginxlog",
+            name="method",
+        ),
+        migrations.RenameField(
+            model_name="nginxlog",
+            old_name="method_code",
+            new_name="method",
+        ),
+        migrations.AlterField(
+            model_name="nginxlog",
+            name="method",
+            field=nginx_logs.fields.HttpMethodField(
+                db_index=True, verbose_name="HTTP Method"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="nginxlog",
+            name="status",
+            field=models.SmallIntegerField(db_index=True, verbose_name="HTTP Status"),
+        ),
+    ]
@@ -0,0 +1,82 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+import nginx_logs.fields
+import nginx_logs.indexes
+
+
+def create_trigram_extension(apps, schema_editor):
+    # The trigram index of URIs needs pg_trgm, other databases get a plain index
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nginx_logs", "0009_compact_nginxlog"),
+    ]
+
+    operations = [
+        # The extension may be used by other apps, so it's kept when the migration is reversed
+        migrations.RunPython(create_trigram_extension, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="nginxlog",
+            name="date",
+            field=models.DateTimeField(verbose_name="Date"),
+        ),
+        migrations.AlterField(
+            model_name="nginxlog",
+            name="ip",
+            field=models.GenericIPAddressField(
+                unpack_ipv4=True, verbose_name="IP Address"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="nginxlog",
+            name="method",
+            field=nginx_logs.fields.HttpMethodField(verbose_name="HTTP Method"),
+        ),
+        migrations.AlterField(
+            model_name="nginxlog",
+            name="status",
+            field=models.SmallIntegerField(verbose_name="HTTP Status"),
+        ),
+        migrations.AlterField(
+            model_name="nginxlog",
+            name="uri",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.PROTECT,
+                to="nginx_logs.uri",
+                verbose_name="URI",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="nginxlog",
+            index=nginx_logs.indexes.PortableBrinIndex(
+                fields=["date"], name="nginx_log_date_brin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="nginxlog",
+            index=models.Index(
+                fields=["status", "date"], name="nginx_log_status_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="nginxlog",
+            index=models.Index(
+                fields=["method", "date"], name="nginx_log_method_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="nginxlog",
+            index=models.Index(fields=["uri", "date"], name="nginx_log_uri_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="uri",
+            index=nginx_logs.indexes.UpperTrigramIndex(
+                "value", name="nginx_uri_value_trgm"
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.1 on 2026-10-18 10:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("nginx_logs", "0010_query_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportShardCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("number", models.IntegerField(verbose_name="Shard number")),
+                ("start", models.BigIntegerField(verbose_name="First unimported byte")),
+                ("end", models.BigIntegerField(verbose_name="Shard end")),
+                (
+                    "first_line_number",
+                    models.BigIntegerField(verbose_name="First unimported line"),
+                ),
+                (
+                    "checkpoint",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shards",
+                        to="nginx_logs.importcheckpoint",
+                        verbose_name="Checkpoint",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Import shard checkpoint",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("checkpoint", "number"),
+                        name="unique_import_shard_checkpoint",
+                    )
+                ],
+            },
+        ),
+    ]
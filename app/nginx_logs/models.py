@@ -1,32 +1,71 @@
 from django.db import models
 
+from .fields import HttpMethodField
+from .indexes import PortableBrinIndex, UpperTrigramIndex
+
 
 # Create your models here.
 
 
+class Uri(models.Model):
+    """A distinct request URI, its primary key is the hash of the URI (see `uri_interning` module)."""
+
+    id: models.BigIntegerField = models.BigIntegerField(
+        verbose_name="Hash", primary_key=True, editable=False
+    )
+    value: models.CharField = models.CharField(verbose_name="URI", max_length=8 * 1024)
+
+    def __str__(self) -> str:
+        return self.value
+
+    class Meta:
+        verbose_name = "URI"
+        # URIs are searched by substrings
+        indexes = (UpperTrigramIndex("value", name="nginx_uri_value_trgm"),)
+
+
 class NginxLog(models.Model):
     """A log record model."""
 
+    # The fields are indexed by Meta.indexes, as the API queries them
     ip: models.GenericIPAddressField = models.GenericIPAddressField(
         verbose_name="IP Address",
         unpack_ipv4=True,
         blank=False,
         null=False,
-        db_index=True,
     )
     date: models.DateTimeField = models.DateTimeField(
-        verbose_name="Date", blank=False, null=False, db_index=True
-    )
-    method: models.CharField = models.CharField(
-        verbose_name="HTTP Method", max_length=12, db_index=True
+        verbose_name="Date", blank=False, null=False
     )
-    uri: models.CharField = models.CharField(
-        verbose_name="URI", max_length=8 * 1024, db_index=True
+    method: HttpMethodField = HttpMethodField(verbose_name="HTTP Method")
+    # Records refer to the URIs, so the index holds 8-byte keys instead of the URIs themselves
+    uri: models.ForeignKey = models.ForeignKey(
+        Uri, verbose_name="URI", on_delete=models.PROTECT, db_index=False
     )
-    status: models.IntegerField = models.IntegerField(
-        verbose_name="HTTP Status", db_index=True
+    status: models.SmallIntegerField = models.SmallIntegerField(
+        verbose_name="HTTP Status"
     )
     bytes_sent: models.IntegerField = models.BigIntegerField(verbose_name="Bytes sent")
+    # Optional fields, they are stored only if the log format has them (see LOG_FIELD_MAPPING setting)
+    request_time: models.FloatField = models.FloatField(
+        verbose_name="Request time, s", null=True, blank=True
+    )
+    upstream_response_time: models.FloatField = models.FloatField(
+        verbose_name="Upstream response time, s", null=True, blank=True
+    )
+    user_agent: models.TextField = models.TextField(
+        verbose_name="User agent", null=True, blank=True
+    )
+    referer: models.TextField = models.TextField(
+        verbose_name="Referer", null=True, blank=True
+    )
+    host: models.TextField = models.TextField(
+        verbose_name="Host", null=True, blank=True
+    )
+    # A hash of the line or of the record, only duplicates of fingerprinted records are rejected
+    fingerprint: models.BigIntegerField = models.BigIntegerField(
+        verbose_name="Fingerprint", null=True, blank=True, unique=True, editable=False
+    )
 
     def __str__(self) -> str:
         return f"{self.date} {self.ip} -> {self.method} {self.uri} ({self.status}) - {self.bytes_sent} bytes"
@@ -34,3 +73,105 @@ class NginxLog(models.Model):
     class Meta:
         verbose_name = "Nginx log record"
         ordering = ("-date",)
+        # The API lists the latest records filtered by a method, a URI or a status,
+        # the composite indexes give them in the order of the date. Records are appended
+        # in the order of the date, so a BRIN index selects a date range at a small cost of inserts
+        indexes = (
+            PortableBrinIndex(fields=("date",), name="nginx_log_date_brin"),
+            models.Index(fields=("status", "date"), name="nginx_log_status_date_idx"),
+            models.Index(fields=("method", "date"), name="nginx_log_method_date_idx"),
+            models.Index(fields=("uri", "date"), name="nginx_log_uri_date_idx"),
+        )
+
+
+class ImportCheckpoint(models.Model):
+    """The imported part of a log file, it's stored with the records of the imported batches."""
+
+    device: models.BigIntegerField = models.BigIntegerField(verbose_name="Device")
+    inode: models.BigIntegerField = models.BigIntegerField(verbose_name="Inode")
+    first_block_size: models.IntegerField = models.IntegerField(
+        verbose_name="First block size"
+    )
+    first_block_hash: models.CharField = models.CharField(
+        verbose_name="First block SHA-256", max_length=64
+    )
+    offset: models.BigIntegerField = models.BigIntegerField(
+        verbose_name="Imported bytes", default=0
+    )
+    line_number: models.BigIntegerField = models.BigIntegerField(
+        verbose_name="Imported lines", default=0
+    )
+    completed_size: models.BigIntegerField = models.BigIntegerField(
+        verbose_name="File size when imported completely", null=True, blank=True
+    )
+    path: models.CharField = models.CharField(verbose_name="Path", max_length=4096)
+    updated: models.DateTimeField = models.DateTimeField(
+        verbose_name="Updated", auto_now=True
+    )
+
+    def __str__(self) -> str:
+        return f"{self.path}: {self.line_number} lines, {self.offset} bytes"
+
+    class Meta:
+        verbose_name = "Import checkpoint"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("device", "inode"), name="unique_import_checkpoint_file"
+            )
+        ]
+
+
+class ImportShardCheckpoint(models.Model):
+    """The unimported part of a shard of a file imported by several processes, it's stored
+    with the records of the batches of the shard."""
+
+    checkpoint: models.ForeignKey = models.ForeignKey(
+        ImportCheckpoint,
+        verbose_name="Checkpoint",
+        on_delete=models.CASCADE,
+        related_name="shards",
+    )
+    number: models.IntegerField = models.IntegerField(verbose_name="Shard number")
+    start: models.BigIntegerField = models.BigIntegerField(
+        verbose_name="First unimported byte"
+    )
+    end: models.BigIntegerField = models.BigIntegerField(verbose_name="Shard end")
+    first_line_number: models.BigIntegerField = models.BigIntegerField(
+        verbose_name="First unimported line"
+    )
+
+    def __str__(self) -> str:
+        return f"Shard #{self.number}: bytes {self.start}-{self.end}"
+
+    class Meta:
+        verbose_name = "Import shard checkpoint"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("checkpoint", "number"), name="unique_import_shard_checkpoint"
+            )
+        ]
+
+
+class QuarantinedLine(models.Model):
+    """A log line rejected by the parser, it's kept to be imported again when the parser is fixed."""
+
+    source: models.CharField = models.CharField(
+        verbose_name="Source", max_length=4096, db_index=True
+    )
+    line_number: models.BigIntegerField = models.BigIntegerField(
+        verbose_name="Line number", null=True, blank=True
+    )
+    batch_number: models.IntegerField = models.IntegerField(
+        verbose_name="Batch number", null=True, blank=True
+    )
+    reason: models.CharField = models.CharField(verbose_name="Reason", max_length=255)
+    text: models.TextField = models.TextField(verbose_name="Line")
+    created: models.DateTimeField = models.DateTimeField(
+        verbose_name="Quarantined", auto_now_add=True
+    )
+
+    def __str__(self) -> str:
+        return f"{self.source}:{self.line_number}: {self.reason}"
+
+    class Meta:
+        verbose_name = "Quarantined log line"
@@ -1,13 +1,107 @@
-from .json_log_parsing import parse_json_log_record
-from .log_importer import LogImporter, flushed_signal, line_parsed_signal, malformed_line_signal
+from .checkpoints import FileCheckpoint
+from .field_mapping import (
+    FIELD_CONVERTERS,
+    CompiledFieldMapping,
+    compile_field_mapping,
+    register_field_converter,
+)
+from .fingerprints import (
+    FINGERPRINTS,
+    RecentFingerprints,
+    line_fingerprint,
+    record_fingerprint,
+)
+from .json_backends import (
+    JSON_BACKENDS,
+    JsonBackend,
+    get_json_backend,
+    register_json_backend,
+)
+from .json_log_parsing import (
+    malformed_line_reason,
+    parse_json_log_record,
+    parse_json_log_records,
+    parse_projected_json_log_record,
+)
+from .log_importer import (
+    LogImporter,
+    batch_parsed_signal,
+    flushed_signal,
+    line_parsed_signal,
+    malformed_line_signal,
+)
+from .log_files import detect_compression, expand_log_paths, open_log_file
+from .log_reading import follow_lines, iter_binary_lines
 from .log_types import LogRecord
+from .ndjson_stream import (
+    MalformedStream,
+    NdjsonLines,
+    NdjsonStreamError,
+    StreamTooLarge,
+)
+from .partitions import (
+    PARTITION_INTERVALS,
+    LogPartition,
+    LogPartitions,
+    partition_name,
+)
+from .retention import PURGE_CHUNK_SIZE, delete_records_before, parse_age
+from .sharded_import import import_file_sharded, make_shards, merge_shard_stats
+from .uri_interning import NGINX_LOG_ROW_FIELDS, UriInterner, uri_id
+from .syslog_listener import (
+    SyslogBatchStorer,
+    SyslogProtocol,
+    strip_syslog_header,
+)
 
 
 __all__ = [
     "parse_json_log_record",
+    "parse_json_log_records",
+    "parse_projected_json_log_record",
+    "malformed_line_reason",
+    "FIELD_CONVERTERS",
+    "CompiledFieldMapping",
+    "compile_field_mapping",
+    "register_field_converter",
+    "JSON_BACKENDS",
+    "JsonBackend",
+    "get_json_backend",
+    "register_json_backend",
+    "iter_binary_lines",
+    "follow_lines",
+    "NdjsonLines",
+    "NdjsonStreamError",
+    "StreamTooLarge",
+    "MalformedStream",
+    "detect_compression",
+    "expand_log_paths",
+    "open_log_file",
     "LogImporter",
     "LogRecord",
+    "FileCheckpoint",
+    "FINGERPRINTS",
+    "RecentFingerprints",
+    "line_fingerprint",
+    "record_fingerprint",
+    "PARTITION_INTERVALS",
+    "LogPartition",
+    "LogPartitions",
+    "partition_name",
+    "PURGE_CHUNK_SIZE",
+    "delete_records_before",
+    "parse_age",
+    "import_file_sharded",
+    "make_shards",
+    "merge_shard_stats",
+    "NGINX_LOG_ROW_FIELDS",
+    "UriInterner",
+    "uri_id",
+    "SyslogBatchStorer",
+    "SyslogProtocol",
+    "strip_syslog_header",
     "line_parsed_signal",
     "malformed_line_signal",
+    "batch_parsed_signal",
     "flushed_signal",
 ]
@@ -0,0 +1,192 @@
+import hashlib
+import os
+from collections.abc import Callable
+from functools import partial
+
+from nginx_logs.models import ImportCheckpoint, ImportShardCheckpoint
+
+from .sharded_import import FileShard
+
+
+FIRST_BLOCK_SIZE = 4096
+
+
+class FileCheckpoint:
+    """
+    The persisted position of a log file import.
+
+    A file is identified by its device and inode, and the hash of its first block tells
+    a rotated or rewritten file from the one imported before. Checking whether the file
+    is imported completely takes one indexed query and reading of the first block.
+
+    A file imported by several processes keeps the unimported part of each shard instead
+    of one position (see `save_shards` and `shard_committer`), and the shards are resumed separately.
+
+    Args:
+        path (str): Path to a log file.
+        compressed (bool): Whether offsets are positions in the decompressed data,
+            so they can't be compared with the file size.
+
+    Attributes:
+        offset (property): The number of imported bytes.
+        line_number (property): The number of imported lines.
+        is_complete (property): Whether the file is not changed since its complete import.
+        shards (property): The unimported parts of the shards of an interrupted parallel import.
+    """
+
+    def __init__(self, path: str, compressed: bool = False) -> None:
+        with open(path, "rb") as file:
+            file_stat = os.fstat(file.fileno())
+            first_block = file.read(FIRST_BLOCK_SIZE)
+        self.__compressed = compressed
+        self.__size = file_stat.st_size
+        self.__stale_shards = False
+
+        checkpoint = ImportCheckpoint.objects.filter(
+            device=file_stat.st_dev, inode=file_stat.st_ino
+        ).first()
+        if checkpoint is None or not self.__is_same_file(checkpoint, first_block):
+            # The inode is reused by another file
+            checkpoint = checkpoint or ImportCheckpoint(
+                device=file_stat.st_dev, inode=file_stat.st_ino
+            )
+            self.__reset(checkpoint)
+        elif not compressed and checkpoint.offset > self.__size:
+            # The file is truncated and written again
+            self.__reset(checkpoint)
+        checkpoint.path = path
+        checkpoint.first_block_size = len(first_block)
+        checkpoint.first_block_hash = hashlib.sha256(first_block).hexdigest()
+        self.__checkpoint = checkpoint
+        self.__shards = (
+            [
+                FileShard(shard.number, shard.start, shard.end, shard.first_line_number)
+                for shard in checkpoint.shards.order_by("number")
+            ]
+            if checkpoint.pk is not None and not self.__stale_shards
+            else []
+        )
+
+    def __reset(self, checkpoint: ImportCheckpoint) -> None:
+        """Forget the position of the file imported before."""
+        checkpoint.offset = 0
+        checkpoint.line_number = 0
+        checkpoint.completed_size = None
+        # The shards of the previous file are deleted with the next saved position
+        self.__stale_shards = checkpoint.pk is not None
+
+    @staticmethod
+    def __is_same_file(checkpoint: ImportCheckpoint, first_block: bytes) -> bool:
+        """Compare the start of the file with the hash of the start of the imported file."""
+        if checkpoint.first_block_size > len(first_block):
+            return False
+        return (
+            hashlib.sha256(first_block[: checkpoint.first_block_size]).hexdigest()
+            == checkpoint.first_block_hash
+        )
+
+    @property
+    def offset(self) -> int:
+        """The number of imported bytes."""
+        return self.__checkpoint.offset
+
+    @property
+    def line_number(self) -> int:
+        """The number of imported lines."""
+        return self.__checkpoint.line_number
+
+    @property
+    def is_complete(self) -> bool:
+        """Whether the file is not changed since its complete import."""
+        return self.__checkpoint.completed_size == self.__size
+
+    @property
+    def shards(self) -> list[FileShard]:
+        """The unimported parts of the shards of an interrupted parallel import."""
+        return [shard for shard in self.__shards if shard.start < shard.end]
+
+    def save_shards(self, shards: list[FileShard]) -> None:
+        """
+        Save the shards of a parallel import before it's started.
+
+        Args:
+            shards (list[FileShard]): The shards of the file.
+        """
+        self.__save()
+        ImportShardCheckpoint.objects.bulk_create(
+            ImportShardCheckpoint(
+                checkpoint=self.__checkpoint,
+                number=shard.number,
+                start=shard.start,
+                end=shard.end,
+                first_line_number=shard.first_line_number,
+            )
+            for shard in shards
+        )
+        self.__shards = list(shards)
+
+    def shard_committer(self) -> Callable[[FileShard, int, int], None]:
+        """
+        Make a function saving the position of a shard import, it's called in the transaction
+        storing the records of the shard. The function is picklable, so it's sent to worker processes.
+
+        Returns:
+            Callable: A function called with a shard and the numbers of bytes and lines
+            of the shard imported so far.
+        """
+        return partial(_commit_shard, self.__checkpoint.pk)
+
+    def complete_shards(self) -> None:
+        """Save the position of the parallel import which has imported all the shards."""
+        shards = list(self.__checkpoint.shards.order_by("number"))
+        last_shard = shards[-1]
+        self.complete(last_shard.end, last_shard.first_line_number - 1)
+
+    def commit(self, offset: int, line_number: int) -> None:
+        """
+        Save the position of the import. Call it in the transaction storing the imported records.
+
+        Args:
+            offset (int): The number of imported bytes.
+            line_number (int): The number of imported lines.
+        """
+        self.__checkpoint.offset = offset
+        self.__checkpoint.line_number = line_number
+        self.__checkpoint.completed_size = None
+        self.__save()
+
+    def complete(self, offset: int, line_number: int) -> None:
+        """
+        Save the position of the import reached the end of the file.
+
+        Args:
+            offset (int): The number of imported bytes.
+            line_number (int): The number of imported lines.
+        """
+        self.__checkpoint.offset = offset
+        self.__checkpoint.line_number = line_number
+        # A plain file may grow while it's imported, so only the read part is complete
+        self.__checkpoint.completed_size = self.__size if self.__compressed else offset
+        self.__checkpoint.save()
+        self.__checkpoint.shards.all().delete()
+        self.__shards = []
+        self.__stale_shards = False
+
+    def __save(self) -> None:
+        """Save the position deleting the shards of the previous file."""
+        self.__checkpoint.save()
+        if self.__stale_shards:
+            self.__checkpoint.shards.all().delete()
+            self.__stale_shards = False
+
+
+def _commit_shard(
+    checkpoint_id: int, shard: FileShard, bytes_parsed: int, lines_parsed: int
+) -> None:
+    """Save the unimported part of a shard, see `FileCheckpoint.shard_committer`."""
+    ImportShardCheckpoint.objects.filter(
+        checkpoint_id=checkpoint_id, number=shard.number
+    ).update(
+        start=shard.start + bytes_parsed,
+        first_line_number=shard.first_line_number + lines_parsed,
+    )
@@ -0,0 +1,236 @@
+from collections.abc import Callable, Mapping, Sequence
+from datetime import datetime
+from typing import Any, NamedTuple
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from .log_types import REQUIRED_LOG_RECORD_FIELDS, LogRecord
+
+
+# The mapped column which fills both `method` and `uri` of a record, its converter returns ParsedRequest
+REQUEST_COLUMN = "request"
+
+# Columns which may be mapped to the keys of log lines, the rest of LogRecord fields are optional
+REQUIRED_COLUMNS = ("ip", "date", REQUEST_COLUMN, "status", "bytes_sent")
+OPTIONAL_COLUMNS = LogRecord._fields[len(REQUIRED_LOG_RECORD_FIELDS) :]
+
+# The converter passing values as they are decoded, it costs nothing
+RAW_CONVERTER = "raw"
+
+# The fields of the default nginx JSON log format, other columns aren't stored unless they're mapped
+DEFAULT_FIELD_MAPPING = {
+    "ip": ("remote_ip", RAW_CONVERTER),
+    "date": ("time", "time_local"),
+    "request": ("request", "request_line"),
+    "status": ("response", "http_status"),
+    "bytes_sent": ("bytes", RAW_CONVERTER),
+}
+
+# Values which nginx writes for an empty variable
+_NO_VALUE = ("", "-")
+
+FIELD_CONVERTERS: dict[str, Callable[[Any], Any]] = {}
+
+
+def register_field_converter(name: str, converter: Callable[[Any], Any]) -> None:
+    """Add a converter of log values into the registry (or replace a converter with the same name).
+
+    A converter raises ValueError or TypeError if the value is malformed, then the line is rejected.
+
+    Args:
+        name (str): The converter name used in field mappings.
+        converter (Callable): A function converting a decoded JSON value.
+    """
+    FIELD_CONVERTERS[name] = converter
+
+
+def raw_value(value: Any) -> Any:
+    """Pass a value as it is decoded."""
+    return value
+
+
+def to_str(value: Any) -> str | None:
+    """Convert a value to a string, an empty one is None."""
+    if value in _NO_VALUE:
+        return None
+    return value if type(value) is str else str(value)
+
+
+def to_int(value: Any) -> int | None:
+    """Convert a number or a numeric string (e.g. a quoted `$status`) to an integer."""
+    if type(value) is int:
+        return value
+    if value in _NO_VALUE:
+        return None
+    return int(value)
+
+
+def to_float(value: Any) -> float | None:
+    """Convert a number or a numeric string (e.g. a quoted `$request_time`) to a float."""
+    if type(value) is float:
+        return value
+    if value in _NO_VALUE:
+        return None
+    return float(value)
+
+
+def to_seconds(value: Any) -> float | None:
+    """Convert a time like `$upstream_response_time` to seconds.
+
+    Times of several upstream servers (`0.010, 0.002 : 0.001`) are summed,
+    the servers which haven't responded (`-`) are skipped.
+    """
+    if type(value) is str and ("," in value or ":" in value):
+        times = [to_float(part.strip()) for part in value.replace(":", ",").split(",")]
+        return sum(time for time in times if time is not None)
+    return to_float(value)
+
+
+def to_iso_datetime(value: Any) -> datetime:
+    """Parse a `$time_iso8601` timestamp."""
+    return datetime.fromisoformat(value)
+
+
+register_field_converter(RAW_CONVERTER, raw_value)
+register_field_converter("str", to_str)
+register_field_converter("int", to_int)
+register_field_converter("float", to_float)
+register_field_converter("seconds", to_seconds)
+register_field_converter("time_iso8601", to_iso_datetime)
+
+
+class CompiledFieldMapping(NamedTuple):
+    """
+    A field mapping compiled to functions making log records.
+
+    The functions are generated for the mapping, so making a record costs only the lookups
+    of the line keys and the calls of the converters, the mapping itself isn't looked up.
+    They raise KeyError (`from_dict` only) if a required key is missing, and ValueError or TypeError
+    if a value is malformed. They return None if the request line is malformed.
+
+    :ivar required_keys: Keys every log line must have
+    :ivar optional_keys: Keys of the optional columns, they are None if a line lacks them
+    :ivar columns: Column name, key and converter of each mapped column
+    :ivar from_dict: A function making a LogRecord of a decoded log line
+    :ivar from_values: A function making a LogRecord of the values of `keys`
+    """
+
+    required_keys: tuple[str, ...]
+    optional_keys: tuple[str, ...]
+    columns: tuple[tuple[str, str, Callable[[Any], Any]], ...]
+    from_dict: Callable[[dict], LogRecord | None]
+    from_values: Callable[..., LogRecord | None]
+
+    @property
+    def keys(self) -> tuple[str, ...]:
+        """tuple[str, ...]: Returns the keys in the order of `from_values` arguments."""
+        return self.required_keys + self.optional_keys
+
+
+def compile_field_mapping(
+    mapping: Mapping[str, Sequence[str] | None],
+) -> CompiledFieldMapping:
+    """Compile a mapping of log record columns to the keys of log lines.
+
+    Args:
+        mapping (Mapping): Maps a column (`ip`, `date`, `request` for `method` and `uri`, `status`,
+            `bytes_sent` or an optional LogRecord field) to a pair of a log line key and a converter name
+            (see `FIELD_CONVERTERS`) or a dotted path to a converter function.
+            Optional columns may be mapped to None or omitted to be always None.
+
+    Returns:
+        CompiledFieldMapping named tuple.
+
+    Raises:
+        ImproperlyConfigured: If the mapping is invalid.
+    """
+    unknown = [
+        column
+        for column in mapping
+        if column not in REQUIRED_COLUMNS and column not in OPTIONAL_COLUMNS
+    ]
+    if unknown:
+        raise ImproperlyConfigured(f"Unknown log record columns: {', '.join(unknown)}")
+    unmapped = [column for column in REQUIRED_COLUMNS if mapping.get(column) is None]
+    if unmapped:
+        raise ImproperlyConfigured(
+            f"Log record columns must be mapped: {', '.join(unmapped)}"
+        )
+
+    columns = []
+    for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS:
+        column_mapping = mapping.get(column)
+        if column_mapping is None:
+            continue
+        try:
+            key, converter_name = column_mapping
+        except (TypeError, ValueError):
+            raise ImproperlyConfigured(
+                f"The mapping of {column} must be a pair of a key and a converter name"
+            ) from None
+        try:
+            if type(key) is not str:
+                raise ValueError("the key must be a string")
+            converter = FIELD_CONVERTERS.get(converter_name) or import_string(
+                converter_name
+            )
+        except (AttributeError, ImportError, TypeError, ValueError) as error:
+            raise ImproperlyConfigured(
+                f"Invalid mapping of {column}: {key!r}, {converter_name!r} ({error})"
+            ) from None
+        columns.append((column, key, converter_name, converter))
+
+    required_keys = tuple(
+        dict.fromkeys(key for column, key, *_ in columns if column in REQUIRED_COLUMNS)
+    )
+    optional_keys = tuple(
+        dict.fromkeys(key for _, key, *_ in columns if key not in required_keys)
+    )
+    keys = required_keys + optional_keys
+    arguments = {key: f"value_{i}" for i, key in enumerate(keys)}
+
+    namespace: dict[str, Any] = {"LogRecord": LogRecord}
+    statements = []
+    fields: dict[str, str] = {}
+    for i, (column, key, converter_name, converter) in enumerate(columns):
+        argument = arguments[key]
+        expression = argument
+        if converter_name != RAW_CONVERTER:
+            namespace[f"convert_{i}"] = converter
+            expression = f"convert_{i}({argument})"
+        if column == REQUEST_COLUMN:
+            statements += [
+                f"request = {expression}",
+                "if request is None:",
+                "    return None",
+            ]
+            fields["method"] = "request[0]"
+            fields["uri"] = "request[1]"
+        elif column in REQUIRED_COLUMNS or converter_name == RAW_CONVERTER:
+            fields[column] = expression
+        else:
+            fields[column] = f"None if {argument} is None else {expression}"
+    record = ", ".join(fields.get(field, "None") for field in LogRecord._fields)
+    statements.append(f"return LogRecord({record})")
+
+    lookups = [f"{arguments[key]} = item[{key!r}]" for key in required_keys] + [
+        f"{arguments[key]} = item.get({key!r})" for key in optional_keys
+    ]
+    source = "\n".join(
+        [
+            f"def from_values({', '.join(arguments.values())}):",
+            *(f"    {statement}" for statement in statements),
+            "def from_dict(item):",
+            *(f"    {statement}" for statement in lookups + statements),
+        ]
+    )
+    exec(compile(source, "<log field mapping>", "exec"), namespace)
+
+    return CompiledFieldMapping(
+        required_keys,
+        optional_keys,
+        tuple((column, key, converter) for column, key, _, converter in columns),
+        namespace["from_dict"],
+        namespace["from_values"],
+    )
@@ -0,0 +1,96 @@
+import hashlib
+from collections.abc import Callable
+
+from .log_types import REQUIRED_LOG_RECORD_FIELDS, LogLine, LogRecord
+
+
+# The number of the latest fingerprints remembered by one generation of RecentFingerprints
+RECENT_FINGERPRINTS = 100_000
+
+
+def _digest(data: bytes | memoryview) -> int:
+    """Hash data to a signed 64-bit integer, so it fits a `BigIntegerField`."""
+    return int.from_bytes(
+        hashlib.blake2b(data, digest_size=8).digest(), "little", signed=True
+    )
+
+
+def line_fingerprint(line: LogLine, record: LogRecord) -> int:
+    """Fingerprint of a raw log line without its line ending.
+
+    Args:
+        line (str | bytes | memoryview): The log line.
+        record (LogRecord): The parsed record, it's not used.
+
+    Returns:
+        A 64-bit hash.
+    """
+    if isinstance(line, str):
+        line = line.encode()
+    end = len(line)
+    while end and line[end - 1] in b"\r\n":
+        end -= 1
+    return _digest(line[:end])
+
+
+def record_fingerprint(line: LogLine, record: LogRecord) -> int:
+    """Fingerprint of the stored fields of a parsed record.
+
+    Unlike `line_fingerprint` it doesn't depend on the fields which aren't stored,
+    and on the formatting of the line. The optional fields aren't hashed either, so the records
+    imported before they were captured have the same fingerprints.
+
+    Args:
+        line (str | bytes | memoryview): The log line, it's not used.
+        record (LogRecord): The parsed record.
+
+    Returns:
+        A 64-bit hash.
+    """
+    return _digest(
+        "\x1f".join(map(str, record[: len(REQUIRED_LOG_RECORD_FIELDS)])).encode()
+    )
+
+
+FINGERPRINTS: dict[str, Callable[[LogLine, LogRecord], int]] = {
+    "line": line_fingerprint,
+    "record": record_fingerprint,
+}
+
+
+class RecentFingerprints:
+    """
+    An exact set of the recently seen fingerprints with bounded memory.
+
+    Fingerprints are kept in two generations. When the current one is full, the previous one
+    is dropped, so at least `capacity` latest fingerprints are always remembered.
+    There are no false positives, so only real duplicates are dropped before they reach DB.
+
+    Args:
+        capacity (int): The number of fingerprints in one generation.
+    """
+
+    def __init__(self, capacity: int = RECENT_FINGERPRINTS) -> None:
+        self.__capacity = capacity
+        self.__current: set[int] = set()
+        self.__previous: set[int] = set()
+
+    def seen(self, fingerprint: int) -> bool:
+        """
+        Check whether the fingerprint is seen recently and remember it.
+
+        Args:
+            fingerprint (int): The fingerprint.
+
+        Returns:
+            bool: True if the fingerprint is seen before.
+        """
+        if fingerprint in self.__current:
+            return True
+        seen = fingerprint in self.__previous
+        if len(self.__current) >= self.__capacity:
+            self.__previous = self.__current
+            self.__current = set()
+        # A fingerprint seen again is kept for the next generation too
+        self.__current.add(fingerprint)
+        return seen
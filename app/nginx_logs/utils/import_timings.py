@@ -0,0 +1,125 @@
+import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, TypeVar
+
+
+Result = TypeVar("Result")
+
+# The time of making records isn't measured directly, it's the rest of the line processing time
+MEASURED_STAGES = ("read", "line", "parse", "store", "flush")
+
+
+class ImportTimings:
+    """
+    Accumulates the time spent by a log import in its stages, in total and in the current batch.
+
+    The stages are reading lines (`read`), parsing them (`parse`), making records and fingerprints
+    (`build`) and passing them to the writer (`store`, it includes storing the full batches unless
+    they're stored by the writer threads). A measured function costs two `perf_counter` calls,
+    so the importer wraps its callables only when the timings are requested.
+    """
+
+    def __init__(self) -> None:
+        self.__started = time.perf_counter()
+        self.__seconds = dict.fromkeys(MEASURED_STAGES, 0.0)
+        self.__batch_seconds = dict.fromkeys(MEASURED_STAGES, 0.0)
+
+    def timed(
+        self, stage: str, function: Callable[..., Result]
+    ) -> Callable[..., Result]:
+        """
+        Wrap a function to add its time to a stage.
+
+        Args:
+            stage (str): The stage name.
+            function (Callable): The function.
+
+        Returns:
+            Callable: The measured function.
+        """
+        seconds = self.__seconds
+        perf_counter = time.perf_counter
+
+        def timed_function(*args: Any) -> Result:
+            started = perf_counter()
+            try:
+                return function(*args)
+            finally:
+                elapsed = perf_counter() - started
+                seconds[stage] += elapsed
+                self.__batch_seconds[stage] += elapsed
+
+        return timed_function
+
+    def timed_iter(self, stage: str, iterable: Iterable[Result]) -> Iterator[Result]:
+        """
+        Iterate measuring the time of getting the next item, e.g. reading the next line.
+
+        Args:
+            stage (str): The stage name.
+            iterable (Iterable): The iterable.
+
+        Yields:
+            The items of the iterable.
+        """
+        seconds = self.__seconds
+        perf_counter = time.perf_counter
+        iterator = iter(iterable)
+        while True:
+            started = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed = perf_counter() - started
+                seconds[stage] += elapsed
+                self.__batch_seconds[stage] += elapsed
+            yield item
+
+    @property
+    def elapsed(self) -> float:
+        """float: Returns the time since the timings were started in seconds."""
+        return time.perf_counter() - self.__started
+
+    def batch_timings(self) -> dict[str, float]:
+        """
+        Take the stage timings of the current batch and start the next one.
+
+        Returns:
+            dict: The seconds spent by each stage in the batch.
+        """
+        timings = _stage_timings(self.__batch_seconds)
+        self.__batch_seconds = dict.fromkeys(MEASURED_STAGES, 0.0)
+        return timings
+
+    def as_dict(self, lines: int, size: int) -> dict[str, Any]:
+        """
+        Summarize the timings.
+
+        Args:
+            lines (int): The number of lines processed so far.
+            size (int): The size of the lines in bytes.
+
+        Returns:
+            dict: A dictionary containing the elapsed time, the seconds spent by each stage,
+                and the lines and bytes processed per second.
+        """
+        elapsed = self.elapsed
+        return {
+            "elapsed": elapsed,
+            "stages": _stage_timings(self.__seconds),
+            "lines_per_sec": lines / elapsed if elapsed else 0.0,
+            "bytes_per_sec": size / elapsed if elapsed else 0.0,
+        }
+
+
+def _stage_timings(seconds: dict[str, float]) -> dict[str, float]:
+    """Get the reported stages from the measured ones."""
+    build = seconds["line"] - seconds["parse"] - seconds["store"]
+    return {
+        "read": seconds["read"],
+        "parse": seconds["parse"],
+        "build": max(build, 0.0),
+        "store": seconds["store"] + seconds["flush"],
+    }
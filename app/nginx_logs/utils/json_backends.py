@@ -0,0 +1,144 @@
+import json
+from collections.abc import Callable, Sequence
+from types import ModuleType
+from typing import Any, NamedTuple
+
+
+class JsonBackend(NamedTuple):
+    """
+    Describes a JSON decoding library usable for log parsing.
+
+    :ivar name: Backend name used in the registry
+    :ivar loads: A function decoding one JSON document from str, bytes or memoryview
+    :ivar errors: Exception types raised by `loads` on malformed input
+    """
+
+    name: str
+    loads: Callable[[str | bytes | memoryview], Any]
+    errors: tuple[type[Exception], ...]
+
+
+def json_loads(data: str | bytes | memoryview) -> Any:
+    """The standard `json.loads` which accepts memoryview too."""
+    if type(data) is memoryview:
+        data = data.tobytes()
+    return json.loads(data)
+
+
+STDLIB_JSON_BACKEND = JsonBackend(
+    "json", json_loads, (json.JSONDecodeError, UnicodeDecodeError)
+)
+
+# Backends are tried in this order when no explicit choice was made
+PREFERRED_JSON_BACKENDS = ("orjson", "msgspec", "simdjson", "json")
+
+JSON_BACKENDS: dict[str, JsonBackend] = {}
+
+
+def register_json_backend(backend: JsonBackend) -> None:
+    """Add a backend into the registry (or replace a backend with the same name).
+
+    Args:
+        backend (JsonBackend): The backend description.
+    """
+    JSON_BACKENDS[backend.name] = backend
+
+
+def get_json_backend(name: str | None = None) -> JsonBackend:
+    """Get a registered backend by name.
+
+    Args:
+        name (str | None): Backend name. If omitted, the fastest installed backend is chosen.
+
+    Returns:
+        JsonBackend named tuple.
+
+    Raises:
+        KeyError: If the backend with such name is not installed.
+    """
+    if name is not None:
+        return JSON_BACKENDS[name]
+    for preferred_name in PREFERRED_JSON_BACKENDS:
+        if preferred_name in JSON_BACKENDS:
+            return JSON_BACKENDS[preferred_name]
+    return STDLIB_JSON_BACKEND
+
+
+def make_field_projector(
+    keys: Sequence[str],
+    optional_keys: Sequence[str] = (),
+) -> Callable[[str | bytes | memoryview], tuple[Any, ...]] | None:
+    """Make a function which decodes only the given keys of a JSON object.
+
+    Values of other keys are validated and skipped without making Python objects for them.
+    The function raises ValueError if the input is not a valid JSON object, or some of
+    the keys are absent, or a value cannot be decoded exactly as the standard library does.
+
+    Args:
+        keys (Sequence[str]): Keys to decode.
+        optional_keys (Sequence[str]): Keys to decode which may be absent, their values are None then.
+
+    Returns:
+        The function returning a tuple of values in the order of the keys and then the optional keys,
+        or None if no library capable of projecting is installed.
+    """
+    if _msgspec is None:  # pragma: no cover
+        return None
+
+    projection_type = _msgspec.defstruct(
+        "JsonProjection",
+        [(f"field_{i}", Any, _msgspec.field(name=key)) for i, key in enumerate(keys)]
+        + [
+            (f"field_{len(keys) + i}", Any, _msgspec.field(name=key, default=None))
+            for i, key in enumerate(optional_keys)
+        ],
+    )
+    decode = _msgspec.json.Decoder(projection_type).decode
+    astuple = _msgspec.structs.astuple
+
+    def project(line: str | bytes | memoryview) -> tuple[Any, ...]:
+        return astuple(decode(line))
+
+    return project
+
+
+register_json_backend(STDLIB_JSON_BACKEND)
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    pass
+else:
+    register_json_backend(
+        JsonBackend("orjson", orjson.loads, (orjson.JSONDecodeError,))
+    )
+
+# The module used by `make_field_projector`, None if msgspec isn't installed
+_msgspec: ModuleType | None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    _msgspec = None
+else:  # pragma: no cover
+    _msgspec = msgspec
+    register_json_backend(
+        JsonBackend(
+            "msgspec",
+            msgspec.json.decode,
+            (msgspec.DecodeError, UnicodeDecodeError),
+        )
+    )
+
+try:
+    import simdjson
+except ImportError:  # pragma: no cover
+    pass
+else:  # pragma: no cover
+
+    def simdjson_loads(data: str | bytes | memoryview) -> Any:
+        if type(data) is memoryview:
+            data = data.tobytes()
+        return simdjson.loads(data)
+
+    register_json_backend(JsonBackend("simdjson", simdjson_loads, (ValueError,)))
@@ -1,11 +1,177 @@
-import json
-from datetime import datetime
+from collections.abc import Iterable, Iterator
+from datetime import datetime, tzinfo
+from typing import Any
 
-from .log_types import LogRecord, ParsedRequest
+from django.conf import settings
+
+from .field_mapping import (
+    DEFAULT_FIELD_MAPPING,
+    REQUEST_COLUMN,
+    REQUIRED_COLUMNS,
+    compile_field_mapping,
+    register_field_converter,
+)
+from .json_backends import (
+    STDLIB_JSON_BACKEND,
+    JsonBackend,
+    get_json_backend,
+    make_field_projector,
+)
+from .log_types import LogLine, LogRecord, ParsedRequest
 
 
 LOG_DATETIME_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
 
+# Marks a line which cannot be decoded as JSON (`None` is a valid JSON value)
+MALFORMED_JSON = object()
+
+# Maps every two-digit ASCII string to its value, so a lookup validates and converts at once
+_TWO_DIGITS = {f"{i:02}": i for i in range(100)}
+_MONTHS = {
+    name: number
+    for number, name in enumerate(
+        (
+            "Jan",
+            "Feb",
+            "Mar",
+            "Apr",
+            "May",
+            "Jun",
+            "Jul",
+            "Aug",
+            "Sep",
+            "Oct",
+            "Nov",
+            "Dec",
+        ),
+        start=1,
+    )
+}
+
+
+class LogDatetimeDecoder:
+    """
+    A fast decoder of Nginx `$time_local` timestamps (`%d/%b/%Y:%H:%M:%S %z`).
+
+    Canonical timestamps like `10/Oct/2024:13:55:36 +0300` are parsed by fixed offsets.
+    Date and hour are cached by the `10/Oct/2024:13` prefix, and time zones are cached
+    by the offset string, so a typical log line costs two dict lookups and a `datetime`
+    constructor call. Anything else is handed over to `datetime.strptime`, so results
+    and rejected values are the same as with `datetime.strptime(value, LOG_DATETIME_FORMAT)`.
+
+    Args:
+        cache_size (int): The maximum number of cached date and hour prefixes.
+    """
+
+    def __init__(self, cache_size: int = 1024) -> None:
+        self.__cache_size = cache_size
+        self.__prefixes: dict[str, tuple[int, int, int, int]] = {}
+        self.__time_zones: dict[str, tzinfo] = {}
+
+    def __call__(self, value: str) -> datetime:
+        """
+        Decode a timestamp.
+
+        Args:
+            value (str): Nginx timestamp.
+
+        Returns:
+            datetime: Timezone-aware datetime.
+
+        Raises:
+            ValueError: If the value is malformed.
+        """
+        if (
+            type(value) is not str
+            or len(value) != 26
+            or value[14] != ":"
+            or value[17] != ":"
+            or value[20] != " "
+        ):
+            return datetime.strptime(value, LOG_DATETIME_FORMAT)
+
+        prefix = value[:14]
+        date_hour = self.__prefixes.get(prefix)
+        if date_hour is None:
+            date_hour = self.__decode_prefix(prefix)
+            if date_hour is None:
+                return datetime.strptime(value, LOG_DATETIME_FORMAT)
+
+        offset = value[21:]
+        time_zone = self.__time_zones.get(offset)
+        if time_zone is None:
+            time_zone = self.__decode_time_zone(offset)
+
+        minute = _TWO_DIGITS.get(value[15:17])
+        second = _TWO_DIGITS.get(value[18:20])
+        if minute is None or second is None:
+            return datetime.strptime(value, LOG_DATETIME_FORMAT)
+
+        year, month, day, hour = date_hour
+        # The constructor rejects out of range values with ValueError as strptime does
+        return datetime(year, month, day, hour, minute, second, 0, time_zone)
+
+    def __decode_prefix(self, prefix: str) -> tuple[int, int, int, int] | None:
+        """Decode and cache the `dd/Mon/YYYY:HH` part of a timestamp.
+
+        Returns:
+            A tuple of year, month, day and hour or None if the prefix is not canonical.
+        """
+        day = _TWO_DIGITS.get(prefix[0:2])
+        month = _MONTHS.get(prefix[3:6])
+        century = _TWO_DIGITS.get(prefix[7:9])
+        year = _TWO_DIGITS.get(prefix[9:11])
+        hour = _TWO_DIGITS.get(prefix[12:14])
+        if (
+            day is None
+            or month is None
+            or century is None
+            or year is None
+            or hour is None
+            or prefix[2] != "/"
+            or prefix[6] != "/"
+            or prefix[11] != ":"
+        ):
+            return None
+
+        if len(self.__prefixes) >= self.__cache_size:
+            # Logs are ordered by time, so the oldest prefix is the least useful one
+            self.__prefixes.pop(next(iter(self.__prefixes)), None)
+        date_hour = (century * 100 + year, month, day, hour)
+        self.__prefixes[prefix] = date_hour
+        return date_hour
+
+    def __decode_time_zone(self, offset: str) -> tzinfo:
+        """Decode and cache a `+hhmm` time zone offset.
+
+        The time zone is taken from `datetime.strptime` to get exactly the same objects.
+
+        Raises:
+            ValueError: If the offset is malformed.
+        """
+        time_zone = datetime.strptime(
+            f"01/Jan/2000:00:00:00 {offset}", LOG_DATETIME_FORMAT
+        ).tzinfo
+        assert time_zone is not None
+        self.__time_zones[offset] = time_zone
+        return time_zone
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """The number of cached date and hour prefixes and time zones."""
+        return {
+            "prefixes": len(self.__prefixes),
+            "time_zones": len(self.__time_zones),
+        }
+
+    def cache_clear(self) -> None:
+        """Drop all the cached prefixes and time zones."""
+        self.__prefixes.clear()
+        self.__time_zones.clear()
+
+
+parse_log_datetime = LogDatetimeDecoder()
+
 
 def parse_request_line(input: str) -> ParsedRequest | None:
     """Parse request string into method and URI.
@@ -14,7 +180,8 @@ def parse_request_line(input: str) -> ParsedRequest | None:
         input (str): Request string.
 
     Returnes:
-        ParsedRequest named tuple or None if failed to parse.
+        ParsedRequest named tuple or None if failed to parse. Any method is accepted,
+        the ones which aren't in `HTTP_METHODS` are stored as "-".
     """
     if input.count(" ") == 2:
         # Input string must have at least 2 spaces: after HTTP method and before HTTP version
@@ -27,37 +194,239 @@ def parse_request_line(input: str) -> ParsedRequest | None:
     return None
 
 
-def parse_json_log_record(line: str) -> LogRecord | None:
+def request_line_value(value: Any) -> ParsedRequest | None:
+    """Parse a request line value of any JSON type.
+
+    Args:
+        value (Any): Decoded value of the request field.
+
+    Returns:
+        ParsedRequest named tuple or None if the value is not a valid request line.
+    """
+    return parse_request_line(value) if type(value) is str else None
+
+
+def http_status_value(value: Any) -> int:
+    """Convert a status code, a number or a numeric string (e.g. a quoted `$status`).
+
+    Args:
+        value (Any): Decoded value of the status field.
+
+    Returns:
+        The status code.
+
+    Raises:
+        ValueError: If the value isn't a three-digit number.
+        TypeError: If the value isn't an integer or a string.
+    """
+    if type(value) is not int:
+        if type(value) is not str:
+            raise TypeError(f"Status must be an integer, not {type(value).__name__}")
+        value = int(value)
+    if not 0 <= value <= 999:
+        raise ValueError(f"Status is out of range: {value}")
+    return value
+
+
+register_field_converter("time_local", parse_log_datetime)
+register_field_converter("request_line", request_line_value)
+register_field_converter("http_status", http_status_value)
+
+# The columns of records are extracted from log lines by the functions compiled at startup
+field_mapping = compile_field_mapping(
+    getattr(settings, "LOG_FIELD_MAPPING", DEFAULT_FIELD_MAPPING)
+)
+
+_record_from_dict = field_mapping.from_dict
+_record_from_values = field_mapping.from_values
+
+# Keys of a JSON log line which are needed to make a LogRecord
+LOG_RECORD_KEYS = field_mapping.required_keys
+
+
+def decode_json_line(line: LogLine, backend: JsonBackend) -> Any:
+    """Decode one JSON log line with a given backend.
+
+    Lines rejected by a third-party backend are decoded once again with the standard
+    library, so the result never depends on the installed backend.
+
+    Args:
+        line (str | bytes | memoryview): One line of JSON log
+        backend (JsonBackend): JSON backend to use
+
+    Returns:
+        Decoded JSON value or MALFORMED_JSON if the line is not a valid JSON.
+    """
+    try:
+        return backend.loads(line)
+    except backend.errors:
+        if backend.name == "json":
+            return MALFORMED_JSON
+    try:
+        return STDLIB_JSON_BACKEND.loads(line)
+    except STDLIB_JSON_BACKEND.errors:
+        return MALFORMED_JSON
+
+
+def log_record_from_dict(item: Any) -> LogRecord | None:
+    """Make a log record from a decoded JSON log line.
+
+    Args:
+        item (dict): Decoded JSON log line
+
+    Returns:
+        LogRecord named tuple or None if the item is not an object, some keys are missing
+        or some values are malformed.
+    """
+    # A misconfigured `log_format` gives valid JSON without our keys, such lines are just malformed
+    if type(item) is not dict:
+        return None
+    try:
+        return _record_from_dict(item)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def malformed_line_reason(line: LogLine) -> str:
+    """Tell why a JSON log line is rejected by the parser.
+
+    It decodes the line once again, so it's meant to be called for rejected lines only.
+
+    Args:
+        line (str | bytes | memoryview): One line of JSON log
+
+    Returns:
+        A short description of the first problem found in the line.
+    """
+    item = decode_json_line(line, STDLIB_JSON_BACKEND)
+    if item is MALFORMED_JSON:
+        return "Invalid JSON"
+    if type(item) is not dict:
+        return "Not a JSON object"
+    missing = [key for key in field_mapping.required_keys if key not in item]
+    if missing:
+        return f"Missing fields: {', '.join(missing)}"
+    for column, key, converter in field_mapping.columns:
+        value = item.get(key)
+        if value is None and column not in REQUIRED_COLUMNS:
+            continue
+        try:
+            if converter(value) is None and column == REQUEST_COLUMN:
+                return f"Malformed {key}"
+        except (TypeError, ValueError):
+            return f"Malformed {key}"
+    return "Rejected by the parser"
+
+
+def has_lossy_numbers(record: LogRecord | None) -> bool:
+    """Check whether a record decoded by a third-party backend may differ from the standard library.
+
+    Some backends turn integers which don't fit 64 bits into floats,
+    such records must be decoded once again with the standard library.
+
+    Args:
+        record (LogRecord | None): Parsed log record
+
+    Returns:
+        True if the record must be decoded again.
+    """
+    return record is not None and (
+        type(record.status) is float or type(record.bytes_sent) is float
+    )
+
+
+def parse_json_log_record(
+    line: LogLine, backend: JsonBackend | None = None
+) -> LogRecord | None:
     """Parse a full JSON log line.
 
     Args:
-        line (str): One line of JSON log
+        line (str | bytes | memoryview): One line of JSON log
+        backend (JsonBackend | None): JSON backend to use, the fastest installed one by default
 
     Returns:
         LogRecord named tuple
     """
-    try:
-        item = json.loads(line)
-    except json.JSONDecodeError:
+    if backend is None:
+        backend = get_json_backend()
+    item = decode_json_line(line, backend)
+    if item is MALFORMED_JSON:
         return None
 
-    # Parse a `request` field into a method and URI
-    # Early return if the dict has no such key
-    if "request" in item:
-        parsed_request = parse_request_line(item["request"])
-        if parsed_request is not None:
+    record = log_record_from_dict(item)
+    if backend.name != "json" and has_lossy_numbers(record):
+        record = log_record_from_dict(STDLIB_JSON_BACKEND.loads(line))
+    return record
+
+
+def parse_json_log_records(
+    lines: Iterable[LogLine], backend: JsonBackend | str | None = None
+) -> Iterator[LogRecord | None]:
+    """Parse JSON log lines one by one.
+
+    The backend is resolved once for all the lines, so this is the preferred way
+    to parse large amounts of lines.
+
+    Args:
+        lines (Iterable[str | bytes | memoryview]): JSON log lines
+        backend (JsonBackend | str | None): JSON backend or its name, the fastest installed one by default
+
+    Yields:
+        LogRecord named tuple for each line or None if the line cannot be parsed.
+    """
+    if not isinstance(backend, JsonBackend):
+        backend = get_json_backend(backend)
+    loads = backend.loads
+    errors = backend.errors
+    is_stdlib = backend.name == "json"
+
+    for line in lines:
+        try:
+            item = loads(line)
+        except errors:
+            if is_stdlib:
+                yield None
+                continue
+            # The line is rejected by the third-party backend, only the standard library is tried again
             try:
-                date = datetime.strptime(item["time"], LOG_DATETIME_FORMAT)
-            except ValueError:
-                return None
-
-            return LogRecord(
-                ip=item["remote_ip"],
-                date=date,
-                method=parsed_request.method,
-                uri=parsed_request.uri,
-                status=item["response"],
-                bytes_sent=item["bytes"],
-            )
+                item = STDLIB_JSON_BACKEND.loads(line)
+            except STDLIB_JSON_BACKEND.errors:
+                yield None
+                continue
 
-    return None
+        record = log_record_from_dict(item)
+        if not is_stdlib and has_lossy_numbers(record):
+            record = log_record_from_dict(STDLIB_JSON_BACKEND.loads(line))
+        yield record
+
+
+_log_record_projector = make_field_projector(
+    field_mapping.required_keys, field_mapping.optional_keys
+)
+
+
+def parse_projected_json_log_record(line: LogLine) -> LogRecord | None:
+    """Parse a JSON log line decoding only the fields needed for a LogRecord.
+
+    Other fields are validated and skipped without making Python objects for them,
+    which is much faster on wide log lines. Lines which cannot be projected are parsed
+    with `parse_json_log_record`, so the results are always the same. If no projecting
+    backend is installed, it's just the same as `parse_json_log_record`.
+
+    Args:
+        line (str | bytes | memoryview): One line of JSON log
+
+    Returns:
+        LogRecord named tuple or None if the line cannot be parsed.
+    """
+    if _log_record_projector is None:
+        return parse_json_log_record(line)
+    try:
+        values = _log_record_projector(line)
+    except ValueError:
+        # Malformed lines, lines without some of the keys and anything unusual
+        return parse_json_log_record(line)
+    try:
+        return _record_from_values(*values)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,249 @@
+import bz2
+import glob
+import gzip
+import io
+import lzma
+import os
+import queue
+import re
+import threading
+from collections.abc import Iterable
+from types import ModuleType
+from typing import IO, Any, Literal, overload
+
+from .log_reading import READ_BUFFER_SIZE
+
+
+# The module decompressing zstd files, None if zstandard isn't installed
+_zstandard: ModuleType | None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    _zstandard = None
+else:
+    _zstandard = zstandard
+
+
+COMPRESSION_MAGIC = {
+    "gzip": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+
+COMPRESSION_EXTENSIONS = (".gz", ".bz2", ".xz", ".zst")
+
+# access.log.1, access.log.2.gz
+ROTATION_NUMBER_REGEX = re.compile(r"^(?P<base>.+?)\.(?P<number>\d+)$")
+# access.log-20241010, access.log-2024-10-10.gz (logrotate `dateext`)
+ROTATION_DATE_REGEX = re.compile(r"^(?P<base>.+?)-(?P<date>\d{4}-?\d{2}-?\d{2}[\d-]*)$")
+
+
+def detect_compression(path: str) -> str | None:
+    """Detect a compression format of a file by its magic bytes.
+
+    Args:
+        path (str): Path to a file.
+
+    Returns:
+        One of `COMPRESSION_MAGIC` keys, or None for an uncompressed file.
+    """
+    with open(path, "rb") as file:
+        header = file.read(max(map(len, COMPRESSION_MAGIC.values())))
+    for name, magic in COMPRESSION_MAGIC.items():
+        if header.startswith(magic):
+            return name
+    return None
+
+
+def rotation_order_key(path: str) -> tuple:
+    """Get a sorting key which puts rotated logs in chronological order.
+
+    Files of one log go from the oldest rotated file to the current one:
+    `access.log.2.gz`, `access.log.1`, `access.log`, and dated files go by their dates.
+
+    Args:
+        path (str): Path to a log file.
+
+    Returns:
+        A tuple to sort paths by.
+    """
+    directory, name = os.path.split(path)
+    for extension in COMPRESSION_EXTENSIONS:
+        if name.endswith(extension):
+            name = name[: -len(extension)]
+            break
+
+    match = ROTATION_NUMBER_REGEX.match(name)
+    if match is not None:
+        return (directory, match.group("base"), 0, -int(match.group("number")), "")
+    match = ROTATION_DATE_REGEX.match(name)
+    if match is not None:
+        return (
+            directory,
+            match.group("base"),
+            0,
+            0,
+            match.group("date").replace("-", ""),
+        )
+    return (directory, name, 1, 0, "")
+
+
+def expand_log_paths(patterns: Iterable[str]) -> list[str]:
+    """Expand glob patterns and sort the files in the rotation order.
+
+    Args:
+        patterns (Iterable[str]): Paths or glob patterns.
+
+    Returns:
+        A list of unique paths.
+
+    Raises:
+        FileNotFoundError: If a pattern matches no files.
+    """
+    paths = set()
+    for pattern in patterns:
+        matches = [path for path in glob.glob(pattern) if os.path.isfile(path)]
+        if not matches:
+            if not glob.has_magic(pattern):
+                # Let the caller report a missing file as usual
+                matches = [pattern]
+            else:
+                raise FileNotFoundError(f"No files match {pattern}")
+        paths.update(matches)
+    return sorted(paths, key=rotation_order_key)
+
+
+class ThreadedReader(io.RawIOBase):
+    """A binary stream reading another one by chunks in a background thread.
+
+    It's used to decompress a file while the previous chunks are parsed.
+    Compression libraries release GIL, so decompression really runs in parallel.
+
+    Args:
+        file (IO[bytes] | io.BufferedIOBase): A stream to read, it's closed with the reader.
+        chunk_size (int): A size of one read.
+        queue_size (int): The number of chunks read ahead.
+    """
+
+    def __init__(
+        self,
+        file: IO[bytes] | io.BufferedIOBase,
+        chunk_size: int = READ_BUFFER_SIZE,
+        queue_size: int = 4,
+    ) -> None:
+        super().__init__()
+        self.__file = file
+        self.__chunk_size = chunk_size
+        self.__chunks: queue.Queue[bytes | Exception] = queue.Queue(queue_size)
+        self.__chunk = memoryview(b"")
+        self.__eof = False
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(target=self.__read_chunks, daemon=True)
+        self.__thread.start()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        """Read data of the next chunks into a buffer.
+
+        Args:
+            buffer (bytearray | memoryview): The buffer.
+
+        Returns:
+            The number of bytes read, 0 at the end of the stream.
+        """
+        while not self.__chunk:
+            if self.__eof:
+                return 0
+            chunk = self.__chunks.get()
+            if isinstance(chunk, Exception):
+                self.__eof = True
+                raise chunk
+            if not chunk:
+                self.__eof = True
+                return 0
+            self.__chunk = memoryview(chunk)
+
+        size = min(len(buffer), len(self.__chunk))
+        buffer[:size] = self.__chunk[:size]
+        self.__chunk = self.__chunk[size:]
+        return size
+
+    def close(self) -> None:
+        if not self.closed:
+            self.__stopped.set()
+            self.__thread.join()
+            self.__file.close()
+        super().close()
+
+    def __read_chunks(self) -> None:
+        """Background thread loop."""
+        try:
+            while not self.__stopped.is_set():
+                chunk = self.__file.read(self.__chunk_size)
+                self.__put(chunk)
+                if not chunk:
+                    return
+        except Exception as error:
+            self.__put(error)
+
+    def __put(self, item: bytes | Exception) -> None:
+        """Put a chunk into the queue unless the reader is closed."""
+        while not self.__stopped.is_set():
+            try:
+                self.__chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+@overload
+def open_log_file(path: str, binary: Literal[True]) -> IO[bytes]: ...
+
+
+@overload
+def open_log_file(path: str, binary: Literal[False] = False) -> IO[str]: ...
+
+
+@overload
+def open_log_file(path: str, binary: bool) -> IO[Any]: ...
+
+
+def open_log_file(path: str, binary: bool = False) -> IO[Any]:
+    """Open a log file decompressing it in a background thread if needed.
+
+    Args:
+        path (str): Path to a log file.
+        binary (bool): Whether to open the file in binary mode.
+
+    Returns:
+        A file object. Uncompressed files are opened as usual, so they can be memory-mapped.
+
+    Raises:
+        ValueError: If the library required to decompress the file is not installed.
+    """
+    compression = detect_compression(path)
+    if compression is None:
+        return open(path, "rb" if binary else "r")
+
+    file: IO[bytes] | io.BufferedIOBase
+    if compression == "gzip":
+        file = gzip.open(path, "rb")
+    elif compression == "bz2":
+        file = bz2.open(path, "rb")
+    elif compression == "xz":
+        file = lzma.open(path, "rb")
+    else:
+        if _zstandard is None:  # pragma: no cover
+            raise ValueError(f"{path}: install zstandard package to read zstd files")
+        file = _zstandard.ZstdDecompressor().stream_reader(
+            open(path, "rb"), closefd=True
+        )
+
+    reader = io.BufferedReader(ThreadedReader(file))
+    if binary:
+        return reader
+    return io.TextIOWrapper(reader)
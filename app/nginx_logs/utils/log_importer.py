@@ -1,18 +1,29 @@
-from collections.abc import Callable
-from typing import Iterator
+from collections.abc import Callable, Iterable
+from functools import partial
+from typing import Any
 
 from django.dispatch import Signal
 
-from app.utils import BatchModelWriter
-from nginx_logs.models import NginxLog
+from app.utils import AdaptiveBatchSize, BatchModelWriter, PipelinedModelWriter
+from nginx_logs.models import NginxLog, QuarantinedLine
 
-from .log_types import LogRecord
+from .fingerprints import RecentFingerprints
+from .import_timings import ImportTimings
+from .json_log_parsing import malformed_line_reason
+from .log_types import LogLine, LogRecord
+from .uri_interning import NGINX_LOG_ROW_FIELDS, URI_CACHE_SIZE, UriInterner
 
 
 line_parsed_signal = Signal()
 malformed_line_signal = Signal()
+batch_parsed_signal = Signal()
 flushed_signal = Signal()
 
+MALFORMED_SAMPLE_SIZE = 10
+
+# Values of a quarantined line in the order they're passed to the writer
+QUARANTINE_FIELDS = ("source", "line_number", "batch_number", "reason", "text")
+
 
 class LogImporter:
     """
@@ -20,19 +31,116 @@ class LogImporter:
 
     Args:
         parser (Callable): A callable object to parse a log line.
-        batch_size (int): The number of records to store in one bulk operation.
+        batch_size (int | AdaptiveBatchSize): The number of records to store in one bulk operation,
+            or the adaptive batch size adjusted to the storing time.
+        first_line_number (int): The number of the first line in the log file, for the logs parsed by parts.
+        writer_class (type(BatchModelWriter)): The class of the writer storing batches into DB.
+        writer_threads (int): The number of threads storing batches while the next ones are parsed.
+            If it's 0, batches are stored synchronously.
+        raw_rows (bool): Pass parsed LogRecord tuples to the writer as rows instead of making model instances.
+        line_signals (bool): Send `line_parsed` and `malformed_line` signals for every line.
+            The aggregated `batch_parsed` signal is sent once per batch anyway.
+        malformed_sample_size (int): The maximum number of malformed lines of a batch sent with `batch_parsed`.
+        on_commit (Callable | None): A function called with the numbers of bytes and lines parsed so far
+            in the DB transaction storing each batch, e.g. to save the import position with the records.
+        fingerprint (Callable | None): A function hashing a line and its parsed record to a 64-bit integer
+            (see `fingerprints` module). If it's given, records are stored with their fingerprints,
+            and the records seen recently or stored already are dropped as duplicates.
+        timings (bool): Measure the time of the import stages. The timings are added to `stats`
+            and the timings of the lines since the previous batch are sent with `batch_parsed`.
+            If it's not set, nothing is measured in the loop over lines.
+        quarantine (str | None): The source of the lines (e.g. the file path). If it's given, malformed lines
+            are stored with it into the quarantine table in the transaction storing the batch of records
+            they belong to, so a saved position never skips or repeats them. A batch also ends
+            when its quarantined lines reach the batch size.
+        rejection_reason (Callable): A function telling why the parser has rejected a line, it's called
+            for the quarantined lines only.
+        uri_cache_size (int): The number of the recently used URIs which aren't stored again
+            (see `UriInterner`). The new URIs of a batch are stored before the batch.
 
     Attributes:
         current_batch_number (property): The current batch number.
         stats (property): The statistics of log parsing and storing.
     """
 
-    def __init__(self, parser: Callable[[str], LogRecord], batch_size: int) -> None:
+    def __init__(
+        self,
+        parser: Callable[[LogLine], LogRecord | None],
+        batch_size: int | AdaptiveBatchSize,
+        first_line_number: int = 1,
+        writer_class: type[BatchModelWriter[NginxLog]] = BatchModelWriter,
+        writer_threads: int = 0,
+        raw_rows: bool = True,
+        line_signals: bool = False,
+        malformed_sample_size: int = MALFORMED_SAMPLE_SIZE,
+        on_commit: Callable[[int, int], None] | None = None,
+        fingerprint: Callable[[LogLine, LogRecord], int] | None = None,
+        timings: bool = False,
+        quarantine: str | None = None,
+        rejection_reason: Callable[[LogLine], str] = malformed_line_reason,
+        uri_cache_size: int = URI_CACHE_SIZE,
+    ) -> None:
         self.__parser = parser
-        self.__batch_size = batch_size
-        self.__writer = BatchModelWriter[NginxLog](NginxLog, batch_size)
+        self.__raw_rows = raw_rows
+        self.__fingerprint = fingerprint
+        # It's only used if records are fingerprinted, an unused one holds two empty sets
+        self.__recent_fingerprints = RecentFingerprints()
+        ignore_conflicts = fingerprint is not None
+        fields: tuple[str, ...] | None = None
+        if raw_rows:
+            fields = NGINX_LOG_ROW_FIELDS
+            if fingerprint is not None:
+                fields += ("fingerprint",)
+        self.__writer: BatchModelWriter[NginxLog]
+        if writer_threads > 0:
+            self.__writer = PipelinedModelWriter[NginxLog](
+                NginxLog,
+                batch_size,
+                self.__flushed_handler,
+                threads=writer_threads,
+                writer_class=writer_class,
+                fields=fields,
+                ignore_conflicts=ignore_conflicts,
+            )
+        else:
+            self.__writer = writer_class(
+                NginxLog,
+                batch_size,
+                self.__flushed_handler,
+                fields=fields,
+                ignore_conflicts=ignore_conflicts,
+            )
+        self.__line_number_offset = first_line_number - 1
         self.__total_lines = 0
+        self.__total_bytes = 0
         self.__skipped_lines = 0
+        self.__duplicates = 0
+        self.__line_signals = line_signals
+        self.__malformed_sample_size = malformed_sample_size
+        self.__on_commit = on_commit
+        self.__quarantine = quarantine
+        self.__rejection_reason = rejection_reason
+        self.__quarantined_lines: list[tuple[Any, ...]] = []
+        self.__quarantined_count = 0
+        self.__uris = UriInterner(uri_cache_size)
+        self.__add_record = self.__writer.add
+        self.__flush_records = self.__writer.flush
+        self.__parse_line = self.__parse_line_untimed
+        self.__timings: ImportTimings | None = None
+        if timings:
+            # The callables are replaced with the measured ones, so the loop is the same
+            self.__timings = ImportTimings()
+            self.__parser = self.__timings.timed("parse", self.__parser)
+            self.__add_record = self.__timings.timed("store", self.__add_record)
+            self.__flush_records = self.__timings.timed("flush", self.__flush_records)
+            self.__parse_line = self.__timings.timed("line", self.__parse_line)
+        self.__new_batch_counters()
+
+    def __new_batch_counters(self) -> None:
+        """Reset the counters of the current batch lines."""
+        self.__batch_parsed_lines = 0
+        self.__batch_malformed_lines = 0
+        self.__malformed_samples: list[tuple[int, str]] = []
 
     @property
     def current_batch_number(self) -> int:
@@ -40,85 +148,246 @@ class LogImporter:
         return self.__writer.current_batch_number
 
     @property
-    def stats(self) -> dict[str, int]:
+    def stats(self) -> dict[str, Any]:
         """
         The statistics of log parsing and storing.
 
         Returns:
-            dict: A dictionary containing the total lines, skipped lines, stored records, and incomplete batches.
+            dict: A dictionary containing the total lines, skipped lines, stored records, dropped duplicates,
+                incomplete batches, batch sizes and the size of parsed lines in bytes (UTF-8 for text lines). If the timings are measured,
+                it contains the stage timings, the throughput and the batch storing latencies too,
+                and if malformed lines are quarantined, the number of them.
         """
         writer_stats = self.__writer.stats
-        return {
+        stats = {
             "total": self.__total_lines,
+            "bytes": self.__total_bytes,
             "skipped": self.__skipped_lines,
-            "stored": writer_stats["total"],
+            "stored": writer_stats["total"] - writer_stats["duplicates"],
+            "duplicates": self.__duplicates + writer_stats["duplicates"],
             "incomplete_batches": writer_stats["incomplete_batches"],
+            "batch_sizes": writer_stats["batch_sizes"],
         }
+        if self.__quarantine is not None:
+            stats["quarantined"] = self.__quarantined_count
+        if self.__timings is not None:
+            stats["timings"] = {
+                **self.__timings.as_dict(self.__total_lines, self.__total_bytes),
+                "flush_latency": self.__writer.flush_latency.as_dict(),
+            }
+        return stats
 
-    def parse(self, lines: Iterator[str]) -> None:
+    def parse(self, lines: Iterable[LogLine]) -> None:
         """
         Parse an iterable of log lines.
 
         Args:
-            lines (Iterator[str]): An iterable of log lines.
+            lines (Iterable[str | bytes | memoryview]): An iterable of log lines.
+        """
+        if self.__timings is not None:
+            lines = self.__timings.timed_iter("read", lines)
+        try:
+            parse_line = self.__parse_line
+            for line in lines:
+                parse_line(line)
+            self.flush()
+        finally:
+            self.__writer.close()
+
+    def close(self) -> None:
+        """
+        Release the resources of the writer (e.g. stop the writer threads) after the last flush.
         """
-        for line in lines:
-            self.parse_line(line)
-        self.flush()
+        self.__writer.close()
 
-    def parse_line(self, line: str) -> int:
+    def parse_line(self, line: LogLine) -> int:
         """
         Parse a single log line.
 
         Args:
-            line (str): The log line to be parsed.
+            line (str | bytes | memoryview): The log line to be parsed.
 
         Returns:
             int: The number of stored DB models this time, or -1 if failed to parse the log string.
+                It's 0 for a dropped duplicate.
         """
+        return self.__parse_line(line)
+
+    def __parse_line_untimed(self, line: LogLine) -> int:
+        """Parse a single log line, `parse_line` calls it or its measured version."""
         self.__total_lines += 1
+        # Text lines are counted by their UTF-8 size, as the bytes of the log
+        self.__total_bytes += (
+            len(line)
+            if not isinstance(line, str) or line.isascii()
+            else len(line.encode("utf-8", "surrogateescape"))
+        )
         parsed_line = self.__parser(line)
         if parsed_line is None:
-            malformed_line_signal.send_robust(
-                self,
-                batch_number=self.current_batch_number,
-                line_number=self.__total_lines,
-                text=line,
-            )
-
             self.__skipped_lines += 1
+            self.__batch_malformed_lines += 1
+            if len(self.__malformed_samples) < self.__malformed_sample_size:
+                # Lines may be views of a buffer, so the samples are copied
+                self.__malformed_samples.append(
+                    (self.__line_number_offset + self.__total_lines, _line_text(line))
+                )
+            if self.__quarantine is not None:
+                self.__quarantined_lines.append(
+                    (
+                        self.__quarantine,
+                        self.__line_number_offset + self.__total_lines,
+                        self.current_batch_number,
+                        self.__rejection_reason(line)[:255],
+                        # PostgreSQL text cannot contain NUL characters
+                        _line_text(line).rstrip("\r\n").replace("\x00", "\ufffd"),
+                    )
+                )
+                self.__quarantined_count += 1
+            if self.__line_signals and malformed_line_signal.receivers:
+                malformed_line_signal.send_robust(
+                    self,
+                    batch_number=self.current_batch_number,
+                    line_number=self.__line_number_offset + self.__total_lines,
+                    text=line,
+                )
+            if len(self.__quarantined_lines) >= self.__writer.batch_size:
+                # The quarantined lines are kept until their batch is stored, so they end it too
+                self.flush()
             return -1
 
-        line_parsed_signal.send_robust(
-            self,
-            batch_number=self.current_batch_number,
-            line_number=self.__total_lines,
-        )
-
-        model = NginxLog(**(parsed_line._asdict()))
-        records_stored = self.__writer.add(model)
-        if records_stored > 0:
-            flushed_signal.send_robust(
+        if self.__line_signals and line_parsed_signal.receivers:
+            line_parsed_signal.send_robust(
                 self,
-                batch_number=self.current_batch_number - 1,
-                records_stored=records_stored,
-                batch_incomplete=records_stored < self.__batch_size,
+                batch_number=self.current_batch_number,
+                line_number=self.__line_number_offset + self.__total_lines,
             )
 
-        return records_stored
+        record: NginxLog | tuple[Any, ...]
+        if self.__fingerprint is None:
+            row = self.__uris.row(parsed_line)
+            record = (
+                row
+                if self.__raw_rows
+                else NginxLog(**dict(zip(NGINX_LOG_ROW_FIELDS, row)))
+            )
+        else:
+            fingerprint = self.__fingerprint(line, parsed_line)
+            if self.__recent_fingerprints.seen(fingerprint):
+                self.__duplicates += 1
+                return 0
+            row = self.__uris.row(parsed_line)
+            record = (
+                (*row, fingerprint)
+                if self.__raw_rows
+                else NginxLog(
+                    **dict(zip(NGINX_LOG_ROW_FIELDS, row)), fingerprint=fingerprint
+                )
+            )
+        self.__batch_parsed_lines += 1
+        if self.__batch_parsed_lines >= self.__writer.batch_size:
+            # The writer is going to store the batch with this record
+            self.__batch_parsed_handler()
+            self.__uris.flush()
+            return self.__add_record(record, self.__commit_action())
+        return self.__add_record(record)
 
     def flush(self) -> int:
         """
         Immediately flush the incomplete batch.
 
         Returns:
-            int: The number of stored records.
+            int: The number of stored records. In the pipelined mode it waits for all the queued batches
+                and counts their records too.
+        """
+        if self.__batch_parsed_lines or self.__batch_malformed_lines:
+            self.__batch_parsed_handler()
+        self.__uris.flush()
+        records_stored = self.__flush_records(self.__commit_action())
+        if records_stored == 0:
+            # Nothing was stored, but the receivers are told about the end of the batch anyway
+            self.__flushed_handler(self.current_batch_number - 1, 0)
+        return records_stored
+
+    def __commit_action(self) -> Callable[[], None] | None:
+        """
+        Make the action storing the quarantined lines of the batch and saving the current position
+        in the transaction storing the batch.
+        """
+        quarantined_lines = self.__quarantined_lines
+        if self.__on_commit is None and not quarantined_lines:
+            return None
+        self.__quarantined_lines = []
+        return partial(
+            _commit_batch,
+            quarantined_lines,
+            self.__on_commit,
+            self.__total_bytes,
+            self.__total_lines,
+        )
+
+    def __batch_parsed_handler(self) -> None:
+        """
+        Send batch_parsed signal with the counters of the current batch and reset them.
+        """
+        if batch_parsed_signal.receivers:
+            timings = (
+                {}
+                if self.__timings is None
+                else {"timings": self.__timings.batch_timings()}
+            )
+            batch_parsed_signal.send_robust(
+                self,
+                batch_number=self.current_batch_number,
+                lines_parsed=self.__batch_parsed_lines,
+                lines_malformed=self.__batch_malformed_lines,
+                malformed_lines=self.__malformed_samples,
+                **timings,
+            )
+        self.__new_batch_counters()
+
+    def __flushed_handler(self, batch_number: int, records_stored: int) -> None:
+        """
+        Send flushed signal when the writer stores a batch.
+
+        Args:
+            batch_number (int): The stored batch number.
+            records_stored (int): The number of stored records.
         """
-        records_stored = self.__writer.flush()
         flushed_signal.send_robust(
             self,
-            batch_number=self.current_batch_number - 1,
+            batch_number=batch_number,
             records_stored=records_stored,
-            batch_incomplete=records_stored < self.__batch_size,
+            batch_incomplete=records_stored == 0
+            or self.__writer.is_incomplete_batch(batch_number),
+            batch_size=self.__writer.batch_size,
         )
-        return records_stored
+
+
+def _commit_batch(
+    quarantined_lines: list[tuple[Any, ...]],
+    on_commit: Callable[[int, int], None] | None,
+    bytes_parsed: int,
+    lines_parsed: int,
+) -> None:
+    """Store the quarantined lines of a batch and save the position, it's called in the batch transaction.
+
+    Args:
+        quarantined_lines (list[tuple]): The values of the quarantined lines (see `QUARANTINE_FIELDS`).
+        on_commit (Callable | None): The function saving the position.
+        bytes_parsed (int): The number of bytes parsed by the end of the batch.
+        lines_parsed (int): The number of lines parsed by the end of the batch.
+    """
+    if quarantined_lines:
+        QuarantinedLine.objects.bulk_create(
+            QuarantinedLine(**dict(zip(QUARANTINE_FIELDS, values)))
+            for values in quarantined_lines
+        )
+    if on_commit is not None:
+        on_commit(bytes_parsed, lines_parsed)
+
+
+def _line_text(line: LogLine) -> str:
+    """Get the text of a line which may be bytes or a view of a buffer."""
+    return (
+        line if isinstance(line, str) else bytes(line).decode("utf-8", errors="replace")
+    )
@@ -0,0 +1,254 @@
+import io
+import mmap
+import os
+import stat
+import threading
+import time
+from collections.abc import Iterator
+from typing import IO, cast
+
+
+READ_BUFFER_SIZE = 4 * 1024 * 1024
+
+
+def is_regular_file(file: IO[bytes]) -> bool:
+    """Check whether a file object is backed by a regular file which can be memory-mapped.
+
+    Args:
+        file (IO[bytes]): A file object.
+
+    Returns:
+        True for a non-empty regular file, False for pipes, terminals, in-memory files, etc.
+    """
+    try:
+        file_stat = os.fstat(file.fileno())
+    except (OSError, io.UnsupportedOperation):
+        return False
+    return stat.S_ISREG(file_stat.st_mode) and file_stat.st_size > 0
+
+
+def iter_binary_lines(
+    file: IO[bytes], buffer_size: int = READ_BUFFER_SIZE, start: int = 0
+) -> Iterator[memoryview]:
+    """Split a binary file into lines without decoding them.
+
+    Regular files are memory-mapped and lines are yielded as slices of the mapping.
+    Other files (e.g. stdin) are read by large chunks with `readinto`.
+    Each line keeps its trailing newline, like lines of a text file do.
+
+    Args:
+        file (IO[bytes]): A file opened in binary mode.
+        buffer_size (int): A size of one chunk for non-regular files.
+        start (int): Offset of the first line, the data before it is skipped
+            (read and dropped if the file is not seekable).
+
+    Yields:
+        memoryview: One line of the file.
+    """
+    if is_regular_file(file):
+        yield from iter_mapped_lines(file, start)
+        return
+
+    if start > 0:
+        if file.seekable():
+            file.seek(start)
+        else:
+            while start > 0:
+                skipped = len(file.read(min(start, buffer_size)))
+                if not skipped:
+                    return
+                start -= skipped
+    yield from _iter_buffered_lines(file, buffer_size)
+
+
+def iter_mapped_lines(
+    file: IO[bytes], start: int = 0, end: int | None = None
+) -> Iterator[memoryview]:
+    """Split a part of a non-empty regular file into lines using memory mapping.
+
+    Args:
+        file (IO[bytes]): A regular file opened in binary mode.
+        start (int): Offset of the first byte of the part, it must be the beginning of a line.
+        end (int | None): Offset after the last byte of the part, the end of file by default.
+
+    Yields:
+        memoryview: One line of the file.
+    """
+    mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mmap, "MADV_SEQUENTIAL"):
+        mapping.madvise(mmap.MADV_SEQUENTIAL)
+    view = memoryview(mapping)
+    find = mapping.find
+    size = len(mapping) if end is None else min(end, len(mapping))
+    try:
+        while start < size:
+            line_end = find(b"\n", start, size)
+            line_end = size if line_end < 0 else line_end + 1
+            yield view[start:line_end]
+            start = line_end
+    finally:
+        try:
+            view.release()
+            mapping.close()
+        except BufferError:
+            # Some lines are still referenced, so the mapping is closed by the garbage collector
+            pass
+
+
+def _iter_buffered_lines(file: IO[bytes], buffer_size: int) -> Iterator[memoryview]:
+    """Split a stream into lines reading it by large chunks."""
+    # Binary streams of io module have readinto, though the typing of IO[bytes] doesn't declare it
+    readinto = cast(io.BufferedIOBase, file).readinto
+    rest = b""
+    while True:
+        # A new buffer for every chunk, so the lines yielded before stay valid
+        buffer = bytearray(len(rest) + buffer_size)
+        view = memoryview(buffer)
+        view[: len(rest)] = rest
+        data_end = len(rest)
+        # Pipes return data by small portions, so fill the whole buffer
+        while data_end < len(buffer):
+            bytes_read = readinto(view[data_end:])
+            if not bytes_read:
+                break
+            data_end += bytes_read
+        if data_end == len(rest):
+            # End of file
+            if rest:
+                yield view[:data_end]
+            return
+
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start, data_end)
+            if end < 0:
+                break
+            yield view[start : end + 1]
+            start = end + 1
+        # An incomplete line is moved to the next chunk
+        rest = bytes(view[start:data_end])
+
+
+FOLLOW_READ_SIZE = 64 * 1024
+FOLLOW_MAX_LINE_SIZE = 64 * 1024
+
+
+def follow_lines(
+    path: str,
+    poll_interval: float = 1.0,
+    idle_timeout: float = 5.0,
+    stop_event: threading.Event | None = None,
+    max_line_size: int = FOLLOW_MAX_LINE_SIZE,
+) -> Iterator[bytes | None]:
+    """Read a growing log file like `tail -F` does.
+
+    The file is polled for appended data with `os.stat`, so it works on any file system.
+    Truncation (e.g. `copytruncate` rotation) restarts reading from the beginning of the file,
+    and an inode change (rotation by renaming) makes it read the rest of the old file and
+    reopen the path. Only a chunk of data and a partial line are kept in memory: a line longer than
+    `max_line_size` is cut to this size (so the parser rejects it as malformed), the rest of it is skipped.
+
+    Args:
+        path (str): Path to a log file.
+        poll_interval (float): Seconds between checks for new data.
+        idle_timeout (float): Seconds without new lines after which None is yielded once.
+        stop_event (threading.Event | None): Following stops when the event is set.
+        max_line_size (int): The maximum size of one line in bytes.
+
+    Yields:
+        bytes | None: One line of the file with its newline, or None on idle timeout.
+    """
+    stop_event = stop_event or threading.Event()
+    file = _open_when_exists(path, poll_interval, stop_event)
+    if file is None:
+        return
+
+    rest = b""
+    # The rest of a line which is too long is skipped up to its end
+    skipping = False
+    rotated = False
+    last_line_time = time.monotonic()
+    idle = True
+    try:
+        while not stop_event.is_set():
+            data = file.read(FOLLOW_READ_SIZE)
+            if data:
+                lines = (rest + data).split(b"\n")
+                rest = lines.pop()
+                if skipping and lines:
+                    # The end of the skipped line
+                    del lines[0]
+                    skipping = False
+                lines = [
+                    line[:max_line_size] if len(line) > max_line_size else line + b"\n"
+                    for line in lines
+                ]
+                if skipping:
+                    rest = b""
+                elif len(rest) > max_line_size:
+                    # It's yielded as a malformed line
+                    lines.append(rest[:max_line_size])
+                    rest = b""
+                    skipping = True
+                if lines:
+                    yield from lines
+                    last_line_time = time.monotonic()
+                    idle = False
+                continue
+
+            # End of file is reached, check whether it's rotated or truncated
+            if rotated:
+                # The old file has been read to the end after the rotation was noticed
+                if rest:
+                    yield rest
+                    rest = b""
+                skipping = False
+                file.close()
+                file = _open_when_exists(path, poll_interval, stop_event)
+                if file is None:
+                    return
+                rotated = False
+                continue
+
+            try:
+                path_stat = os.stat(path)
+            except FileNotFoundError:
+                # It's being rotated, the new file will appear soon
+                path_stat = None
+            file_stat = os.fstat(file.fileno())
+            if path_stat is not None and (
+                path_stat.st_ino != file_stat.st_ino
+                or path_stat.st_dev != file_stat.st_dev
+            ):
+                # Read the data written into the old file before the rotation
+                rotated = True
+                continue
+            if file_stat.st_size < file.tell():
+                file.seek(0)
+                rest = b""
+                skipping = False
+                continue
+
+            if not idle and time.monotonic() - last_line_time >= idle_timeout:
+                idle = True
+                yield None
+            stop_event.wait(poll_interval)
+    finally:
+        if file is not None:
+            file.close()
+
+
+def _open_when_exists(
+    path: str, poll_interval: float, stop_event: threading.Event
+) -> IO[bytes] | None:
+    """Open a file in binary mode waiting until it's created.
+
+    Returns:
+        The file object, or None if the stop event is set before the file appears.
+    """
+    while not stop_event.is_set():
+        try:
+            return open(path, "rb")
+        except FileNotFoundError:
+            stop_event.wait(poll_interval)
+    return None
@@ -2,6 +2,10 @@ from typing import NamedTuple
 from datetime import datetime
 
 
+# One line of a log file, either decoded or not
+LogLine = str | bytes | memoryview
+
+
 class ParsedRequest(NamedTuple):
     """
     Represents a parsed Nginx request.
@@ -24,6 +28,11 @@ class LogRecord(NamedTuple):
     :ivar uri: Request URI
     :ivar status: HTTP status code
     :ivar bytes_sent: Number of bytes sent by the server
+    :ivar request_time: Request processing time in seconds, if it's logged
+    :ivar upstream_response_time: Time of receiving the response from the upstream servers in seconds
+    :ivar user_agent: User-Agent request header
+    :ivar referer: Referer request header
+    :ivar host: Host name of the request
     """
 
     ip: str
@@ -32,3 +41,12 @@ class LogRecord(NamedTuple):
     uri: str
     status: int
     bytes_sent: int
+    request_time: float | None = None
+    upstream_response_time: float | None = None
+    user_agent: str | None = None
+    referer: str | None = None
+    host: str | None = None
+
+
+# The fields every log line must have, the rest ones are optional
+REQUIRED_LOG_RECORD_FIELDS = LogRecord._fields[:6]
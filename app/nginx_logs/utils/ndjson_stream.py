@@ -0,0 +1,137 @@
+import zlib
+from collections.abc import Iterator
+from typing import Protocol
+
+
+NDJSON_READ_SIZE = 64 * 1024
+
+
+class ReadableStream(Protocol):
+    """A binary stream like a file or a request."""
+
+    def read(self, size: int = -1) -> bytes: ...
+
+
+class NdjsonStreamError(ValueError):
+    """The stream cannot be read to the end."""
+
+
+class StreamTooLarge(NdjsonStreamError):
+    """The decoded stream exceeds the size limit."""
+
+
+class MalformedStream(NdjsonStreamError):
+    """The stream cannot be decompressed."""
+
+
+class NdjsonLines:
+    """
+    Splits a stream of newline-delimited JSON (e.g. a request body) into lines on the fly.
+
+    The stream is read by small chunks and gzip data is decompressed by chunks of the same size,
+    so only one chunk and one incomplete line are kept in memory. A line longer than `max_line_size`
+    is cut to this size, the rest of it is skipped. Iteration stops on the first error, which is kept
+    in `error`, so the lines read before it can still be stored.
+
+    Args:
+        stream (ReadableStream): A binary stream with the `read` method.
+        gzip (bool): Whether the stream is gzip-compressed, concatenated gzip members are supported.
+        max_size (int): The maximum size of the decoded stream in bytes.
+        max_line_size (int): The maximum size of one line in bytes.
+        read_size (int): The size of one chunk.
+    """
+
+    def __init__(
+        self,
+        stream: ReadableStream,
+        gzip: bool = False,
+        max_size: int = 256 * 1024 * 1024,
+        max_line_size: int = 64 * 1024,
+        read_size: int = NDJSON_READ_SIZE,
+    ) -> None:
+        self.__stream = stream
+        self.__gzip = gzip
+        self.__max_size = max_size
+        self.__max_line_size = max_line_size
+        self.__read_size = read_size
+        self.__error: NdjsonStreamError | None = None
+
+    @property
+    def error(self) -> NdjsonStreamError | None:
+        """NdjsonStreamError | None: Returns the error which stopped reading the stream."""
+        return self.__error
+
+    def __iter__(self) -> Iterator[bytes]:
+        try:
+            yield from self.__lines()
+        except NdjsonStreamError as error:
+            self.__error = error
+
+    def __lines(self) -> Iterator[bytes]:
+        """Split the decoded chunks into lines keeping their line feeds."""
+        max_line_size = self.__max_line_size
+        rest = b""
+        # The rest of a line which is too long is skipped up to its end
+        skipping = False
+        size = 0
+        for chunk in self.__decoded_chunks():
+            size += len(chunk)
+            if size > self.__max_size:
+                raise StreamTooLarge(
+                    f"The data exceeds the limit of {self.__max_size} bytes"
+                )
+            start = 0
+            while (end := chunk.find(b"\n", start)) >= 0:
+                if skipping:
+                    skipping = False
+                else:
+                    line = chunk[start : end + 1]
+                    if rest:
+                        line = rest + line
+                        rest = b""
+                    yield line[:max_line_size]
+                start = end + 1
+            if not skipping:
+                rest += chunk[start:]
+                if len(rest) > max_line_size:
+                    # It's yielded as a malformed line
+                    yield rest[:max_line_size]
+                    rest = b""
+                    skipping = True
+        if rest:
+            yield rest
+
+    def __decoded_chunks(self) -> Iterator[bytes]:
+        """Read the stream and decompress it if it's compressed."""
+        read = self.__stream.read
+        read_size = self.__read_size
+        if not self.__gzip:
+            while chunk := read(read_size):
+                yield chunk
+            return
+
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        member_started = False
+        while data := read(read_size):
+            while data:
+                member_started = True
+                try:
+                    # The output is limited, the rest of the input is kept in `unconsumed_tail`
+                    output = decompressor.decompress(data, read_size)
+                except zlib.error as error:
+                    raise MalformedStream(f"Malformed gzip data: {error}") from None
+                if output:
+                    yield output
+                if decompressor.eof:
+                    # The next gzip member may follow
+                    data = decompressor.unused_data
+                    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                    member_started = False
+                else:
+                    data = decompressor.unconsumed_tail
+                    if not data and len(output) == read_size:
+                        # The output may be pending without new input
+                        while output := decompressor.decompress(b"", read_size):
+                            yield output
+        if member_started and not decompressor.eof:
+            raise MalformedStream("The gzip data is truncated")
@@ -0,0 +1,364 @@
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import NamedTuple
+
+from django.db import OperationalError, connections, router, transaction
+from django.db.migrations.executor import MigrationExecutor
+
+from nginx_logs.models import NginxLog
+
+PARTITION_INTERVALS = ("day", "month")
+
+_BOUNDS = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+class LogPartition(NamedTuple):
+    """
+    A partition of the log records table.
+
+    :ivar name: Table name
+    :ivar start: The first moment of the partition, None for the default partition
+    :ivar end: The moment after the partition, None for the default partition
+    """
+
+    name: str
+    start: datetime | None
+    end: datetime | None
+
+
+def period_start(moment: date, interval: str) -> datetime:
+    """Get the start of the period containing a moment.
+
+    Args:
+        moment (date): A date or a timezone-aware datetime.
+        interval (str): `day` or `month`.
+
+    Returns:
+        datetime: The start of the period in UTC.
+    """
+    if isinstance(moment, datetime):
+        moment = moment.astimezone(timezone.utc).date()
+    if interval == "month":
+        moment = moment.replace(day=1)
+    return datetime(moment.year, moment.month, moment.day, tzinfo=timezone.utc)
+
+
+def next_period_start(start: datetime, interval: str) -> datetime:
+    """Get the start of the period following the one starting at `start`."""
+    if interval == "day":
+        return start + timedelta(days=1)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(start: datetime, interval: str) -> str:
+    """Get the name of the partition of a period, e.g. `nginx_logs_nginxlog_p2024_10`."""
+    suffix = start.strftime("%Y_%m_%d" if interval == "day" else "%Y_%m")
+    return f"{NginxLog._meta.db_table}_p{suffix}"
+
+
+class LogPartitions:
+    """
+    Manages PostgreSQL range partitions of the log records table by date.
+
+    Records are inserted into the partitioned table, and PostgreSQL routes them to the partitions,
+    so writers need no changes. The records out of all the partitions are kept by the default one,
+    so an import never fails because of a missing partition; `attach_missing` moves them
+    to their partitions later.
+
+    A partitioned table cannot have unique constraints without the partition key,
+    so the primary key is `(id, date)` and fingerprints are unique with `date`.
+    A duplicate line has the same date anyway, so duplicates are still rejected.
+    Migrations of the other fields and indexes of the model apply to the partitioned table,
+    the ones changing `id`, `date` or `fingerprint` don't.
+
+    Args:
+        interval (str): The period of one partition, `day` or `month`.
+        using (str | None): The database alias, the one NginxLog is written to by default.
+
+    Raises:
+        ValueError: If the interval is unknown or the database isn't PostgreSQL.
+    """
+
+    def __init__(self, interval: str, using: str | None = None) -> None:
+        if interval not in PARTITION_INTERVALS:
+            raise ValueError(f"Unknown partition interval: {interval}")
+        self.__interval = interval
+        self.__using = using or router.db_for_write(NginxLog)
+        self.__connection = connections[self.__using]
+        if self.__connection.vendor != "postgresql":
+            raise ValueError("Partitioning needs PostgreSQL")
+        self.__table = NginxLog._meta.db_table
+        self.__quote = self.__connection.ops.quote_name
+
+    @property
+    def table(self) -> str:
+        """The name of the partitioned table."""
+        return self.__table
+
+    @property
+    def default_partition(self) -> str:
+        """The name of the default partition."""
+        return f"{self.__table}_default"
+
+    def is_partitioned(self) -> bool:
+        """Check whether the table is partitioned already."""
+        with self.__connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass)",
+                [self.__table],
+            )
+            return cursor.fetchone()[0]
+
+    def partitions(self) -> list[LogPartition]:
+        """
+        Get the partitions of the table.
+
+        Returns:
+            list[LogPartition]: The partitions ordered by their start, the default one is the last.
+        """
+        with self.__connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass",
+                [self.__table],
+            )
+            rows = cursor.fetchall()
+        partitions = []
+        for name, bounds in rows:
+            match = _BOUNDS.search(bounds)
+            partitions.append(
+                LogPartition(name, None, None)
+                if match is None
+                else LogPartition(
+                    name,
+                    datetime.fromisoformat(match[1]),
+                    datetime.fromisoformat(match[2]),
+                )
+            )
+        return sorted(
+            partitions,
+            key=lambda partition: partition.start
+            or datetime.max.replace(tzinfo=timezone.utc),
+        )
+
+    def convert(self) -> int:
+        """
+        Replace the table with a partitioned one holding the same records, in one transaction.
+
+        The partitions of all the periods of the existing records are created. The table is locked
+        while the records are copied, so it's meant to be done once, before imports are started.
+        The keys and the indexes are created from the model, so the migrations of the app must be
+        applied first, otherwise the table wouldn't match the migrations applied later.
+
+        Returns:
+            int: The number of copied records.
+
+        Raises:
+            ValueError: If the app has unapplied migrations.
+        """
+        executor = MigrationExecutor(self.__connection)
+        app_label = NginxLog._meta.app_label
+        if executor.migration_plan(
+            [key for key in executor.loader.graph.leaf_nodes() if key[0] == app_label]
+        ):
+            raise ValueError(
+                f"Apply the migrations of {app_label} before partitioning the table"
+            )
+
+        table = self.__quote(self.__table)
+        old_table = self.__quote(f"{self.__table}_unpartitioned")
+        with transaction.atomic(using=self.__using):
+            with self.__connection.cursor() as cursor:
+                # The deferred foreign key checks of the copied rows would prevent dropping the old table
+                cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+                cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+                cursor.execute(f"ALTER TABLE {table} RENAME TO {old_table}")
+                # The identity of the id column gets a new sequence, as the old one is dropped with the old table
+                cursor.execute(
+                    f"CREATE TABLE {table} (LIKE {old_table} INCLUDING DEFAULTS INCLUDING IDENTITY) "
+                    "PARTITION BY RANGE (date)"
+                )
+                self.__create_default_partition(cursor)
+                cursor.execute(f"SELECT MIN(date), MAX(date) FROM {old_table}")
+                first, last = cursor.fetchone()
+                if first is not None:
+                    start = period_start(first, self.__interval)
+                    while start <= last:
+                        self.__create_partition(cursor, start)
+                        start = next_period_start(start, self.__interval)
+                cursor.execute(
+                    f"INSERT INTO {table} OVERRIDING SYSTEM VALUE SELECT * FROM {old_table}"
+                )
+                copied = cursor.rowcount
+                # The foreign keys are created again with the names given by the migrations
+                cursor.execute(
+                    "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                    "WHERE conrelid = %s::regclass AND contype = 'f'",
+                    [f"{self.__table}_unpartitioned"],
+                )
+                foreign_keys = cursor.fetchall()
+                cursor.execute(f"DROP TABLE {old_table}")
+                cursor.execute(
+                    "SELECT setval(pg_get_serial_sequence(%s, 'id'), COALESCE(MAX(id), 0) + 1, false) "
+                    f"FROM {table}",
+                    [self.__table],
+                )
+                self.__create_constraints(cursor, foreign_keys)
+        return copied
+
+    def ensure_partitions(self, start: date, periods: int) -> list[str]:
+        """
+        Create the partitions of the periods from the one containing `start` on, if they don't exist.
+
+        The records of these periods must not be in the default partition (see `attach_missing`).
+
+        Args:
+            start (date): A moment of the first period.
+            periods (int): The number of periods.
+
+        Returns:
+            list[str]: The names of the created partitions.
+        """
+        existing = {partition.name for partition in self.partitions()}
+        created = []
+        period = period_start(start, self.__interval)
+        with self.__connection.cursor() as cursor:
+            for _ in range(periods):
+                if partition_name(period, self.__interval) not in existing:
+                    created.append(self.__create_partition(cursor, period))
+                period = next_period_start(period, self.__interval)
+        return created
+
+    def attach_missing(self) -> list[tuple[str, int]]:
+        """
+        Move the records of the default partition to new partitions of their periods.
+
+        Each partition is filled as a separate table and attached with a constraint proving its bounds,
+        in its own transaction, so imports are blocked only while one period is moved.
+
+        Returns:
+            list[tuple[str, int]]: The names of the attached partitions and the numbers of moved records.
+        """
+        default = self.__quote(self.default_partition)
+        with self.__connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT DISTINCT date_trunc(%s, date AT TIME ZONE 'UTC') FROM {default}",
+                [self.__interval],
+            )
+            periods = sorted(
+                period.replace(tzinfo=timezone.utc) for (period,) in cursor.fetchall()
+            )
+
+        attached = []
+        for start in periods:
+            end = next_period_start(start, self.__interval)
+            name = partition_name(start, self.__interval)
+            partition = self.__quote(name)
+            check = self.__quote(f"{name}_bounds")
+            with transaction.atomic(using=self.__using):
+                with self.__connection.cursor() as cursor:
+                    cursor.execute(
+                        f"CREATE TABLE {partition} (LIKE {self.__quote(self.__table)} INCLUDING DEFAULTS)"
+                    )
+                    cursor.execute(
+                        f"WITH moved AS (DELETE FROM {default} WHERE date >= %s AND date < %s RETURNING *) "
+                        f"INSERT INTO {partition} SELECT * FROM moved",
+                        [start, end],
+                    )
+                    moved = cursor.rowcount
+                    cursor.execute(
+                        f"ALTER TABLE {partition} ADD CONSTRAINT {check} CHECK (date >= %s AND date < %s)",
+                        [start, end],
+                    )
+                    cursor.execute(
+                        f"ALTER TABLE {self.__quote(self.__table)} ATTACH PARTITION {partition} "
+                        "FOR VALUES FROM (%s) TO (%s)",
+                        [start, end],
+                    )
+                    cursor.execute(f"ALTER TABLE {partition} DROP CONSTRAINT {check}")
+            attached.append((name, moved))
+        return attached
+
+    def drop_before(
+        self, cutoff: datetime, lock_timeout: float = 5.0
+    ) -> tuple[list[LogPartition], list[LogPartition]]:
+        """
+        Drop the partitions of the periods ending before `cutoff`, without deleting their records one by one.
+
+        A partition is detached first, in a short transaction, so the partitioned table is locked only
+        while the partition is unlinked, and the detached table is dropped afterwards.
+        Detaching waits for the lock at most `lock_timeout` seconds, otherwise it would block
+        the writers queued behind it (e.g. while a long import transaction holds the table).
+
+        Args:
+            cutoff (datetime): The first moment of the records to keep.
+            lock_timeout (float): The maximum time to wait for the lock of the table, in seconds.
+
+        Returns:
+            tuple[list[LogPartition], list[LogPartition]]: The dropped partitions
+                and the ones which weren't detached because the table was locked.
+        """
+        table = self.__quote(self.__table)
+        dropped, locked = [], []
+        for partition in self.partitions():
+            if partition.end is None or partition.end > cutoff:
+                continue
+            try:
+                with transaction.atomic(using=self.__using):
+                    with self.__connection.cursor() as cursor:
+                        cursor.execute(
+                            "SELECT set_config('lock_timeout', %s, true)",
+                            [f"{int(lock_timeout * 1000)}ms"],
+                        )
+                        cursor.execute(
+                            f"ALTER TABLE {table} DETACH PARTITION {self.__quote(partition.name)}"
+                        )
+            except OperationalError:
+                locked.append(partition)
+                continue
+            with self.__connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {self.__quote(partition.name)}")
+            dropped.append(partition)
+        return dropped, locked
+
+    def __create_default_partition(self, cursor) -> None:
+        """Create the partition of the records out of all the other partitions."""
+        cursor.execute(
+            f"CREATE TABLE {self.__quote(self.default_partition)} "
+            f"PARTITION OF {self.__quote(self.__table)} DEFAULT"
+        )
+
+    def __create_partition(self, cursor, start: datetime) -> str:
+        """Create the partition of the period starting at `start`."""
+        name = partition_name(start, self.__interval)
+        cursor.execute(
+            f"CREATE TABLE {self.__quote(name)} PARTITION OF {self.__quote(self.__table)} "
+            "FOR VALUES FROM (%s) TO (%s)",
+            [start, next_period_start(start, self.__interval)],
+        )
+        return name
+
+    def __create_constraints(self, cursor, foreign_keys: list[tuple[str, str]]) -> None:
+        """Create the keys and the indexes of the model on the partitioned table.
+
+        Args:
+            cursor: The cursor of the converting transaction.
+            foreign_keys (list[tuple[str, str]]): The names and the definitions of the foreign keys.
+        """
+        table = self.__quote(self.__table)
+        cursor.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {self.__quote(self.__table + '_pkey')} "
+            "PRIMARY KEY (id, date)"
+        )
+        cursor.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT "
+            f"{self.__quote(self.__table + '_fingerprint_date_uniq')} UNIQUE (fingerprint, date)"
+        )
+        for name, definition in foreign_keys:
+            cursor.execute(
+                f"ALTER TABLE {table} ADD CONSTRAINT {self.__quote(name)} {definition}"
+            )
+        # The fields of the model are indexed by Meta.indexes only
+        with self.__connection.schema_editor(atomic=False) as schema_editor:
+            for index in NginxLog._meta.indexes:
+                schema_editor.add_index(NginxLog, index)
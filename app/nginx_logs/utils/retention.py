@@ -0,0 +1,75 @@
+import re
+import time
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+
+from nginx_logs.models import NginxLog
+
+
+# The number of records deleted by one query of `delete_records_before`
+PURGE_CHUNK_SIZE = 10_000
+
+_AGE = re.compile(r"(\d+)([smhdw])")
+
+_AGE_UNITS = {
+    "s": "seconds",
+    "m": "minutes",
+    "h": "hours",
+    "d": "days",
+    "w": "weeks",
+}
+
+
+def parse_age(value: str) -> timedelta:
+    """Parse an age of records like `90d`.
+
+    Args:
+        value (str): A number with a unit: `s`, `m`, `h`, `d` or `w`.
+
+    Returns:
+        timedelta: The age.
+
+    Raises:
+        ValueError: If the value isn't an age.
+    """
+    match = _AGE.fullmatch(value.strip())
+    if match is None:
+        raise ValueError(f"Invalid age: {value!r}, expected e.g. 90d, 12h or 2w")
+    return timedelta(**{_AGE_UNITS[match[2]]: int(match[1])})
+
+
+def delete_records_before(
+    cutoff: datetime,
+    chunk_size: int = PURGE_CHUNK_SIZE,
+    sleep: float = 0.0,
+    using: str | None = None,
+) -> Iterator[int]:
+    """
+    Delete the log records dated before `cutoff` by chunks of consecutive primary keys.
+
+    Each chunk is deleted by one query in its own transaction, so only the rows of the chunk
+    are locked and a concurrent import isn't blocked. Records aren't loaded, nothing refers to them,
+    so Django deletes them without collecting. The URIs are kept, an importer may refer to them
+    without looking them up.
+
+    Args:
+        cutoff (datetime): The first moment of the records to keep.
+        chunk_size (int): The maximum number of records deleted by one query.
+        sleep (float): The pause after each chunk, in seconds, to leave DB time for other queries.
+        using (str | None): The database alias.
+
+    Yields:
+        int: The number of records deleted by each chunk.
+    """
+    queryset = NginxLog.objects.using(using).filter(date__lt=cutoff).order_by("pk")
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(chunk.values_list("pk", flat=True)[:chunk_size])
+        if not pks:
+            return
+        deleted, _ = chunk.filter(pk__lte=pks[-1]).delete()
+        last_pk = pks[-1]
+        yield deleted
+        if sleep:
+            time.sleep(sleep)
@@ -0,0 +1,343 @@
+import mmap
+import multiprocessing
+import os
+from collections.abc import Callable, Iterable, Iterator
+from functools import partial
+from typing import Any, NamedTuple
+
+import django
+from django.db import connections
+
+from app.utils import AdaptiveBatchSize, BatchModelWriter
+
+from .log_importer import LogImporter, batch_parsed_signal, flushed_signal
+from .log_reading import iter_mapped_lines
+from .log_types import LogLine, LogRecord
+
+
+COUNT_CHUNK_SIZE = 64 * 1024 * 1024
+
+
+class FileShard(NamedTuple):
+    """
+    Represents a part of a log file imported by one worker.
+
+    :ivar number: Shard number starting from 1
+    :ivar start: Offset of the first byte of the shard
+    :ivar end: Offset after the last byte of the shard
+    :ivar first_line_number: Number of the first line of the shard in the whole file
+    """
+
+    number: int
+    start: int
+    end: int
+    first_line_number: int
+
+
+class ShardResult(NamedTuple):
+    """
+    Represents the outcome of a shard import.
+
+    :ivar shard: The imported shard
+    :ivar stats: LogImporter statistics of the shard
+    :ivar batches: The number of batches used by the shard
+    :ivar flushes: Batch number, stored records count and incompleteness flag of each flush
+    :ivar parsed_batches: Batch number, parsed and malformed lines counts and malformed lines sample
+        (global line numbers and texts) of each batch
+    """
+
+    shard: FileShard
+    stats: dict[str, Any]
+    batches: int
+    flushes: list[tuple[int, int, bool]]
+    parsed_batches: list[tuple[int, int, int, list[tuple[int, str]]]]
+
+
+def split_file(path: str, parts: int) -> list[tuple[int, int]]:
+    """Split a file into byte ranges of about the same size aligned on line boundaries.
+
+    Args:
+        path (str): Path to a regular file.
+        parts (int): Desired number of ranges.
+
+    Returns:
+        A list of (start, end) offsets, it's shorter than `parts` for short files.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+
+    boundaries = [0]
+    with open(path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as mapping:
+        for part in range(1, parts):
+            position = max(size * part // parts, boundaries[-1])
+            newline = mapping.find(b"\n", position)
+            boundary = size if newline < 0 else newline + 1
+            if boundary >= size:
+                break
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+    boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def count_lines(path: str, start: int, end: int) -> int:
+    """Count newline characters in a byte range of a file.
+
+    Args:
+        path (str): Path to a file.
+        start (int): Offset of the range start.
+        end (int): Offset of the range end.
+
+    Returns:
+        The number of newline characters.
+    """
+    count = 0
+    with open(path, "rb") as file:
+        file.seek(start)
+        while start < end:
+            chunk = file.read(min(COUNT_CHUNK_SIZE, end - start))
+            if not chunk:
+                break
+            count += chunk.count(b"\n")
+            start += len(chunk)
+    return count
+
+
+def _count_range_lines(args: tuple[str, int, int]) -> int:
+    return count_lines(*args)
+
+
+def make_shards(
+    path: str,
+    parts: int,
+    map_function: Callable[..., Iterable[Any]] = map,
+) -> list[FileShard]:
+    """Split a file into shards and find out the number of the first line of each shard.
+
+    Args:
+        path (str): Path to a regular file.
+        parts (int): Desired number of shards.
+        map_function (Callable): A `map`-like function to count lines of the shards.
+
+    Returns:
+        A list of FileShard named tuples.
+    """
+    ranges = split_file(path, parts)
+    line_counts = list(
+        map_function(_count_range_lines, [(path, start, end) for start, end in ranges])
+    )
+    shards = []
+    first_line_number = 1
+    for number, ((start, end), line_count) in enumerate(
+        zip(ranges, line_counts), start=1
+    ):
+        shards.append(FileShard(number, start, end, first_line_number))
+        first_line_number += line_count
+    return shards
+
+
+def import_shard(
+    path: str,
+    shard: FileShard,
+    parser: Callable[[LogLine], LogRecord | None],
+    batch_size: int | AdaptiveBatchSize,
+    writer_class: type[BatchModelWriter] = BatchModelWriter,
+    writer_threads: int = 0,
+    fingerprint: Callable[[LogLine, LogRecord], int] | None = None,
+    quarantine: str | None = None,
+    on_shard_commit: Callable[[FileShard, int, int], None] | None = None,
+) -> ShardResult:
+    """Import a shard of a log file with its own LogImporter.
+
+    Args:
+        path (str): Path to a log file.
+        shard (FileShard): The shard to import.
+        parser (Callable): A log line parser, it must be picklable to be sent to a worker process.
+        batch_size (int | AdaptiveBatchSize): The number of records to store in one bulk operation.
+        writer_class (type(BatchModelWriter)): The class of the writer storing batches into DB.
+        writer_threads (int): The number of threads storing batches while the next ones are parsed.
+        fingerprint (Callable | None): A picklable function fingerprinting records to drop duplicates.
+        quarantine (str | None): The source to quarantine malformed lines with, they aren't stored if it's None.
+        on_shard_commit (Callable | None): A picklable function called with the shard and the numbers
+            of bytes and lines parsed so far in the DB transaction storing each batch.
+
+    Returns:
+        ShardResult named tuple.
+    """
+    importer = LogImporter(
+        parser,
+        batch_size,
+        shard.first_line_number,
+        writer_class,
+        writer_threads,
+        on_commit=None if on_shard_commit is None else partial(on_shard_commit, shard),
+        fingerprint=fingerprint,
+        quarantine=quarantine,
+    )
+    flushes: list[tuple[int, int, bool]] = []
+    parsed_batches: list[tuple[int, int, int, list[tuple[int, str]]]] = []
+
+    def flushed_handler(batch_number, records_stored, batch_incomplete, **kwargs):
+        flushes.append((batch_number, records_stored, batch_incomplete))
+
+    def batch_parsed_handler(
+        batch_number, lines_parsed, lines_malformed, malformed_lines, **kwargs
+    ):
+        parsed_batches.append(
+            (batch_number, lines_parsed, lines_malformed, malformed_lines)
+        )
+
+    flushed_signal.connect(flushed_handler, sender=importer)
+    batch_parsed_signal.connect(batch_parsed_handler, sender=importer)
+    try:
+        with open(path, "rb") as file:
+            importer.parse(iter_mapped_lines(file, shard.start, shard.end))
+    finally:
+        flushed_signal.disconnect(flushed_handler, sender=importer)
+        batch_parsed_signal.disconnect(batch_parsed_handler, sender=importer)
+
+    return ShardResult(
+        shard,
+        importer.stats,
+        importer.current_batch_number - 1,
+        flushes,
+        parsed_batches,
+    )
+
+
+def _import_shard(args: tuple) -> ShardResult:
+    return import_shard(*args)
+
+
+def _import_shard_in_worker(args: tuple) -> ShardResult:
+    try:
+        return import_shard(*args)
+    finally:
+        # Every worker process has its own DB connection
+        connections.close_all()
+
+
+def import_file_sharded(
+    path: str,
+    workers: int,
+    parser: Callable[[LogLine], LogRecord | None],
+    batch_size: int | AdaptiveBatchSize,
+    map_function: Callable[..., Iterable[Any]] | None = None,
+    writer_class: type[BatchModelWriter] = BatchModelWriter,
+    writer_threads: int = 0,
+    fingerprint: Callable[[LogLine, LogRecord], int] | None = None,
+    quarantine: str | None = None,
+    shards: list[FileShard] | None = None,
+    on_shard_commit: Callable[[FileShard, int, int], None] | None = None,
+) -> Iterator[ShardResult]:
+    """Import a regular log file by several worker processes.
+
+    The file is split into byte ranges aligned on line boundaries, and each of them is imported
+    by its own LogImporter with its own DB connection.
+
+    Args:
+        path (str): Path to a regular file.
+        workers (int): The number of worker processes.
+        parser (Callable): A log line parser, it must be picklable (e.g. a module-level function).
+        batch_size (int | AdaptiveBatchSize): The number of records to store in one bulk operation.
+        map_function (Callable | None): A `map`-like function to run shard imports with.
+            By default, it's `imap` of a process pool.
+        writer_class (type(BatchModelWriter)): The class of the writer storing batches into DB.
+        writer_threads (int): The number of threads storing batches in each worker process.
+        fingerprint (Callable | None): A picklable function fingerprinting records to drop duplicates.
+            Duplicates in different shards are dropped by DB.
+        quarantine (str | None): The source to quarantine malformed lines with, they aren't stored if it's None.
+            The batch numbers of quarantined lines are counted from 1 in each shard.
+        shards (list[FileShard] | None): The shards to import, e.g. the rest of an interrupted import.
+            By default, the file is split into `workers` shards.
+        on_shard_commit (Callable | None): A picklable function called with a shard and the numbers
+            of bytes and lines parsed so far in the DB transaction storing each batch of the shard,
+            e.g. to save the position of the shard with the records.
+
+    Yields:
+        ShardResult named tuples in the order of the shards as soon as they are ready.
+    """
+    if map_function is not None:
+        if shards is None:
+            shards = make_shards(path, workers, map_function)
+        yield from map_function(
+            _import_shard,
+            [
+                (
+                    path,
+                    shard,
+                    parser,
+                    batch_size,
+                    writer_class,
+                    writer_threads,
+                    fingerprint,
+                    quarantine,
+                    on_shard_commit,
+                )
+                for shard in shards
+            ],
+        )
+        return
+
+    # Child processes must not share the DB connections of the parent process
+    connections.close_all()
+    with multiprocessing.get_context().Pool(workers, initializer=django.setup) as pool:
+        if shards is None:
+            shards = make_shards(path, workers, pool.map)
+        yield from pool.imap(
+            _import_shard_in_worker,
+            [
+                (
+                    path,
+                    shard,
+                    parser,
+                    batch_size,
+                    writer_class,
+                    writer_threads,
+                    fingerprint,
+                    quarantine,
+                    on_shard_commit,
+                )
+                for shard in shards
+            ],
+        )
+
+
+def merge_shard_stats(results: Iterable[ShardResult]) -> dict[str, Any]:
+    """Merge LogImporter statistics of the shards.
+
+    Batch numbers of incomplete batches are made global: batches of each shard follow the ones of the
+    previous shard. The numbers of quarantined lines are summed if the shards quarantine them.
+
+    Args:
+        results (Iterable[ShardResult]): Results of the shards in their order.
+
+    Returns:
+        dict: Statistics in the format of `LogImporter.stats`.
+    """
+    merged: dict[str, Any] = {
+        "total": 0,
+        "bytes": 0,
+        "skipped": 0,
+        "stored": 0,
+        "duplicates": 0,
+        "incomplete_batches": {},
+        "batch_sizes": {},
+    }
+    batch_offset = 0
+    for result in results:
+        for key in ("total", "bytes", "skipped", "stored", "duplicates"):
+            merged[key] += result.stats[key]
+        for batch_number, records_count in result.stats["incomplete_batches"].items():
+            merged["incomplete_batches"][batch_offset + batch_number] = records_count
+        for batch_number, batch_size in result.stats["batch_sizes"].items():
+            merged["batch_sizes"][batch_offset + batch_number] = batch_size
+        if "quarantined" in result.stats:
+            merged["quarantined"] = (
+                merged.get("quarantined", 0) + result.stats["quarantined"]
+            )
+        batch_offset += result.batches
+    return merged
@@ -0,0 +1,204 @@
+import asyncio
+import queue
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from django.db import connections
+
+from app.utils import BatchModelWriter
+from nginx_logs.models import NginxLog
+
+from .log_types import LogLine, LogRecord
+from .uri_interning import NGINX_LOG_ROW_FIELDS, UriInterner
+
+
+def strip_syslog_header(datagram: bytes) -> bytes:
+    """
+    Get the JSON message of a syslog datagram sent by nginx.
+
+    The header (`<190>Oct 18 09:00:00 host nginx: ` or an RFC 5424 one) doesn't contain braces,
+    so the message starts with the first opening brace.
+
+    Args:
+        datagram (bytes): The datagram.
+
+    Returns:
+        bytes: The message, or the whole datagram if there's no JSON object in it.
+    """
+    start = datagram.find(b"{")
+    return datagram if start <= 0 else datagram[start:]
+
+
+class SyslogBatchStorer:
+    """
+    Stores batches of log records by a worker thread.
+
+    Batches are passed to the thread through a bounded queue. If the thread falls behind and the queue
+    is full, a new batch is dropped, so the caller is never blocked. The worker thread uses its own
+    DB connection, and a batch which fails to be stored is dropped too.
+    The new URIs of a batch are stored before it (see `UriInterner`).
+
+    Args:
+        batch_size (int): The maximum number of records in a batch.
+        queue_size (int): The number of batches waiting to be stored.
+        writer_class (type(BatchModelWriter)): The class of the writer storing batches into DB.
+        on_error (Callable | None): A function called with an exception raised on storing a batch.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        queue_size: int = 10,
+        writer_class: type[BatchModelWriter[NginxLog]] = BatchModelWriter,
+        on_error: Callable[[Exception], None] | None = None,
+    ) -> None:
+        self.__writer = writer_class(NginxLog, batch_size, fields=NGINX_LOG_ROW_FIELDS)
+        self.__uris = UriInterner()
+        self.__on_error = on_error
+        self.__batches: queue.Queue[list[LogRecord] | None] = queue.Queue(queue_size)
+        self.__stored = 0
+        self.__dropped = 0
+        self.__failed = 0
+        self.__thread = threading.Thread(target=self.__store_batches, daemon=True)
+        self.__thread.start()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """
+        The numbers of stored records, the ones dropped as the queue was full and the ones failed to be stored.
+        """
+        return {
+            "stored": self.__stored,
+            "dropped": self.__dropped,
+            "failed": self.__failed,
+        }
+
+    def submit(self, records: list[LogRecord]) -> bool:
+        """
+        Queue a batch for storing.
+
+        Args:
+            records (list[LogRecord]): The batch.
+
+        Returns:
+            bool: False if the batch is dropped.
+        """
+        try:
+            self.__batches.put_nowait(records)
+        except queue.Full:
+            self.__dropped += len(records)
+            return False
+        return True
+
+    def close(self) -> None:
+        """
+        Wait until the queued batches are stored and stop the worker thread.
+        """
+        self.__batches.put(None)
+        self.__thread.join()
+
+    def __store_batches(self) -> None:
+        """Worker thread loop."""
+        try:
+            while (records := self.__batches.get()) is not None:
+                try:
+                    rows = [self.__uris.row(record) for record in records]
+                    self.__uris.flush()
+                    for row in rows:
+                        self.__writer.add(row)
+                    self.__writer.flush()
+                except Exception as error:
+                    # The writer keeps the records it failed to store, so they're dropped with it
+                    self.__writer = type(self.__writer)(
+                        NginxLog, self.__writer.batch_size, fields=NGINX_LOG_ROW_FIELDS
+                    )
+                    self.__failed += len(records)
+                    if self.__on_error is not None:
+                        self.__on_error(error)
+                else:
+                    self.__stored += len(records)
+        finally:
+            connections.close_all()
+
+
+class SyslogProtocol(asyncio.DatagramProtocol):
+    """
+    Receives nginx JSON logs sent over syslog UDP and collects them to batches.
+
+    Every datagram is one log line. A batch is submitted to the storer when it's full
+    or when its first record is older than `flush_interval` (see `flush_expired`).
+
+    Args:
+        parser (Callable): A callable object to parse a log line.
+        storer (SyslogBatchStorer): The storer of batches.
+        batch_size (int): The number of records in a full batch.
+        flush_interval (float): The maximum time of collecting one batch in seconds.
+    """
+
+    def __init__(
+        self,
+        parser: Callable[[LogLine], LogRecord | None],
+        storer: SyslogBatchStorer,
+        batch_size: int,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self.__parser = parser
+        self.__storer = storer
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__records: list[LogRecord] = []
+        self.__batch_started = 0.0
+        self.__packets = 0
+        self.__malformed = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """
+        The statistics of receiving and storing.
+
+        Returns:
+            dict: A dictionary containing the numbers of received packets, malformed ones,
+                the records which are stored, dropped because of the full queue and failed to be stored.
+        """
+        return {
+            "packets": self.__packets,
+            "malformed": self.__malformed,
+            **self.__storer.stats,
+        }
+
+    def datagram_received(self, data: bytes, addr: Any) -> None:
+        self.__packets += 1
+        try:
+            record = self.__parser(strip_syslog_header(data))
+        except Exception:
+            # A packet mustn't stop the server, whatever it contains
+            record = None
+        if record is None:
+            self.__malformed += 1
+            return
+
+        if not self.__records:
+            self.__batch_started = time.monotonic()
+        self.__records.append(record)
+        if len(self.__records) >= self.__batch_size:
+            self.flush()
+
+    def flush_expired(self) -> None:
+        """
+        Submit the current batch if it's collected for longer than the flush interval.
+        """
+        if (
+            self.__records
+            and time.monotonic() - self.__batch_started >= self.__flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Submit the current batch to the storer and start a new one.
+        """
+        if self.__records:
+            self.__storer.submit(self.__records)
+            self.__records = []
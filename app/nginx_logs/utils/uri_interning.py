@@ -0,0 +1,119 @@
+import hashlib
+from collections import OrderedDict
+
+from nginx_logs.models import Uri
+
+from .log_types import LogRecord
+
+
+# The number of the recently used URIs remembered by UriInterner
+URI_CACHE_SIZE = 100_000
+
+# Names of NginxLog fields of the rows made by UriInterner, a URI is replaced with the id of its Uri row
+NGINX_LOG_ROW_FIELDS = tuple(
+    "uri_id" if name == "uri" else name for name in LogRecord._fields
+)
+
+_URI_INDEX = LogRecord._fields.index("uri")
+
+
+def uri_id(uri: str) -> int:
+    """Get the id of the Uri row of a URI, it's a hash of the URI.
+
+    As ids are computed, records can refer to the URIs without looking them up in DB.
+
+    Args:
+        uri (str): The URI.
+
+    Returns:
+        A signed 64-bit hash.
+    """
+    return int.from_bytes(
+        hashlib.blake2b(uri.encode(errors="surrogatepass"), digest_size=8).digest(),
+        "little",
+        signed=True,
+    )
+
+
+class UriInterner:
+    """
+    Maps URIs to the ids of their Uri rows and stores the new URIs by batches.
+
+    The recently used URIs are kept in an LRU map, so the frequent ones are neither hashed
+    nor stored again. The URIs missing in the map are collected until `flush`, which must be called
+    before the records referring to them are stored. A URI which is already stored is skipped by DB.
+
+    Args:
+        cache_size (int): The maximum number of URIs in the map.
+    """
+
+    def __init__(self, cache_size: int = URI_CACHE_SIZE) -> None:
+        self.__cache_size = cache_size
+        self.__ids: OrderedDict[str, int] = OrderedDict()
+        self.__pending: dict[str, int] = {}
+        self.__stored = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """
+        The numbers of URIs in the map and of the ones passed to DB (including the ones stored already).
+        """
+        return {"cached": len(self.__ids), "stored": self.__stored}
+
+    def intern(self, uri: str) -> int:
+        """
+        Get the id of a URI, the URI is stored on the next flush unless it's used recently.
+
+        Args:
+            uri (str): The URI.
+
+        Returns:
+            int: The id of the Uri row.
+        """
+        ids = self.__ids
+        id_ = ids.get(uri)
+        if id_ is not None:
+            ids.move_to_end(uri)
+            return id_
+        id_ = ids[uri] = self.__pending[uri] = uri_id(uri)
+        if len(ids) > self.__cache_size:
+            ids.popitem(last=False)
+        return id_
+
+    def row(self, record: LogRecord) -> tuple:
+        """
+        Make a row of `NGINX_LOG_ROW_FIELDS` values of a record.
+
+        Args:
+            record (LogRecord): The parsed record.
+
+        Returns:
+            tuple: The record values with the URI id instead of the URI.
+        """
+        return (
+            *record[:_URI_INDEX],
+            self.intern(record.uri),
+            *record[_URI_INDEX + 1 :],
+        )
+
+    def flush(self) -> int:
+        """
+        Store the URIs collected since the previous flush in one bulk operation.
+
+        Returns:
+            int: The number of URIs passed to DB.
+        """
+        if not self.__pending:
+            return 0
+        # Concurrent importers insert URIs in the same order, so they don't deadlock
+        Uri.objects.bulk_create(
+            [
+                Uri(id=id_, value=uri)
+                for uri, id_ in sorted(self.__pending.items(), key=lambda item: item[1])
+            ],
+            ignore_conflicts=True,
+        )
+        count = len(self.__pending)
+        self.__pending = {}
+        self.__stored += count
+        return count
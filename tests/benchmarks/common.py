@@ -0,0 +1,113 @@
+"""Shared helpers of benchmark scripts.
+
+Benchmarks are plain scripts which are run from the repository root or from the
+tests container, e.g. `python tests/benchmarks/json_backends.py --lines 100000`.
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+
+def setup_django() -> None:
+    """Make the application importable and configure Django.
+
+    An in-memory SQLite database is used unless the environment tells otherwise.
+    """
+    root = Path(__file__).resolve().parents[2]
+    app_dir = root / "app" if (root / "app").is_dir() else root
+    sys.path.insert(0, str(app_dir))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "app.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("DATABASE_ENGINE", "django.db.backends.sqlite3")
+    os.environ.setdefault("DB_NAME", ":memory:")
+
+    import django
+
+    django.setup()
+
+
+def make_log_lines(count: int, seed: int = 0) -> list[str]:
+    """Make nginx JSON log lines with the production-like set of keys.
+
+    Args:
+        count (int): A number of lines.
+        seed (int): Random generator seed.
+
+    Returns:
+        A list of JSON log lines.
+    """
+    rnd = random.Random(seed)
+    months = ("Jan", "Feb", "Mar", "Apr", "May", "Jun")
+    lines = []
+    for i in range(count):
+        item = {
+            "time": f"{rnd.randint(1, 28):02}/{rnd.choice(months)}/2024:"
+            f"{rnd.randint(0, 23):02}:{rnd.randint(0, 59):02}:{rnd.randint(0, 59):02} +0000",
+            "remote_ip": f"10.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}",
+            "remote_user": "-",
+            "request": f"GET /downloads/product_{rnd.randint(1, 3)} HTTP/1.1",
+            "response": rnd.choice((200, 200, 200, 304, 404)),
+            "bytes": rnd.randint(0, 100000),
+            "referrer": "-",
+            "agent": "Debian APT-HTTP/1.3 (0.8.10.3)",
+            "host": "downloads.example.com",
+            "request_time": f"{rnd.random():.3f}",
+            "upstream_response_time": f"{rnd.random():.3f}",
+            "upstream_addr": "127.0.0.1:8080",
+            "http_x_forwarded_for": "-",
+            "ssl_protocol": "TLSv1.3",
+            "request_id": f"{rnd.getrandbits(128):032x}",
+        }
+        lines.append(json.dumps(item) + "\n")
+    return lines
+
+
+def measure(function: Callable[[], object], repeat: int = 3) -> float:
+    """Run a function several times and return the best wall time in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def relation_sizes(connection, models: list) -> dict[str, dict[str, float]]:
+    """Measure the size of the tables of models and of their indexes in megabytes.
+
+    Args:
+        connection: A PostgreSQL or SQLite (with the `dbstat` table) DB connection.
+        models (list[type(Model)]): Model classes.
+
+    Returns:
+        A dict of the table and index sizes by table names, it's empty on other databases.
+    """
+    sizes = {}
+    with connection.cursor() as cursor:
+        for model in models:
+            table = model._meta.db_table
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    "SELECT pg_table_size(%s), pg_indexes_size(%s)", [table, table]
+                )
+                table_size, indexes_size = cursor.fetchone()
+            elif connection.vendor == "sqlite":
+                cursor.execute(
+                    "SELECT m.type = 'table', SUM(s.pgsize) FROM dbstat s "
+                    "JOIN sqlite_master m ON m.name = s.name WHERE m.tbl_name = %s GROUP BY 1",
+                    [table],
+                )
+                by_kind = dict(cursor.fetchall())
+                table_size, indexes_size = by_kind.get(1, 0), by_kind.get(0, 0)
+            else:
+                continue
+            sizes[table] = {
+                "table_mb": round(table_size / 1024 / 1024, 2),
+                "indexes_mb": round(indexes_size / 1024 / 1024, 2),
+            }
+    return sizes
@@ -0,0 +1,204 @@
+"""Measures the log import throughput stage by stage and reports it as JSON.
+
+The log is generated by `log_generator.py` with a fixed seed, or read from a file. It's processed
+by chunks, and the time of every stage is accumulated separately: reading lines, parsing them,
+interning URIs, making model instances and storing batches with `BatchModelWriter`.
+The end-to-end import by `LogImporter` is measured too, and so are the sizes of the tables
+and their indexes after the stage-by-stage import. The peak RSS of a stage is the peak of the process by the end
+of its last run. Save the reports of different commits and compare them, e.g.
+
+`python tests/benchmarks/ingestion.py --lines 1000000 --output after.json --baseline before.json`
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from itertools import islice
+from pathlib import Path
+
+from common import relation_sizes, setup_django
+from log_generator import LogGenerator
+
+
+def peak_rss_megabytes() -> float:
+    """Peak resident set size of the process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def git_commit() -> str | None:
+    """The commit of the working tree, to tell the reports apart."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class StageTimer:
+    """Accumulates the time of the benchmark stages."""
+
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = {}
+        self.peak_rss: dict[str, float] = {}
+
+    def run(self, stage: str, function, *args):
+        started = time.perf_counter()
+        result = function(*args)
+        self.seconds[stage] = (
+            self.seconds.get(stage, 0.0) + time.perf_counter() - started
+        )
+        self.peak_rss[stage] = peak_rss_megabytes()
+        return result
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--lines", type=int, default=1_000_000)
+    argparser.add_argument("--seed", type=int, default=0)
+    argparser.add_argument("--malformed-ratio", type=float, default=0.001)
+    argparser.add_argument("--uri-cardinality", type=int, default=1000)
+    argparser.add_argument("--ipv6-ratio", type=float, default=0.1)
+    argparser.add_argument(
+        "--log", help="Import this log file instead of the generated one"
+    )
+    argparser.add_argument("--batch-size", type=int, default=2000)
+    argparser.add_argument("--chunk-size", type=int, default=100_000)
+    argparser.add_argument("--writer", choices=("bulk", "copy"), default="bulk")
+    argparser.add_argument(
+        "--models",
+        action="store_true",
+        help="Store model instances instead of LogRecord rows",
+    )
+    argparser.add_argument("--output", help="Write the JSON report to this file")
+    argparser.add_argument("--baseline", help="A previous JSON report to compare with")
+    args = argparser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from django.db import connection
+
+    from app.utils import BatchModelWriter, CopyModelWriter
+    from nginx_logs.models import NginxLog, Uri
+    from nginx_logs.utils import (
+        NGINX_LOG_ROW_FIELDS,
+        LogImporter,
+        UriInterner,
+        parse_json_log_record,
+    )
+
+    call_command("migrate", verbosity=0)
+    writer_class = {"bulk": BatchModelWriter, "copy": CopyModelWriter}[args.writer]
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = args.log
+        if log_path is None:
+            log_path = os.path.join(directory, "access.log")
+            generator = LogGenerator(
+                args.seed, args.malformed_ratio, args.uri_cardinality, args.ipv6_ratio
+            )
+            with open(log_path, "w") as file:
+                file.writelines(generator.lines(args.lines))
+        log_size = os.path.getsize(log_path)
+
+        timer = StageTimer()
+        lines_count = records_count = 0
+        writer = writer_class[NginxLog](
+            NginxLog,
+            args.batch_size,
+            fields=None if args.models else NGINX_LOG_ROW_FIELDS,
+        )
+        uris = UriInterner()
+        with open(log_path) as file:
+            while True:
+                lines = timer.run("read", list, islice(file, args.chunk_size))
+                if not lines:
+                    break
+                lines_count += len(lines)
+                parsed = timer.run("parse", list, map(parse_json_log_record, lines))
+                records = [record for record in parsed if record is not None]
+                records_count += len(records)
+                rows = timer.run("intern", list, map(uris.row, records))
+                timer.run("intern", uris.flush)
+                models = timer.run(
+                    "models",
+                    list,
+                    (NginxLog(**dict(zip(NGINX_LOG_ROW_FIELDS, row))) for row in rows),
+                )
+                timer.run(
+                    "store",
+                    deque,
+                    map(writer.add, models if args.models else rows),
+                    0,
+                )
+                del lines, parsed, records, rows, models
+        timer.run("store", writer.flush)
+        sizes = relation_sizes(connection, [NginxLog, Uri])
+
+        NginxLog.objects.all().delete()
+        importer = LogImporter(
+            parse_json_log_record,
+            args.batch_size,
+            writer_class=writer_class,
+            raw_rows=not args.models,
+        )
+        with open(log_path) as file:
+            timer.run("import", importer.parse, file)
+        NginxLog.objects.all().delete()
+
+    stages = {
+        stage: {
+            "seconds": round(seconds, 4),
+            "lines_per_sec": round(lines_count / max(seconds, 1e-9)),
+            "peak_rss_mb": round(timer.peak_rss[stage], 1),
+        }
+        for stage, seconds in timer.seconds.items()
+    }
+    stages["models"]["note"] = "not a part of the import unless --models is given"
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "database": connection.vendor,
+        "parameters": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "baseline")
+        },
+        "lines": lines_count,
+        "records": records_count,
+        "megabytes": round(log_size / 1024 / 1024, 2),
+        "stages": stages,
+        "sizes": sizes,
+        "peak_rss_mb": round(peak_rss_megabytes(), 1),
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        print(f"\nCompared with {baseline.get('commit')}:", file=sys.stderr)
+        for stage, result in stages.items():
+            if stage in baseline["stages"]:
+                speedup = baseline["stages"][stage]["seconds"] / max(
+                    result["seconds"], 1e-9
+                )
+                print(f"{stage:<10}{speedup:>8.2f}x", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Measures JSON log parsing throughput of every installed JSON backend."""
+
+import argparse
+from collections import deque
+
+from common import make_log_lines, measure, setup_django
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--lines", type=int, default=200_000)
+    argparser.add_argument("--repeat", type=int, default=3)
+    args = argparser.parse_args()
+
+    setup_django()
+    from nginx_logs.utils.json_backends import JSON_BACKENDS
+    from nginx_logs.utils.json_log_parsing import (
+        parse_json_log_record,
+        parse_json_log_records,
+    )
+
+    lines = make_log_lines(args.lines)
+    expected = [parse_json_log_record(line, JSON_BACKENDS["json"]) for line in lines]
+
+    print(f"{'backend':<20}{'lines/sec':>14}")
+    per_line_time = measure(
+        lambda: deque(map(parse_json_log_record, lines), maxlen=0), args.repeat
+    )
+    print(f"{'per-line (default)':<20}{args.lines / per_line_time:>14,.0f}")
+    for name, backend in JSON_BACKENDS.items():
+        assert list(parse_json_log_records(lines, backend)) == expected, name
+        elapsed = measure(
+            lambda: deque(parse_json_log_records(lines, backend), maxlen=0),
+            args.repeat,
+        )
+        print(f"{name:<20}{args.lines / elapsed:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Compares the Nginx timestamp decoder with `datetime.strptime`."""
+
+import argparse
+import json
+from collections import deque
+from datetime import datetime
+
+from common import make_log_lines, measure, setup_django
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--values", type=int, default=200_000)
+    argparser.add_argument("--repeat", type=int, default=3)
+    args = argparser.parse_args()
+
+    setup_django()
+    from nginx_logs.utils.json_log_parsing import (
+        LOG_DATETIME_FORMAT,
+        LogDatetimeDecoder,
+    )
+
+    # Log lines are sorted by time in real logs, which is the cache-friendly case
+    values = sorted(json.loads(line)["time"] for line in make_log_lines(args.values))
+
+    def strptime(value: str) -> datetime:
+        return datetime.strptime(value, LOG_DATETIME_FORMAT)
+
+    decoder = LogDatetimeDecoder()
+    assert list(map(decoder, values)) == list(map(strptime, values))
+
+    print(f"{'decoder':<20}{'values/sec':>14}")
+    for name, function in (("strptime", strptime), ("LogDatetimeDecoder", decoder)):
+        elapsed = measure(lambda: deque(map(function, values), maxlen=0), args.repeat)
+        print(f"{name:<20}{args.values / elapsed:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
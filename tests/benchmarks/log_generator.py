@@ -0,0 +1,160 @@
+"""Writes a reproducible synthetic nginx JSON log.
+
+The same seed and parameters always give the same lines, so benchmark runs on different
+commits import the same data, e.g.
+
+`python tests/benchmarks/log_generator.py --lines 1000000 --output /tmp/access.log`
+"""
+
+import argparse
+import ipaddress
+import itertools
+import json
+import random
+import sys
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+
+
+METHODS = ("GET", "GET", "GET", "GET", "GET", "GET", "POST", "POST", "HEAD", "PUT")
+STATUSES = (200,) * 16 + (206, 301, 302, 304, 304, 400, 403, 404, 404, 500, 502)
+AGENTS = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:131.0) Gecko/20100101 Firefox/131.0",
+    "Debian APT-HTTP/1.3 (2.6.1)",
+    "curl/8.5.0",
+    "Googlebot/2.1 (+http://www.google.com/bot.html)",
+)
+URI_SECTIONS = ("downloads", "static", "api/v1", "docs", "images", "blog")
+URI_EXTENSIONS = ("", ".html", ".js", ".css", ".png", ".deb", ".json")
+
+
+class LogGenerator:
+    """Generates realistic nginx JSON log lines in time order.
+
+    URIs follow the Zipf distribution, so a few of them are requested most of the time,
+    and requests come from a fixed pool of clients.
+
+    Args:
+        seed (int): Random generator seed.
+        malformed_ratio (float): The share of malformed lines.
+        uri_cardinality (int): The number of distinct URIs.
+        ipv6_ratio (float): The share of IPv6 clients.
+        clients (int): The number of distinct client addresses.
+        requests_per_second (float): The average request rate which the timestamps follow.
+        start (datetime): The time of the first request.
+    """
+
+    def __init__(
+        self,
+        seed: int = 0,
+        malformed_ratio: float = 0.0,
+        uri_cardinality: int = 1000,
+        ipv6_ratio: float = 0.1,
+        clients: int = 5000,
+        requests_per_second: float = 100.0,
+        start: datetime = datetime(2024, 1, 1, tzinfo=timezone.utc),
+    ) -> None:
+        self.__random = random.Random(seed)
+        self.__malformed_ratio = malformed_ratio
+        self.__requests_per_second = requests_per_second
+        self.__time = start
+        self.__uris = [self.__make_uri(number) for number in range(uri_cardinality)]
+        self.__uri_weights = list(
+            itertools.accumulate(1 / rank for rank in range(1, uri_cardinality + 1))
+        )
+        self.__clients = [
+            self.__make_ip(self.__random.random() < ipv6_ratio) for _ in range(clients)
+        ]
+
+    def __make_uri(self, number: int) -> str:
+        """Make a URI of a site section with a file extension."""
+        section = self.__random.choice(URI_SECTIONS)
+        extension = self.__random.choice(URI_EXTENSIONS)
+        return f"/{section}/item_{number}{extension}"
+
+    def __make_ip(self, ipv6: bool) -> str:
+        """Make a client address, IPv6 ones are in the documentation prefix."""
+        if ipv6:
+            return str(
+                ipaddress.IPv6Address(0x2001_0DB8 << 96 | self.__random.getrandbits(96))
+            )
+        return str(
+            ipaddress.IPv4Address(self.__random.randrange(0x0B000000, 0xDF000000))
+        )
+
+    def lines(self, count: int) -> Iterator[str]:
+        """Generate log lines.
+
+        Args:
+            count (int): The number of lines.
+
+        Yields:
+            Log lines ending with a line feed.
+        """
+        rnd = self.__random
+        for _ in range(count):
+            self.__time += timedelta(
+                seconds=rnd.expovariate(self.__requests_per_second)
+            )
+            uri = rnd.choices(self.__uris, cum_weights=self.__uri_weights)[0]
+            if rnd.random() < 0.1:
+                uri += f"?page={rnd.randint(1, 50)}"
+            item = {
+                "time": self.__time.strftime("%d/%b/%Y:%H:%M:%S %z"),
+                "remote_ip": rnd.choice(self.__clients),
+                "remote_user": "-",
+                "request": f"{rnd.choice(METHODS)} {uri} HTTP/1.1",
+                "response": rnd.choice(STATUSES),
+                "bytes": int(rnd.lognormvariate(8, 2)),
+                "referrer": "-",
+                "agent": rnd.choice(AGENTS),
+                "request_time": f"{rnd.expovariate(20):.3f}",
+                "request_id": f"{rnd.getrandbits(128):032x}",
+            }
+            line = json.dumps(item)
+            if rnd.random() < self.__malformed_ratio:
+                line = self.__malform(line, item)
+            yield line + "\n"
+
+    def __malform(self, line: str, item: dict) -> str:
+        """Break a line in one of the ways seen in real logs."""
+        kind = self.__random.randrange(4)
+        if kind == 0:
+            # Truncated by a crash or by log rotation
+            return line[: self.__random.randrange(1, len(line))]
+        if kind == 1:
+            # A request line of a scanner
+            return json.dumps({**item, "request": "\\x16\\x03\\x01"})
+        if kind == 2:
+            return json.dumps({**item, "time": "-"})
+        return "-- not a JSON line --"
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--lines", type=int, default=1_000_000)
+    argparser.add_argument("--seed", type=int, default=0)
+    argparser.add_argument("--malformed-ratio", type=float, default=0.001)
+    argparser.add_argument("--uri-cardinality", type=int, default=1000)
+    argparser.add_argument("--ipv6-ratio", type=float, default=0.1)
+    argparser.add_argument("--clients", type=int, default=5000)
+    argparser.add_argument(
+        "--output", default="-", help="The output file, '-' for stdout"
+    )
+    args = argparser.parse_args()
+
+    generator = LogGenerator(
+        args.seed,
+        args.malformed_ratio,
+        args.uri_cardinality,
+        args.ipv6_ratio,
+        args.clients,
+    )
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    with output:
+        output.writelines(generator.lines(args.lines))
+
+
+if __name__ == "__main__":
+    main()
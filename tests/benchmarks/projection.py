@@ -0,0 +1,73 @@
+"""Compares the field-projecting parser with full JSON decoding on wide log lines."""
+
+import argparse
+import json
+from collections import deque
+
+from common import make_log_lines, measure, setup_django
+
+
+def widen(line: str, extra_keys: int, value_width: int) -> str:
+    """Add extra keys to the end of a JSON log line, like cookies or user agent strings."""
+    item = json.loads(line)
+    for i in range(extra_keys):
+        item[f"http_x_extra_{i}"] = f"{i}" * value_width
+    return json.dumps(item) + "\n"
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--lines", type=int, default=100_000)
+    argparser.add_argument("--extra-keys", type=int, default=10)
+    argparser.add_argument("--value-width", type=int, default=100)
+    argparser.add_argument("--repeat", type=int, default=3)
+    args = argparser.parse_args()
+
+    setup_django()
+    from nginx_logs.utils.json_backends import JSON_BACKENDS, make_field_projector
+    from nginx_logs.utils.json_log_parsing import (
+        LOG_RECORD_KEYS,
+        parse_json_log_record,
+        parse_projected_json_log_record,
+    )
+
+    lines = [
+        widen(line, args.extra_keys, args.value_width)
+        for line in make_log_lines(args.lines)
+    ]
+    average_width = sum(map(len, lines)) / len(lines)
+    expected = [parse_json_log_record(line, JSON_BACKENDS["json"]) for line in lines]
+    assert list(map(parse_projected_json_log_record, lines)) == expected
+
+    print(f"Average line width: {average_width:.0f} characters")
+    projector = make_field_projector(LOG_RECORD_KEYS)
+    if projector is None:
+        print(
+            "No projecting backend is installed, projection falls back to full decoding"
+        )
+
+    print(f"\n{'decoding only':<24}{'lines/sec':>14}")
+    decoders = {
+        f"full ({name})": backend.loads for name, backend in JSON_BACKENDS.items()
+    }
+    if projector is not None:
+        decoders["projected"] = projector
+    for name, decoder in decoders.items():
+        elapsed = measure(lambda: deque(map(decoder, lines), maxlen=0), args.repeat)
+        print(f"{name:<24}{args.lines / elapsed:>14,.0f}")
+
+    print(f"\n{'LogRecord parsing':<24}{'lines/sec':>14}")
+    parsers = {
+        f"full ({name})": lambda line, backend=backend: parse_json_log_record(
+            line, backend
+        )
+        for name, backend in JSON_BACKENDS.items()
+    }
+    parsers["projected"] = parse_projected_json_log_record
+    for name, parser in parsers.items():
+        elapsed = measure(lambda: deque(map(parser, lines), maxlen=0), args.repeat)
+        print(f"{name:<24}{args.lines / elapsed:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
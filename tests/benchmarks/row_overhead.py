@@ -0,0 +1,66 @@
+"""Measures the per-row overhead of storing parsed records with and without model instances."""
+
+import argparse
+from collections import deque
+
+from common import make_log_lines, measure, setup_django
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--rows", type=int, default=100_000)
+    argparser.add_argument("--batch-size", type=int, default=2000)
+    argparser.add_argument("--repeat", type=int, default=3)
+    args = argparser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+
+    from app.utils import BatchModelWriter
+    from nginx_logs.models import NginxLog
+    from nginx_logs.utils import (
+        NGINX_LOG_ROW_FIELDS,
+        UriInterner,
+        parse_json_log_record,
+    )
+
+    call_command("migrate", verbosity=0)
+    uris = UriInterner()
+    records = [
+        uris.row(record)
+        for record in map(parse_json_log_record, make_log_lines(args.rows))
+    ]
+    uris.flush()
+
+    def make_model(row: tuple) -> NginxLog:
+        return NginxLog(**dict(zip(NGINX_LOG_ROW_FIELDS, row)))
+
+    def make_models():
+        deque(map(make_model, records), maxlen=0)
+
+    def store(raw_rows: bool):
+        NginxLog.objects.all().delete()
+        writer = BatchModelWriter[NginxLog](
+            NginxLog,
+            args.batch_size,
+            fields=NGINX_LOG_ROW_FIELDS if raw_rows else None,
+        )
+        for record in records:
+            writer.add(record if raw_rows else make_model(record))
+        writer.flush()
+
+    print(f"{'stage':<28}{'us/row':>10}{'rows/sec':>14}")
+    stages = {
+        "model instances only": make_models,
+        "models + bulk_create": lambda: store(False),
+        "raw rows + INSERT": lambda: store(True),
+    }
+    for name, function in stages.items():
+        elapsed = measure(function, args.repeat)
+        print(
+            f"{name:<28}{elapsed / args.rows * 1e6:>10.2f}{args.rows / elapsed:>14,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Measures how densely log records are stored and how fast they're scanned.
+
+A generated log (see `log_generator.py`) is imported with `LogImporter`, then the table and index
+sizes, the number of rows per table page and the time of the queries reading the whole table
+are reported. Run it on PostgreSQL to get the production numbers, e.g.
+
+`DATABASE_ENGINE=django.db.backends.postgresql DB_NAME=logs python tests/benchmarks/table_scan.py --rows 10000000`
+"""
+
+import argparse
+
+from common import measure, relation_sizes, setup_django
+from log_generator import LogGenerator
+
+
+def rows_per_page(connection, table: str) -> float | None:
+    """The average number of rows in one page of a table, or None if the DB can't tell."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(table)}")
+            cursor.execute(
+                "SELECT reltuples / GREATEST(relpages, 1) FROM pg_class WHERE relname = %s",
+                [table],
+            )
+        elif connection.vendor == "sqlite":
+            cursor.execute(
+                f"SELECT (SELECT COUNT(*) FROM {connection.ops.quote_name(table)}) * 1.0 "
+                "/ MAX(COUNT(*), 1) FROM dbstat WHERE name = %s",
+                [table],
+            )
+        else:
+            return None
+        return round(cursor.fetchone()[0], 1)
+
+
+def main() -> None:
+    argparser = argparse.ArgumentParser(description=__doc__)
+    argparser.add_argument("--rows", type=int, default=1_000_000)
+    argparser.add_argument("--seed", type=int, default=0)
+    argparser.add_argument("--uri-cardinality", type=int, default=1000)
+    argparser.add_argument("--batch-size", type=int, default=5000)
+    argparser.add_argument("--repeat", type=int, default=3)
+    args = argparser.parse_args()
+
+    setup_django()
+    from django.apps import apps
+    from django.core.management import call_command
+    from django.db import connection
+    from django.db.models import Count, Sum
+
+    from nginx_logs.models import NginxLog
+    from nginx_logs.utils import LogImporter, parse_projected_json_log_record
+
+    call_command("migrate", verbosity=0)
+    NginxLog.objects.all().delete()
+    generator = LogGenerator(args.seed, 0.0, args.uri_cardinality)
+    LogImporter(parse_projected_json_log_record, args.batch_size).parse(
+        generator.lines(args.rows)
+    )
+
+    table = NginxLog._meta.db_table
+    print(
+        f"Rows: {NginxLog.objects.count():,}, rows per page: {rows_per_page(connection, table)}"
+    )
+    sizes = relation_sizes(
+        connection, list(apps.get_app_config("nginx_logs").get_models())
+    )
+    for name, size in sizes.items():
+        print(
+            f"{name:<32}table {size['table_mb']:>10.2f} MB   indexes {size['indexes_mb']:>10.2f} MB"
+        )
+
+    queries = {
+        "count by status": lambda: list(
+            NginxLog.objects.order_by().values("status").annotate(Count("pk"))
+        ),
+        "count by method": lambda: list(
+            NginxLog.objects.order_by().values("method").annotate(Count("pk"))
+        ),
+        "bytes of 404 responses": lambda: NginxLog.objects.filter(status=404).aggregate(
+            Sum("bytes_sent")
+        ),
+        "count of POST requests": lambda: NginxLog.objects.filter(
+            method="POST"
+        ).count(),
+    }
+    print(f"\n{'query':<28}{'seconds':>10}{'rows/sec':>14}")
+    for name, query in queries.items():
+        elapsed = measure(query, args.repeat)
+        print(f"{name:<28}{elapsed:>10.3f}{args.rows / elapsed:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
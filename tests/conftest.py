@@ -7,7 +7,7 @@ from django.utils.timezone import get_current_timezone
 from faker import Factory as FakerFactory
 from pytest_factoryboy import register
 
-from factories import NginxLogFactory, SavedNginxLogFactory
+from factories import NginxLogFactory, SavedNginxLogFactory, UriFactory
 
 
 faker = FakerFactory.create()
@@ -60,5 +60,6 @@ def json_log_no_ip(json_log_dict):
     return json.dumps(json_log_dict)
 
 
+register(UriFactory)
 register(NginxLogFactory)
 register(SavedNginxLogFactory)
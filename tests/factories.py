@@ -5,12 +5,22 @@ from django.utils.timezone import get_current_timezone
 from factory.django import DjangoModelFactory as ModelFactory
 from faker import Factory as FakerFactory
 
-from nginx_logs.models import NginxLog
+from nginx_logs.models import NginxLog, Uri
+from nginx_logs.utils import uri_id
 
 
 faker = FakerFactory.create()
 
 
+class UriFactory(ModelFactory):
+    id = factory.LazyAttribute(lambda x: uri_id(x.value))
+    value = factory.LazyAttribute(lambda x: "/" + faker.uri_path())
+
+    class Meta:
+        model = Uri
+        django_get_or_create = ("id",)
+
+
 class NginxLogFactory(ModelFactory):
     ip = factory.LazyAttribute(
         lambda x: faker.ipv4() if random.choices([True, False]) else faker.ipv6()
@@ -20,7 +30,7 @@ class NginxLogFactory(ModelFactory):
     )
     method = factory.LazyAttribute(lambda x: faker.http_method())
     status = factory.LazyAttribute(lambda x: faker.http_status_code())
-    uri = factory.LazyAttribute(lambda x: "/" + faker.uri_path())
+    uri = factory.SubFactory(UriFactory)
     bytes_sent = factory.LazyAttribute(lambda x: random.randint(120, 4096))
 
     @classmethod
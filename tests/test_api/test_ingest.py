@@ -0,0 +1,88 @@
+import gzip
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+from django.shortcuts import reverse
+
+from nginx_logs.api.v1.views import request_body_stream
+from nginx_logs.models import NginxLog
+
+
+@pytest.fixture
+def ingest(client, settings):
+    settings.LOG_INGEST_TOKEN = "secret"
+    settings.LOG_BATCH_SIZE = 2
+
+    def post(body, token="secret", **headers):
+        return client.post(
+            reverse("api-v1-logs-ingest"),
+            data=body,
+            content_type="application/x-ndjson",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+            **headers,
+        )
+
+    return post
+
+
+@pytest.mark.django_db
+def test_ingest_requires_token(client, settings, ingest, correct_json_log):
+    assert ingest(correct_json_log.encode(), token="wrong").status_code == 403
+    settings.LOG_INGEST_TOKEN = ""
+    assert ingest(correct_json_log.encode(), token="").status_code == 403
+    assert NginxLog.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_ingest(ingest, correct_json_log, json_log_no_brace):
+    body = "\n".join([correct_json_log] * 3 + [json_log_no_brace, correct_json_log])
+    response = ingest(body.encode())
+    assert response.status_code == 200
+    assert json.loads(response.content) == {"total": 5, "skipped": 1, "stored": 4}
+    assert NginxLog.objects.count() == 4
+
+    # The shippers' URL without the trailing slash
+    assert reverse("api-v1-logs-ingest") == "/api/v1/logs/ingest"
+
+
+@pytest.mark.django_db
+def test_ingest_gzip(ingest, correct_json_log):
+    # Concatenated gzip members, as appended by a shipper
+    body = gzip.compress((correct_json_log + "\n").encode() * 2) + gzip.compress(
+        (correct_json_log + "\n").encode() * 3
+    )
+    response = ingest(body, HTTP_CONTENT_ENCODING="gzip")
+    assert json.loads(response.content) == {"total": 5, "skipped": 0, "stored": 5}
+
+    response = ingest(body[:-10], HTTP_CONTENT_ENCODING="gzip")
+    assert response.status_code == 400
+    assert "truncated" in json.loads(response.content)["detail"]
+
+    assert ingest(body, HTTP_CONTENT_ENCODING="br").status_code == 415
+
+
+@pytest.mark.django_db
+def test_ingest_limits(ingest, settings, correct_json_log):
+    line = (correct_json_log + "\n").encode()
+    settings.LOG_INGEST_MAX_LINE_SIZE = len(line)
+    response = ingest(line + b'{"long": "' + b"x" * len(line) + b'"}\n' + line)
+    assert json.loads(response.content) == {"total": 3, "skipped": 1, "stored": 2}
+
+    # The lines read before the limit are stored
+    settings.LOG_INGEST_MAX_SIZE = len(line) * 3
+    response = ingest(line * 10)
+    assert response.status_code == 413
+    assert json.loads(response.content)["stored"] == 0
+    assert NginxLog.objects.count() == 2
+
+
+def test_chunked_request_body_stream():
+    body = io.BytesIO(b"{}\n")
+    chunked = SimpleNamespace(META={"wsgi.input": body, "wsgi.input_terminated": True})
+    assert request_body_stream(chunked) is body
+
+    # Without the end of input marked by the server, only Content-Length bytes are read
+    request = SimpleNamespace(META={"wsgi.input": body, "CONTENT_LENGTH": "3"})
+    assert request_body_stream(request) is request
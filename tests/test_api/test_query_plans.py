@@ -0,0 +1,119 @@
+from datetime import datetime, timezone
+
+import pytest
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from nginx_logs.api.v1.views import NginxLogsView
+from nginx_logs.models import NginxLog, Uri
+from nginx_logs.utils import uri_id
+
+postgresql_only = pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="The index types need PostgreSQL"
+)
+
+
+def api_query_plan(params: dict) -> str:
+    """The plan of the page query of the logs API with the given query parameters."""
+    view = NginxLogsView()
+    view.request = Request(APIRequestFactory().get("/api/v1/logs/", params))
+    view.format_kwarg = None
+    queryset = view.filter_queryset(view.get_queryset())
+    return queryset[:20].explain()
+
+
+@pytest.fixture
+def logged_uris():
+    """The URIs of the generated records."""
+    uris = [f"/page/{i}" for i in range(50000)] + ["/index.html"]
+    Uri.objects.bulk_create(Uri(id=uri_id(uri), value=uri) for uri in uris)
+    return uris
+
+
+@pytest.fixture
+def generated_logs(logged_uris):
+    """
+    200k records a minute apart, in the order of the date like an imported log, with 5 methods,
+    10 statuses (2% of them 404) and 4 records of each URI. The statistics are collected, so the plans
+    are the ones of a big table rather than of a tiny test table.
+    """
+    uri_ids = [uri_id(uri) for uri in logged_uris]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {NginxLog._meta.db_table} (ip, date, method, uri_id, status, bytes_sent) "
+            "SELECT '10.0.0.1', %s + i * interval '1 minute', 1 + i %% 5, (%s::bigint[])[1 + i %% %s], "
+            "CASE WHEN i %% 50 = 0 THEN 404 ELSE (ARRAY[200, 201, 204, 206, 301, 302, 304, 403, 500])[1 + i %% 9] END, "
+            "100 "
+            "FROM generate_series(0, 199999) AS i",
+            [datetime(2024, 9, 1, tzinfo=timezone.utc), uri_ids, len(uri_ids)],
+        )
+        # The new URIs wait in the pending list of the GIN index until it's vacuumed
+        cursor.execute(
+            "SELECT gin_clean_pending_list(%s::regclass)", ["nginx_uri_value_trgm"]
+        )
+        cursor.execute(f"ANALYZE {NginxLog._meta.db_table}")
+        cursor.execute(f"ANALYZE {Uri._meta.db_table}")
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    connection.vendor == "postgresql", reason="PostgreSQL plans are checked below"
+)
+@pytest.mark.parametrize(
+    "params,index",
+    [
+        ({"status": 404}, "nginx_log_status_date_idx"),
+        ({"method": "POST"}, "nginx_log_method_date_idx"),
+        ({"uri": "/index.html"}, "nginx_log_uri_date_idx"),
+        (
+            {"status": 404, "date__gte": "2024-10-01T00:00:00Z"},
+            "nginx_log_status_date_idx",
+        ),
+        # A plain index in SQLite
+        (
+            {"date__gte": "2024-10-01T00:00:00Z", "date__lt": "2024-10-02T00:00:00Z"},
+            "nginx_log_date_brin",
+        ),
+    ],
+)
+def test_api_filters_use_indexes(saved_nginx_log_factory, params, index):
+    saved_nginx_log_factory.create_batch(10)
+    assert index in api_query_plan(params)
+
+
+@pytest.mark.django_db
+@postgresql_only
+def test_index_access_methods():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, am.amname FROM pg_class c JOIN pg_am am ON am.oid = c.relam "
+            "WHERE c.relname IN %s",
+            [("nginx_log_date_brin", "nginx_uri_value_trgm", "nginx_log_uri_date_idx")],
+        )
+        assert dict(cursor.fetchall()) == {
+            "nginx_log_date_brin": "brin",
+            "nginx_uri_value_trgm": "gin",
+            "nginx_log_uri_date_idx": "btree",
+        }
+
+
+@pytest.mark.django_db
+@postgresql_only
+@pytest.mark.parametrize(
+    "params,scan",
+    [
+        # The latest records of a filter are read from the end of the composite index, without sorting
+        ({"status": 404}, "Index Scan Backward using nginx_log_status_date_idx"),
+        ({"method": "POST"}, "Index Scan Backward using nginx_log_method_date_idx"),
+        ({"uri": "/index.html"}, "Index Scan Backward using nginx_log_uri_date_idx"),
+        (
+            {"date__gte": "2024-10-01T00:00:00Z", "date__lt": "2024-10-02T00:00:00Z"},
+            "Bitmap Index Scan on nginx_log_date_brin",
+        ),
+        # The URIs are found by the trigram index, the records are still scanned for IP and date substrings
+        ({"q": "index.ht"}, "Bitmap Index Scan on nginx_uri_value_trgm"),
+    ],
+)
+def test_api_query_plans(generated_logs, params, scan):
+    assert scan in api_query_plan(params)
@@ -71,6 +71,19 @@ def test_api_filter_method(client, model_set):
     api_filter_tester(client, url, model_set, "method", 20)
 
 
+@pytest.mark.django_db
+def test_api_filter_unknown_method(client, saved_nginx_log_factory):
+    purge_log = saved_nginx_log_factory(method="PURGE")
+    custom_log = saved_nginx_log_factory(method="BREW")
+    saved_nginx_log_factory(method="GET")
+    url = reverse("api-v1-logs")
+
+    for method, log in (("PURGE", purge_log), ("BREW", custom_log), ("-", custom_log)):
+        response = client.get(url, {"method": method})
+        assert response.status_code == 200
+        assert [record["id"] for record in response.json()["results"]] == [log.pk]
+
+
 @pytest.mark.django_db
 def test_api_filter_uri(client, model_set):
     url = reverse("api-v1-logs")
@@ -85,6 +98,23 @@ def test_api_filter_status(client, model_set):
     api_filter_tester(client, url, model_set, "status", 20)
 
 
+@pytest.mark.django_db
+def test_api_filter_date_range(client, model_set):
+    url = reverse("api-v1-logs")
+    since, until = model_set[60].date, model_set[20].date
+    response = client.get(
+        url,
+        {"date__gte": since.isoformat(), "date__lt": until.isoformat(), "size": 100},
+    )
+
+    assert response.status_code == 200
+    json_resp = json.loads(response.content)
+    test_models = [m for m in model_set if since <= m.date < until]
+    assert json_resp["count"] == len(test_models)
+    for record, model in zip(json_resp["results"], test_models):
+        field_wise_compare(record, model)
+
+
 @pytest.mark.django_db
 def test_api_search_by_ip(client, model_set):
     url = reverse("api-v1-logs")
@@ -98,7 +128,7 @@ def test_api_search_by_ip(client, model_set):
 def test_api_search_by_uri(client, model_set):
     url = reverse("api-v1-logs")
     sample_model = random.choice(model_set)
-    sample_uri = sample_model.uri
+    sample_uri = sample_model.uri.value
     api_search_tester(client, url, model_set, {"q": sample_uri}, 10)
     api_search_tester(client, url, model_set, {"q": sample_uri}, 20)
 
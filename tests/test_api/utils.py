@@ -16,7 +16,7 @@ def field_wise_compare(json_dict, model):
     assert model.ip == json_dict["ip"]
     assert model.date.strftime("%d/%b/%Y:%H:%M:%S %z") == json_dict["date"]
     assert model.method == json_dict["method"]
-    assert model.uri == json_dict["uri"]
+    assert model.uri.value == json_dict["uri"]
     assert model.status == json_dict["status"]
     assert model.bytes_sent == json_dict["bytes_sent"]
 
@@ -72,7 +72,7 @@ def api_search_tester(client, url, models, search, page_size=10):
             lambda m: any(
                 val in m.date.strftime("%d/%b/%Y:%H %M:%S") for val in search_values
             )
-            or any(val in m.uri for val in search_values)
+            or any(val in m.uri.value for val in search_values)
             or any(val in m.ip for val in search_values),
             models,
         )
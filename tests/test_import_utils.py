@@ -1,10 +1,44 @@
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+
 import pytest
+from django.core.exceptions import ImproperlyConfigured
 
 from factories import NginxLogFactory
-from nginx_logs.models import NginxLog
-from app.utils import BatchModelWriter
+from nginx_logs.models import NginxLog, QuarantinedLine, Uri
+from app.utils import (
+    AdaptiveBatchSize,
+    BatchModelWriter,
+    CopyModelWriter,
+    LatencyHistogram,
+    PipelinedModelWriter,
+)
+from app.utils.copy_model_writer import encode_csv_value
+from nginx_logs.utils.fingerprints import (
+    RecentFingerprints,
+    line_fingerprint,
+    record_fingerprint,
+)
 from nginx_logs.utils.json_log_parsing import parse_json_log_record
-from nginx_logs.utils.log_importer import LogImporter
+from nginx_logs.utils.log_importer import (
+    LogImporter,
+    batch_parsed_signal,
+    malformed_line_signal,
+)
+from nginx_logs.utils.log_reading import follow_lines, iter_binary_lines
+from nginx_logs.utils.log_types import LogRecord
+from nginx_logs.utils.ndjson_stream import (
+    MalformedStream,
+    NdjsonLines,
+    StreamTooLarge,
+)
+from nginx_logs.utils.uri_interning import NGINX_LOG_ROW_FIELDS, UriInterner, uri_id
 
 
 def test_json_log_parsing(
@@ -16,16 +50,17 @@ def test_json_log_parsing(
     assert parse_json_log_record(json_log_no_ip) is None
 
 
-def batch_writer_tester(batch_size: int):
+def batch_writer_tester(batch_size: int, writer_class=BatchModelWriter):
     """Helper function to test ModelBatchWriter.
 
     Args:
         batch_size (int): A size of a batch to be used.
+        writer_class (type(BatchModelWriter)): A writer class to be tested.
 
     Raises:
         AssertionError: If something is not as expected.
     """
-    writer = BatchModelWriter[NginxLog](NginxLog, batch_size)
+    writer = writer_class[NginxLog](NginxLog, batch_size)
     # Ensure the models are not saved until the batch if full
     written_objects = 0
     for i in range(batch_size - 1):
@@ -64,6 +99,285 @@ def test_batch_model_writer_5():
     batch_writer_tester(5)
 
 
+@pytest.mark.django_db
+def test_copy_model_writer():
+    # On databases other than PostgreSQL it falls back to bulk_create
+    batch_writer_tester(3, CopyModelWriter)
+
+
+@pytest.mark.django_db
+def test_writer_commit_action():
+    writer = BatchModelWriter(NginxLog, 2)
+    actions = []
+    writer.add(NginxLogFactory())
+    writer.add(NginxLogFactory(), lambda: actions.append(NginxLog.objects.count()))
+    # The action is called with an empty batch too
+    writer.flush(lambda: actions.append(NginxLog.objects.count()))
+    assert actions == [2, 2]
+
+    def failing_action():
+        raise RuntimeError("Checkpoint is not saved")
+
+    writer.add(NginxLogFactory())
+    with pytest.raises(RuntimeError):
+        writer.flush(failing_action)
+    # The batch is rolled back with the action
+    assert NginxLog.objects.count() == 2
+
+
+def test_adaptive_batch_size():
+    batch_size = AdaptiveBatchSize(100, 10, 1000, target_latency=1.0, smoothing=0.5)
+    # Batches stored faster grow at most twice at once
+    assert batch_size.update(100, 0.1) == 200
+    assert batch_size.update(200, 0.2) == 400
+    # Smaller batches aren't measured
+    assert batch_size.update(9, 10.0) == 400
+    # Slower ones shrink to the size stored in the target time
+    assert batch_size.update(400, 2.0) == 333
+    assert batch_size.update(333, 10.0) == 166
+    assert AdaptiveBatchSize(5000, 10, 1000).size == 1000
+    with pytest.raises(ValueError):
+        AdaptiveBatchSize(100, 0, 10)
+
+
+class FakeClock:
+    """perf_counter() replacement advanced by the writers."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+
+class TimedModelWriter(BatchModelWriter):
+    """Stores nothing, but each record takes 1 ms of the fake clock."""
+
+    clock = FakeClock()
+
+    def _write_batch(self, records):
+        self.clock.now += 0.001 * len(records)
+        return 0
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_adaptive_batch_size_writer(monkeypatch, pipelined):
+    monkeypatch.setattr("app.utils.batch_model_writer.time", TimedModelWriter.clock)
+    monkeypatch.setattr("app.utils.pipelined_model_writer.time", TimedModelWriter.clock)
+    flushes = []
+    batch_size = AdaptiveBatchSize(5, 2, 30, target_latency=0.02)
+    if pipelined:
+        writer = PipelinedModelWriter[NginxLog](
+            NginxLog,
+            batch_size,
+            lambda *flush: flushes.append(flush),
+            writer_class=TimedModelWriter,
+            queue_size=1,
+        )
+    else:
+        writer = TimedModelWriter(
+            NginxLog, batch_size, lambda *flush: flushes.append(flush)
+        )
+    for _ in range(100):
+        writer.add(NginxLogFactory.build())
+    writer.flush()
+    writer.close()
+    # The size grows to 20 records stored in 20 ms
+    if pipelined:
+        # The batches are measured when the writer threads store them, so the sizes
+        # measured before the next batch starts are recorded as one change
+        batch_sizes = list(writer.stats["batch_sizes"].values())
+        assert batch_sizes[0] == 5 and batch_sizes[-1] == 20
+        assert batch_sizes == sorted(batch_sizes)
+    else:
+        assert flushes == [(1, 5), (2, 10), (3, 20), (4, 20), (5, 20), (6, 20), (7, 5)]
+        assert writer.stats["batch_sizes"] == {1: 5, 2: 10, 3: 20}
+        assert writer.is_incomplete_batch(7)
+    assert sum(records_count for _, records_count in flushes) == 100
+
+
+def test_copy_csv_encoding():
+    assert encode_csv_value(None) == "\\N"
+    assert encode_csv_value("") == '""'
+    assert encode_csv_value("\\N") == '"\\N"'
+    assert encode_csv_value('GET /"a,b"\n') == '"GET /""a,b""\n"'
+    assert encode_csv_value(200) == '"200"'
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("writer_class", [BatchModelWriter, CopyModelWriter])
+def test_row_writer_stores_like_models(writer_class):
+    tz = timezone(timedelta(hours=3))
+    records = [
+        LogRecord(
+            "2001:0db8::0001",
+            datetime(2024, 10, 10, 13, 55, 36, tzinfo=tz),
+            "GET",
+            "/a",
+            200,
+            10,
+        ),
+        LogRecord(
+            "10.0.0.1",
+            datetime(2024, 10, 10, 13, 55, 37, tzinfo=tz),
+            "POST",
+            '/"b"',
+            404,
+            2**40,
+        ),
+        LogRecord(
+            "::ffff:10.0.0.2",
+            datetime(2024, 1, 1, tzinfo=timezone.utc),
+            "PUT",
+            "",
+            500,
+            0,
+        ),
+    ]
+    uris = UriInterner()
+    rows = [uris.row(record) for record in records]
+    uris.flush()
+    writer = writer_class[NginxLog](NginxLog, 2, fields=NGINX_LOG_ROW_FIELDS)
+    for row in rows:
+        writer.add(row)
+    assert writer.flush() == 1
+    assert writer.stats == {
+        "total": 3,
+        "incomplete_batches": {2: 1},
+        "duplicates": 0,
+        "batch_sizes": {1: 2},
+    }
+    stored_rows = list(
+        NginxLog.objects.order_by("id").values_list(*NGINX_LOG_ROW_FIELDS)
+    )
+
+    NginxLog.objects.all().delete()
+    NginxLog.objects.bulk_create(
+        NginxLog(**dict(zip(NGINX_LOG_ROW_FIELDS, row))) for row in rows
+    )
+    assert stored_rows == list(
+        NginxLog.objects.order_by("id").values_list(*NGINX_LOG_ROW_FIELDS)
+    )
+
+
+def test_row_writer_rejects_reverse_relations():
+    with pytest.raises(ValueError, match="Uri.nginxlog"):
+        BatchModelWriter[Uri](Uri, 2, fields=("id", "nginxlog"))
+
+
+@pytest.mark.django_db
+def test_row_writer_fills_omitted_fields():
+    # Not nullable and without a default, the row must have it
+    with pytest.raises(ImproperlyConfigured, match="Uri.value"):
+        BatchModelWriter[Uri](Uri, 2, fields=("id",))
+
+    # The omitted nullable fields are NULL, `auto_now_add` is filled by models
+    writer = BatchModelWriter[QuarantinedLine](
+        QuarantinedLine, 2, fields=("source", "reason", "text")
+    )
+    writer.add(("-", "Invalid JSON", "{"))
+    writer.flush()
+    line = QuarantinedLine.objects.get()
+    assert (line.line_number, line.batch_number) == (None, None)
+    assert line.created is not None
+
+
+class SlowModelWriter(BatchModelWriter):
+    """Stores batches into a list for a random time instead of DB."""
+
+    stored_batches: list[int] = []
+
+    def _write_batch(self, records):
+        time.sleep(random.random() / 100)
+        if records[0].status == 500:
+            raise RuntimeError("Failed batch")
+        self.stored_batches.append(len(records))
+
+
+def test_pipelined_model_writer():
+    flushes = []
+    writer = PipelinedModelWriter[NginxLog](
+        NginxLog,
+        3,
+        lambda *flush: flushes.append(flush),
+        threads=3,
+        queue_size=1,
+        writer_class=SlowModelWriter,
+    )
+    SlowModelWriter.stored_batches = []
+    records_stored = 0
+    for i in range(20):
+        records_stored += writer.add(NginxLogFactory.build(status=200))
+    # All the queued batches are stored and reported in the batch order
+    records_stored += writer.flush()
+    assert records_stored == 20
+    writer.close()
+    assert flushes == [(i, 3) for i in range(1, 7)] + [(7, 2)]
+    assert sorted(SlowModelWriter.stored_batches) == [2] + [3] * 6
+    assert writer.stats == {
+        "total": 20,
+        "incomplete_batches": {7: 2},
+        "duplicates": 0,
+        "batch_sizes": {1: 3},
+    }
+
+    # Errors of the writer threads are raised in the caller's thread
+    writer.add(NginxLogFactory.build(status=500))
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    writer.close()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pipelined_writer_waits_for_commit_actions():
+    actions = []
+
+    def slow_action():
+        time.sleep(0.05)
+        actions.append("committed")
+
+    writer = PipelinedModelWriter[NginxLog](
+        NginxLog, 3, threads=2, writer_class=SlowModelWriter
+    )
+    # An empty batch queues only the commit action
+    writer.flush(slow_action)
+    assert actions == ["committed"]
+
+    def failing_action():
+        raise RuntimeError("Checkpoint is not saved")
+
+    with pytest.raises(RuntimeError):
+        writer.flush(failing_action)
+    writer.close()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pipelined_log_importer(correct_json_log):
+    # SQLite does not allow concurrent writes of several threads
+    importer = LogImporter(parse_json_log_record, 5, writer_threads=1)
+    importer.parse([correct_json_log] * 23)
+    assert importer.stats == {
+        "total": 23,
+        "bytes": 23 * len(correct_json_log),
+        "skipped": 0,
+        "stored": 23,
+        "duplicates": 0,
+        "incomplete_batches": {5: 3},
+        "batch_sizes": {1: 5},
+    }
+    assert NginxLog.objects.count() == 23
+
+
+@pytest.mark.django_db
+def test_log_importer_counts_bytes(json_log_dict):
+    line = json.dumps(
+        dict(json_log_dict, request="GET /привет HTTP/1.1"), ensure_ascii=False
+    )
+    importer = LogImporter(parse_json_log_record, 5)
+    importer.parse([line, line.encode(), "{\n"])
+    assert importer.stats["bytes"] == 2 * len(line.encode()) + 2
+
+
 @pytest.mark.django_db
 def test_log_importer(correct_json_log):
     importer = LogImporter(parse_json_log_record, 5)
@@ -89,3 +403,403 @@ def test_log_importer(correct_json_log):
     assert written_objects == 1
     assert importer.current_batch_number == 3
     assert NginxLog.objects.count() == 6
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("line_signals", [False, True])
+def test_log_importer_batch_events(correct_json_log, json_log_no_brace, line_signals):
+    importer = LogImporter(
+        parse_json_log_record, 3, line_signals=line_signals, malformed_sample_size=2
+    )
+    batches = []
+    malformed_lines = []
+
+    def batch_parsed_handler(sender, **kwargs):
+        batches.append(
+            (
+                kwargs["batch_number"],
+                kwargs["lines_parsed"],
+                kwargs["lines_malformed"],
+                [line_number for line_number, _ in kwargs["malformed_lines"]],
+            )
+        )
+
+    def malformed_line_handler(sender, line_number, **kwargs):
+        malformed_lines.append(line_number)
+
+    batch_parsed_signal.connect(batch_parsed_handler, sender=importer)
+    malformed_line_signal.connect(malformed_line_handler, sender=importer)
+    try:
+        importer.parse(
+            [json_log_no_brace] * 3 + [correct_json_log] * 4 + [json_log_no_brace]
+        )
+    finally:
+        batch_parsed_signal.disconnect(batch_parsed_handler, sender=importer)
+        malformed_line_signal.disconnect(malformed_line_handler, sender=importer)
+
+    assert batches == [(1, 3, 3, [1, 2]), (2, 1, 1, [8])]
+    # Per-line signals are opt-in
+    assert malformed_lines == ([1, 2, 3, 8] if line_signals else [])
+
+
+@pytest.mark.django_db
+def test_uri_interner():
+    uris = UriInterner(cache_size=2)
+    assert uris.intern("/a") == uri_id("/a")
+    uris.intern("/b")
+    uris.intern("/a")
+    # "/b" is the least recently used one
+    uris.intern("/c")
+    assert uris.flush() == 3
+    assert uris.flush() == 0
+
+    uris.intern("/a")
+    uris.intern("/b")
+    assert uris.flush() == 1
+    assert uris.stats == {"cached": 2, "stored": 4}
+    assert sorted(Uri.objects.values_list("value", flat=True)) == ["/a", "/b", "/c"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("fingerprint", [None, line_fingerprint])
+def test_log_importer_stores_rows_without_models(
+    monkeypatch, correct_json_log, fingerprint
+):
+    def no_models(*args, **kwargs):
+        raise AssertionError("A model instance is made of a row")
+
+    monkeypatch.setattr(NginxLog, "__init__", no_models)
+    importer = LogImporter(parse_json_log_record, 2, fingerprint=fingerprint)
+    importer.parse([correct_json_log] * 3)
+    monkeypatch.undo()
+
+    assert NginxLog.objects.count() == (3 if fingerprint is None else 1)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("raw_rows", [True, False])
+def test_log_importer_uris(json_log_dict, raw_rows):
+    lines = [
+        json.dumps(dict(json_log_dict, request=f"GET /{i % 3} HTTP/1.1"))
+        for i in range(7)
+    ]
+    importer = LogImporter(parse_json_log_record, 2, raw_rows=raw_rows)
+    importer.parse(lines)
+
+    assert Uri.objects.count() == 3
+    assert list(
+        NginxLog.objects.order_by("pk").values_list("uri__value", flat=True)
+    ) == ["/0", "/1", "/2", "/0", "/1", "/2", "/0"]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("raw_rows", [True, False])
+def test_log_importer_unknown_methods(json_log_dict, raw_rows):
+    lines = [
+        json.dumps(dict(json_log_dict, request=f"{method} /cache HTTP/1.1"))
+        for method in ("PURGE", "BREW", "GET")
+    ]
+    importer = LogImporter(parse_json_log_record, 5, raw_rows=raw_rows)
+    importer.parse(lines)
+
+    # Custom methods are stored as "-" instead of being quarantined
+    assert not QuarantinedLine.objects.exists()
+    assert list(NginxLog.objects.order_by("pk").values_list("method", flat=True)) == [
+        "PURGE",
+        "-",
+        "GET",
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("raw_rows", [True, False])
+def test_log_importer_extra_fields(json_log_dict, raw_rows):
+    lines = [
+        json.dumps(dict(json_log_dict, request_time=0.5, http_user_agent="curl/8.5.0")),
+        json.dumps(json_log_dict),
+    ]
+    importer = LogImporter(parse_json_log_record, 5, raw_rows=raw_rows)
+    importer.parse(lines)
+
+    assert list(
+        NginxLog.objects.order_by("pk").values_list(
+            "request_time", "upstream_response_time", "user_agent"
+        )
+    ) == [(0.5, None, "curl/8.5.0"), (None, None, None)]
+
+
+@pytest.mark.django_db
+def test_log_importer_quarantine(correct_json_log, json_log_no_brace):
+    importer = LogImporter(parse_json_log_record, 2, 11, quarantine="access.log")
+    importer.parse(
+        [json_log_no_brace + "\r\n"]
+        + [correct_json_log] * 3
+        + [b"[]\n", memoryview(b"\x00\n")]
+    )
+
+    assert importer.stats["quarantined"] == 3
+    assert list(
+        QuarantinedLine.objects.order_by("line_number").values_list(
+            "source", "line_number", "batch_number", "reason", "text"
+        )
+    ) == [
+        ("access.log", 11, 1, "Invalid JSON", json_log_no_brace),
+        ("access.log", 15, 2, "Not a JSON object", "[]"),
+        ("access.log", 16, 2, "Invalid JSON", "\ufffd"),
+    ]
+    assert NginxLog.objects.count() == 3
+    assert "quarantined" not in LogImporter(parse_json_log_record, 2).stats
+
+
+@pytest.mark.django_db
+def test_log_importer_quarantines_with_batch(correct_json_log, json_log_no_brace):
+    positions = []
+
+    def save_position(bytes_parsed, lines_parsed):
+        if positions:
+            raise RuntimeError("Interrupted")
+        positions.append(lines_parsed)
+
+    importer = LogImporter(
+        parse_json_log_record, 2, on_commit=save_position, quarantine="access.log"
+    )
+    with pytest.raises(RuntimeError):
+        importer.parse([json_log_no_brace, correct_json_log, correct_json_log] * 2)
+
+    # The lines of the failed batch aren't quarantined, so the resumed import doesn't repeat them
+    assert positions == [3]
+    assert list(QuarantinedLine.objects.values_list("line_number", flat=True)) == [1]
+    assert NginxLog.objects.count() == 2
+
+    # Malformed lines end a batch too, so they aren't collected without a limit
+    importer = LogImporter(parse_json_log_record, 2, quarantine="access.log")
+    importer.parse_line(json_log_no_brace)
+    assert importer.parse_line(json_log_no_brace) == -1
+    assert QuarantinedLine.objects.count() == 3
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    for seconds in (0.0005, 0.001, 0.003, 0.003, 0.7, 30.0):
+        histogram.add(seconds)
+    summary = histogram.as_dict()
+    assert summary["count"] == histogram.count == 6
+    assert summary["max"] == 30.0
+    assert summary["mean"] == pytest.approx(histogram.total / 6)
+    assert summary["buckets"] == {"<=1ms": 2, "<=5ms": 2, "<=1s": 1, ">10s": 1}
+    assert LatencyHistogram().as_dict()["mean"] == 0.0
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("writer_threads", [0, 1])
+def test_log_importer_timings(correct_json_log, json_log_no_brace, writer_threads):
+    importer = LogImporter(
+        parse_json_log_record, 3, writer_threads=writer_threads, timings=True
+    )
+    batch_timings = []
+
+    def batch_parsed_handler(sender, **kwargs):
+        batch_timings.append(kwargs["timings"])
+
+    batch_parsed_signal.connect(batch_parsed_handler, sender=importer)
+    try:
+        importer.parse([correct_json_log] * 7 + [json_log_no_brace])
+    finally:
+        batch_parsed_signal.disconnect(batch_parsed_handler, sender=importer)
+
+    stats = importer.stats
+    timings = stats.pop("timings")
+    assert stats["stored"] == 7
+    assert len(batch_timings) == 3
+    assert set(timings["stages"]) == {"read", "parse", "build", "store"}
+    assert all(seconds >= 0 for seconds in timings["stages"].values())
+    assert timings["stages"]["parse"] == pytest.approx(
+        sum(batch["parse"] for batch in batch_timings)
+    )
+    assert timings["elapsed"] > 0
+    assert timings["lines_per_sec"] == pytest.approx(8 / timings["elapsed"], rel=0.5)
+    assert timings["bytes_per_sec"] > timings["lines_per_sec"]
+    assert timings["flush_latency"]["count"] == 3
+
+    # Nothing is measured by default
+    assert "timings" not in LogImporter(parse_json_log_record, 3).stats
+
+
+def test_fingerprints(correct_json_log):
+    record = parse_json_log_record(correct_json_log)
+    line = correct_json_log.encode()
+    assert line_fingerprint(correct_json_log, record) == line_fingerprint(
+        memoryview(line + b"\r\n"), record
+    )
+    assert line_fingerprint(line + b" ", record) != line_fingerprint(line, record)
+    assert record_fingerprint(line + b" ", record) == record_fingerprint(line, record)
+    assert record_fingerprint(
+        line, record._replace(status=record.status + 1)
+    ) != record_fingerprint(line, record)
+
+    recent = RecentFingerprints(2)
+    assert [recent.seen(fingerprint) for fingerprint in [1, 2, 1, 3, 4]] == [
+        False,
+        False,
+        True,
+        False,
+        False,
+    ]
+    # 1 is in the previous generation, it's moved into the new one
+    assert recent.seen(1)
+    # 2 is forgotten with the oldest generation
+    assert not recent.seen(2)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("raw_rows", [True, False])
+def test_log_importer_drops_duplicates(json_log_dict, raw_rows):
+    lines = []
+    for bytes_sent in range(7):
+        json_log_dict["bytes"] = bytes_sent
+        lines.append(json.dumps(json_log_dict))
+
+    importer = LogImporter(
+        parse_json_log_record, 3, raw_rows=raw_rows, fingerprint=line_fingerprint
+    )
+    importer.parse(lines[:5] + lines[:2])
+    assert importer.stats["stored"] == 5
+    # Recent duplicates are dropped before they reach DB
+    assert importer.stats["duplicates"] == 2
+    assert importer.stats["incomplete_batches"] == {2: 2}
+
+    # The records stored already are skipped by DB
+    importer = LogImporter(
+        parse_json_log_record, 3, raw_rows=raw_rows, fingerprint=line_fingerprint
+    )
+    importer.parse(lines)
+    assert importer.stats["stored"] == 2
+    assert importer.stats["duplicates"] == 5
+    assert NginxLog.objects.count() == 7
+    assert NginxLog.objects.filter(fingerprint__isnull=True).count() == 0
+
+
+@pytest.mark.parametrize("read_size", [1, 5, 64])
+@pytest.mark.parametrize("compress", [False, True])
+def test_ndjson_lines(read_size, compress):
+    lines = [b"%d" % number * (number % 6) + b"\n" for number in range(200)]
+    lines[50] = b"x" * 100 + b"\n"
+    data = b"".join(lines) + b"end"
+    if compress:
+        data = gzip.compress(data[:700]) + gzip.compress(data[700:])
+    stream = NdjsonLines(BytesIO(data), compress, max_line_size=20, read_size=read_size)
+    # The long line is cut and its rest is skipped
+    assert list(stream) == lines[:50] + [b"x" * 20] + lines[51:] + [b"end"]
+    assert stream.error is None
+
+    stream = NdjsonLines(BytesIO(b"{}\n" * 10), max_size=15, read_size=read_size)
+    assert len(list(stream)) <= 5
+    assert isinstance(stream.error, StreamTooLarge)
+
+    stream = NdjsonLines(BytesIO(gzip.compress(b"{}\n" * 10)[:-4]), gzip=True)
+    assert list(stream) == [b"{}\n"] * 10
+    assert isinstance(stream.error, MalformedStream)
+
+
+@pytest.mark.parametrize("buffer_size", [1, 7, 1024])
+@pytest.mark.parametrize("ending", ["", "\n"])
+def test_binary_lines_reading(tmpdir, buffer_size, ending):
+    text = "first line\n\n" + "a long line " * 10 + "\nlast line" + ending
+    expected = text.encode().splitlines(keepends=True)
+
+    # Buffered reading of a stream
+    lines = iter_binary_lines(BytesIO(text.encode()), buffer_size)
+    assert [bytes(line) for line in lines] == expected
+
+    # Memory-mapped regular file
+    log_file = tmpdir.join("log.txt")
+    log_file.write(text)
+    with open(log_file.strpath, "rb") as file:
+        assert [bytes(line) for line in iter_binary_lines(file)] == expected
+
+    # Reading from an offset
+    offset = len(expected[0])
+    lines = iter_binary_lines(BytesIO(text.encode()), buffer_size, offset)
+    assert [bytes(line) for line in lines] == expected[1:]
+    with open(log_file.strpath, "rb") as file:
+        lines = iter_binary_lines(file, start=offset)
+        assert [bytes(line) for line in lines] == expected[1:]
+
+    # Empty regular file can't be mapped
+    log_file.write("")
+    with open(log_file.strpath, "rb") as file:
+        assert list(iter_binary_lines(file)) == []
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "Timed out"
+        time.sleep(0.01)
+
+
+def test_follow_lines(tmpdir):
+    path = tmpdir.join("access.log").strpath
+    items = []
+    stop_event = threading.Event()
+
+    def follow():
+        items.extend(follow_lines(path, 0.01, 0.05, stop_event))
+
+    with open(path, "wb") as file:
+        file.write(b"first\nsecond\nthi")
+    thread = threading.Thread(target=follow)
+    thread.start()
+    try:
+        # Partial lines wait for their end
+        wait_for(lambda: None in items)
+        assert items == [b"first\n", b"second\n", None]
+
+        with open(path, "ab") as file:
+            file.write(b"rd\n")
+        wait_for(lambda: items[-1] is None and len(items) == 5)
+        assert items[3:] == [b"third\n", None]
+
+        # Truncated file is read from the beginning
+        with open(path, "wb") as file:
+            file.write(b"new\n")
+        wait_for(lambda: len(items) == 7)
+        assert items[5:] == [b"new\n", None]
+
+        # The rest of a rotated file is read before the new file
+        os.rename(path, path + ".1")
+        with open(path + ".1", "ab") as file:
+            file.write(b"old\n")
+        with open(path, "wb") as file:
+            file.write(b"rotated\n")
+        wait_for(lambda: len(items) == 10)
+        assert items[7:] == [b"old\n", b"rotated\n", None]
+    finally:
+        stop_event.set()
+        thread.join()
+
+
+def test_follow_lines_cuts_long_lines(tmpdir):
+    path = tmpdir.join("access.log").strpath
+    items = []
+    stop_event = threading.Event()
+
+    def follow():
+        items.extend(follow_lines(path, 0.01, 0.05, stop_event, max_line_size=8))
+
+    with open(path, "wb") as file:
+        file.write(b"short\n" + b"x" * 20 + b"\nafter\n" + b"y" * 10)
+    thread = threading.Thread(target=follow)
+    thread.start()
+    try:
+        wait_for(lambda: None in items)
+        # The rest of a long partial line isn't kept
+        assert items == [b"short\n", b"x" * 8, b"after\n", b"y" * 8, None]
+
+        with open(path, "ab") as file:
+            file.write(b"y" * 100 + b"\nlast\n")
+        wait_for(lambda: len(items) == 7)
+        assert items[5:] == [b"last\n", None]
+    finally:
+        stop_event.set()
+        thread.join()
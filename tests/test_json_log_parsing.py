@@ -0,0 +1,295 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+
+from nginx_logs.utils.field_mapping import DEFAULT_FIELD_MAPPING, compile_field_mapping
+from nginx_logs.utils.json_backends import (
+    JSON_BACKENDS,
+    STDLIB_JSON_BACKEND,
+    JsonBackend,
+    get_json_backend,
+)
+from nginx_logs.utils.json_log_parsing import (
+    LOG_DATETIME_FORMAT,
+    LogDatetimeDecoder,
+    malformed_line_reason,
+    parse_json_log_record,
+    parse_json_log_records,
+    parse_projected_json_log_record,
+)
+
+
+@pytest.fixture
+def mixed_log_lines(correct_json_log, json_log_no_brace, json_log_malformed_request):
+    correct_dict = json.loads(correct_json_log)
+    huge_bytes_dict = dict(correct_dict, bytes=2**70)
+    nan_bytes_line = json.dumps(dict(correct_dict, bytes=float("nan")))
+    return [
+        correct_json_log,
+        json_log_no_brace,
+        json_log_malformed_request,
+        "",
+        "not a json",
+        json.dumps(huge_bytes_dict),
+        nan_bytes_line,
+        correct_json_log + "\n",
+    ]
+
+
+def test_default_backend_is_registered():
+    backend = get_json_backend()
+    assert JSON_BACKENDS[backend.name] is backend
+    assert get_json_backend("json") is STDLIB_JSON_BACKEND
+
+    with pytest.raises(KeyError):
+        get_json_backend("no-such-backend")
+
+
+@pytest.mark.parametrize("backend_name", sorted(JSON_BACKENDS))
+def test_backends_give_identical_records(backend_name, mixed_log_lines):
+    backend = get_json_backend(backend_name)
+    expected = [
+        parse_json_log_record(line, STDLIB_JSON_BACKEND) for line in mixed_log_lines
+    ]
+    # NaN is never equal to itself, so compare string representations
+    assert list(map(repr, parse_json_log_records(mixed_log_lines, backend))) == list(
+        map(repr, expected)
+    )
+    assert [
+        repr(parse_json_log_record(line, backend)) for line in mixed_log_lines
+    ] == list(map(repr, expected))
+    assert type(expected[5].bytes_sent) is int
+
+
+@pytest.mark.parametrize("backend_name", sorted(JSON_BACKENDS))
+def test_backends_reject_invalid_utf8(backend_name, correct_json_log):
+    backend = get_json_backend(backend_name)
+    # Binary lines are decoded by the backends, a broken byte sequence must be a malformed line
+    line = correct_json_log.encode().replace(b" HTTP/1.1", b"\xff HTTP/1.1")
+    for data in (line, memoryview(line)):
+        with pytest.raises(backend.errors):
+            backend.loads(data)
+        assert parse_json_log_record(data, backend) is None
+    assert (
+        list(parse_json_log_records([line, correct_json_log.encode()], backend))[0]
+        is None
+    )
+
+
+def test_batch_parsing_by_backend_name(correct_json_log, json_log_no_brace):
+    records = list(
+        parse_json_log_records([correct_json_log, json_log_no_brace], "json")
+    )
+    assert records[0] == parse_json_log_record(correct_json_log)
+    assert records[1] is None
+
+
+def test_batch_parsing_decodes_rejected_lines_once_more(
+    correct_json_log, json_log_no_brace
+):
+    decoded = []
+
+    def strict_loads(line):
+        decoded.append(line)
+        raise ValueError("Rejected")
+
+    backend = JsonBackend("strict", strict_loads, (ValueError,))
+    records = list(
+        parse_json_log_records([correct_json_log, json_log_no_brace], backend)
+    )
+    # Only the standard library decodes the rejected lines again
+    assert records == [parse_json_log_record(correct_json_log), None]
+    assert decoded == [correct_json_log, json_log_no_brace]
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "10/Oct/2024:13:55:36 +0300",
+        "10/Oct/2024:13:55:36 -0930",
+        "01/Jan/2000:00:00:00 +0000",
+        "29/Feb/2024:23:59:59 +0000",
+        "1/Oct/2024:13:55:36 +0300",
+        "10/oct/2024:13:55:36 +0300",
+        "10/Oct/2024:13:55:36 +03:00",
+        "10/Oct/2024:13:55:36  +0300",
+        "10/Oct/2024:13:55:36 Z",
+        # Malformed values
+        "29/Feb/2023:23:59:59 +0000",
+        "31/Apr/2024:10:00:00 +0000",
+        "00/Oct/2024:13:55:36 +0300",
+        "10/Oct/0000:13:55:36 +0300",
+        "10/Oct/2024:24:55:36 +0300",
+        "10/Oct/2024:13:60:36 +0300",
+        "10/Oct/2024:13:55:60 +0300",
+        "10/Oct/2024:13:55:36 +0375",
+        "10/Oct/2024:13:55:36 +2500",
+        "10/Oct/2024:13:55:36 *0300",
+        "10/Foo/2024:13:55:36 +0300",
+        "10-Oct-2024:13:55:36 +0300",
+        "10/Oct/2024:13:5x:36 +0300",
+        "10/Oct/2024:13:55:36 +0300 ",
+        "1٠/Oct/2024:13:55:36 +0300",
+        "",
+    ],
+)
+def test_log_datetime_decoder_matches_strptime(value):
+    decoder = LogDatetimeDecoder(cache_size=2)
+    try:
+        expected = datetime.strptime(value, LOG_DATETIME_FORMAT)
+    except ValueError:
+        # Twice to check the cached path too
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                decoder(value)
+    else:
+        for _ in range(2):
+            decoded = decoder(value)
+            assert decoded == expected
+            assert decoded.tzinfo == expected.tzinfo
+            assert repr(decoded) == repr(expected)
+
+
+def test_log_datetime_decoder_cache_is_bounded():
+    decoder = LogDatetimeDecoder(cache_size=3)
+    start = datetime(2024, 10, 10, tzinfo=timezone.utc)
+    for minutes in range(0, 24 * 60, 7):
+        value = (start + timedelta(minutes=minutes)).strftime(LOG_DATETIME_FORMAT)
+        assert decoder(value) == datetime.strptime(value, LOG_DATETIME_FORMAT)
+    assert decoder.stats == {"prefixes": 3, "time_zones": 1}
+
+
+def test_projected_parsing_matches_full_parsing(mixed_log_lines, json_log_dict):
+    escaped_line = json.dumps(
+        dict(json.loads(mixed_log_lines[0]), request='GET /"quoted"é HTTP/1.1'),
+        ensure_ascii=True,
+    )
+    duplicate_key_line = mixed_log_lines[0].replace("{", '{"bytes": 1, ', 1)
+    nested_line = mixed_log_lines[0].replace("{", '{"extra": {"time": 1}, ', 1)
+    lines = mixed_log_lines + [escaped_line, duplicate_key_line, nested_line]
+    assert list(map(repr, map(parse_projected_json_log_record, lines))) == [
+        repr(parse_json_log_record(line, STDLIB_JSON_BACKEND)) for line in lines
+    ]
+
+
+def test_projected_parsing_of_line_without_key(json_log_no_ip):
+    # Missing keys are treated exactly as full parsing does
+    full_error = projected_error = None
+    try:
+        parse_json_log_record(json_log_no_ip)
+    except Exception as error:
+        full_error = error
+    try:
+        parse_projected_json_log_record(json_log_no_ip)
+    except Exception as error:
+        projected_error = error
+    assert repr(full_error) == repr(projected_error)
+
+
+def test_malformed_line_reasons(json_log_dict):
+    line = json.dumps(json_log_dict)
+    lines_and_reasons = [
+        ("not a json", "Invalid JSON"),
+        ("[1, 2]", "Not a JSON object"),
+        (
+            json.dumps({"message": line}),
+            "Missing fields: remote_ip, time, request, response, bytes",
+        ),
+        (json.dumps(dict(json_log_dict, request=42)), "Malformed request"),
+        (
+            json.dumps(dict(json_log_dict, request="GET/ HTTP/1.1")),
+            "Malformed request",
+        ),
+        (json.dumps(dict(json_log_dict, time=None)), "Malformed time"),
+        # Statuses which cannot be stored compactly
+        (json.dumps(dict(json_log_dict, response=70000)), "Malformed response"),
+        (json.dumps(dict(json_log_dict, response=200.0)), "Malformed response"),
+    ]
+    for line, reason in lines_and_reasons:
+        # A misconfigured log format doesn't break parsing, lines are just rejected
+        assert parse_json_log_record(line) is None
+        assert parse_projected_json_log_record(line) is None
+        assert malformed_line_reason(line) == reason
+        assert malformed_line_reason(line.encode()) == reason
+
+
+def test_extra_fields_are_captured(json_log_dict):
+    line = json.dumps(
+        dict(
+            json_log_dict,
+            request_time="0.250",
+            upstream_response_time="0.100, 0.050 : -",
+            http_user_agent="curl/8.5.0",
+            http_referer="",
+        )
+    )
+    record = parse_json_log_record(line)
+    assert record.request_time == 0.25
+    assert record.upstream_response_time == pytest.approx(0.15)
+    assert record.user_agent == "curl/8.5.0"
+    # Empty and absent values are None
+    assert record.referer is None and record.host is None
+    assert parse_projected_json_log_record(line) == record
+
+    # A malformed optional value rejects the line
+    line = json.dumps(dict(json_log_dict, request_time="fast"))
+    assert parse_json_log_record(line) is None
+    assert parse_projected_json_log_record(line) is None
+    assert malformed_line_reason(line) == "Malformed request_time"
+
+
+def test_compiled_field_mapping():
+    mapping = compile_field_mapping(
+        dict(
+            DEFAULT_FIELD_MAPPING,
+            date=("time_iso8601", "time_iso8601"),
+            status=("status", "int"),
+            host=("server_name", "str"),
+            user_agent=("http_user_agent", "builtins.len"),
+        )
+    )
+    assert mapping.keys == (
+        "remote_ip",
+        "time_iso8601",
+        "request",
+        "status",
+        "bytes",
+        "http_user_agent",
+        "server_name",
+    )
+    item = {
+        "remote_ip": "10.0.0.1",
+        "time_iso8601": "2024-10-10T13:55:36+03:00",
+        "request": "GET /index.html HTTP/1.1",
+        "status": "404",
+        "bytes": 512,
+        "http_user_agent": "curl",
+    }
+    record = mapping.from_dict(item)
+    assert record.date == datetime(2024, 10, 10, 10, 55, 36, tzinfo=timezone.utc)
+    assert (record.method, record.uri, record.status) == ("GET", "/index.html", 404)
+    assert record.host is record.request_time is None
+    assert record.user_agent == 4
+    assert mapping.from_values(*(item.get(key) for key in mapping.keys)) == record
+    assert mapping.from_dict(dict(item, request="GET/")) is None
+    with pytest.raises(KeyError):
+        mapping.from_dict({key: item[key] for key in item if key != "bytes"})
+    with pytest.raises(ValueError):
+        mapping.from_dict(dict(item, status="OK"))
+
+
+@pytest.mark.parametrize(
+    "mapping",
+    [
+        {"date": ("time", "time_local")},
+        dict(DEFAULT_FIELD_MAPPING, cookie=("http_cookie", "str")),
+        dict(DEFAULT_FIELD_MAPPING, host=("host", "no-such-converter")),
+        dict(DEFAULT_FIELD_MAPPING, host="host"),
+        dict(DEFAULT_FIELD_MAPPING, host=("host", 42)),
+    ],
+)
+def test_invalid_field_mapping(mapping):
+    with pytest.raises(ImproperlyConfigured):
+        compile_field_mapping(mapping)
@@ -0,0 +1,91 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+
+import pytest
+
+from nginx_logs.utils.log_files import (
+    ThreadedReader,
+    detect_compression,
+    expand_log_paths,
+    open_log_file,
+    zstandard,
+)
+from nginx_logs.utils.log_reading import iter_binary_lines
+
+
+COMPRESSORS = {
+    None: lambda data: data,
+    "gzip": gzip.compress,
+    "bz2": bz2.compress,
+    "xz": lzma.compress,
+}
+if zstandard is not None:
+    COMPRESSORS["zstd"] = zstandard.ZstdCompressor().compress
+
+
+@pytest.mark.parametrize("compression", COMPRESSORS)
+@pytest.mark.parametrize("binary", [False, True])
+def test_open_compressed_log_file(tmpdir, compression, binary):
+    text = "".join(f"line {i}\n" for i in range(1000)) + "last line"
+    log_file = tmpdir.join("access.log")
+    log_file.write_binary(COMPRESSORS[compression](text.encode()))
+
+    assert detect_compression(log_file.strpath) == compression
+    with open_log_file(log_file.strpath, binary) as file:
+        if binary:
+            lines = [bytes(line).decode() for line in iter_binary_lines(file, 100)]
+        else:
+            lines = list(file)
+    assert lines == text.splitlines(keepends=True)
+
+
+def test_threaded_reader_errors_and_closing():
+    class BrokenFile(io.BytesIO):
+        def read(self, size=-1):
+            if self.tell() > 0:
+                raise OSError("Broken file")
+            return super().read(size)
+
+    with ThreadedReader(BrokenFile(b"0123456789"), chunk_size=4) as reader:
+        assert reader.read(4) == b"0123"
+        with pytest.raises(OSError):
+            reader.read(4)
+
+    # Closing stops the thread even if nobody reads the chunks
+    reader = ThreadedReader(io.BytesIO(b"x" * 100), chunk_size=1, queue_size=1)
+    reader.close()
+    assert reader.closed
+
+
+def test_rotation_order(tmpdir):
+    names = [
+        "access.log",
+        "access.log.1",
+        "access.log.2.gz",
+        "access.log.10.zst",
+        "error.log-20241010.gz",
+        "error.log-20241009",
+        "error.log",
+        "other.txt",
+    ]
+    for name in names:
+        tmpdir.join(name).write("")
+
+    paths = expand_log_paths(
+        [os.path.join(tmpdir.strpath, "*.log*"), tmpdir.join("access.log").strpath]
+    )
+    assert [os.path.basename(path) for path in paths] == [
+        "access.log.10.zst",
+        "access.log.2.gz",
+        "access.log.1",
+        "access.log",
+        "error.log-20241009",
+        "error.log-20241010.gz",
+        "error.log",
+    ]
+
+    with pytest.raises(FileNotFoundError):
+        expand_log_paths([os.path.join(tmpdir.strpath, "*.gz2")])
@@ -0,0 +1,21 @@
+from benchmarks.log_generator import LogGenerator
+from nginx_logs.utils.json_log_parsing import parse_json_log_record
+
+
+def test_log_generator_is_reproducible():
+    lines = list(LogGenerator(seed=42, malformed_ratio=0.1).lines(200))
+    assert lines == list(LogGenerator(seed=42, malformed_ratio=0.1).lines(200))
+    assert lines != list(LogGenerator(seed=43, malformed_ratio=0.1).lines(200))
+    assert all(line.endswith("\n") for line in lines)
+
+
+def test_log_generator_lines_parse():
+    records = [parse_json_log_record(line) for line in LogGenerator(seed=42).lines(200)]
+    assert None not in records
+    # Timestamps go in the log order
+    assert [record.date for record in records] == sorted(
+        record.date for record in records
+    )
+
+    malformed_lines = LogGenerator(seed=42, malformed_ratio=1.0).lines(50)
+    assert all(parse_json_log_record(line) is None for line in malformed_lines)
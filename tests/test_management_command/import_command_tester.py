@@ -20,6 +20,7 @@ def import_command_tester(
     good_log: str,
     bad_records: list[tuple[int, str]],
     use_stdin: bool = False,
+    **options,
 ) -> tuple[StdoutStatType, StderrStatType]:
     """Helper function for management command testing
 
@@ -30,6 +31,7 @@ def import_command_tester(
     :param str good_log: valid log line
     :param bad_records: a list of tuples with line number and content of invalid log records
     :param bool use_stdin: whether to use a temp file for input (first parameter must be a Tmpdir) or STDIN (with Monkeypatch as a first parameter)
+    :param options: extra options of the command
     :return: a tuple with parsed STDOUT and STDERR output (see parsing functions in output_parsers.py for details)
     """
     rest_good_recs = good_records_count
@@ -51,13 +53,21 @@ def import_command_tester(
     logs_string = "\n".join(logs)
     file_path: str
     if use_stdin:
-        from io import StringIO
+        from io import BytesIO, StringIO
 
         file_path = "-"
         # Change `open` function
         tmpdir_or_monkeypatch.setattr(
             "builtins.open",
-            lambda fd, mode: StringIO(logs_string) if fd == 0 else open(fd, mode),
+            lambda fd, mode: (
+                (
+                    BytesIO(logs_string.encode())
+                    if "b" in mode
+                    else StringIO(logs_string)
+                )
+                if fd == 0
+                else open(fd, mode)
+            ),
         )
     else:
         # Make temporary file
@@ -66,7 +76,7 @@ def import_command_tester(
         file_path = log_file.strpath
 
     command = Command()
-    command.handle(filename=file_path, batch_size=batch_size)
+    command.handle(filename=file_path, batch_size=batch_size, **options)
 
     output = capsys.readouterr()
     stdout_stat = parse_stdout(output.out)
@@ -1,9 +1,18 @@
+import gzip
+import json
+import os
+import threading
+import time
+
 import pytest
+from django.core.management import CommandError, call_command
 
-from import_command_tester import import_command_tester
-from nginx_logs.models import NginxLog
+from import_command_tester import Command, import_command_tester
+from nginx_logs.models import ImportCheckpoint, NginxLog, QuarantinedLine
+from nginx_logs.utils import FileCheckpoint
 
 
+@pytest.mark.django_db
 def test_import_command_with_empty_logs(tmpdir, capsys):
     stdout_stat, stderr_stat = import_command_tester(
         tmpdir,
@@ -127,3 +136,322 @@ def test_import_command_without_extra_no_skipped(
     )
     assert stderr_stat == []
     assert NginxLog.objects.count() == 90
+
+
+@pytest.mark.django_db
+def test_import_command_projected_parser(
+    tmpdir, capsys, correct_json_log, json_log_malformed_request, json_log_no_brace
+):
+    stdout_stat, stderr_stat = import_command_tester(
+        tmpdir,
+        capsys,
+        90,
+        7,
+        correct_json_log,
+        [(11, json_log_malformed_request), (42, json_log_no_brace)],
+        parser="projected",
+    )
+    assert stdout_stat == (
+        [(i, 7) for i in range(1, 13)],  # 12 batches by 7 records
+        (6, 13),  # 6 extra records from incomplete batch #13
+        (92, 2, 90),  # total 92 lines read, 2 skipped and 90 stored
+    )
+    assert [line_number for _, line_number, _ in stderr_stat] == [11, 42]
+    assert NginxLog.objects.count() == 90
+
+
+@pytest.mark.django_db
+def test_import_command_binary(
+    tmpdir, capsys, correct_json_log, json_log_malformed_request, json_log_no_brace
+):
+    stdout_stat, stderr_stat = import_command_tester(
+        tmpdir,
+        capsys,
+        90,
+        5,
+        correct_json_log,
+        [(11, json_log_malformed_request), (42, json_log_no_brace)],
+        binary=True,
+    )
+    assert stdout_stat == (
+        [(i, 5) for i in range(1, 19)],  # 18 batches by 5 records
+        None,  # no incomplete batches
+        (92, 2, 90),  # total 92 lines read, 2 skipped and 90 stored
+    )
+    assert stderr_stat == [
+        (3, 11, json_log_malformed_request),
+        (9, 42, json_log_no_brace),
+    ]
+    assert NginxLog.objects.count() == 90
+
+
+@pytest.mark.django_db
+def test_import_command_copy_writer(
+    tmpdir, capsys, correct_json_log, json_log_no_brace
+):
+    stdout_stat, stderr_stat = import_command_tester(
+        tmpdir,
+        capsys,
+        12,
+        5,
+        correct_json_log,
+        [(3, json_log_no_brace)],
+        writer="copy",
+    )
+    assert stdout_stat == (
+        [(1, 5), (2, 5)],  # 2 batches by 5 records
+        (2, 3),  # 2 extra records from incomplete batch #3
+        (13, 1, 12),  # total 13 lines read, 1 skipped and 12 stored
+    )
+    assert [line_number for _, line_number, _ in stderr_stat] == [3]
+    assert NginxLog.objects.count() == 12
+
+
+@pytest.mark.django_db(transaction=True)
+def test_import_command_writer_threads(
+    tmpdir, capsys, correct_json_log, json_log_no_brace
+):
+    stdout_stat, stderr_stat = import_command_tester(
+        tmpdir,
+        capsys,
+        32,
+        5,
+        correct_json_log,
+        [(3, json_log_no_brace)],
+        writer_threads=1,
+    )
+    assert stdout_stat == (
+        [(i, 5) for i in range(1, 7)],  # 6 batches by 5 records in order
+        (2, 7),  # 2 extra records from incomplete batch #7
+        (33, 1, 32),  # total 33 lines read, 1 skipped and 32 stored
+    )
+    assert NginxLog.objects.count() == 32
+
+
+@pytest.mark.django_db
+def test_import_command_many_malformed_lines(tmpdir, capsys, json_log_no_brace):
+    log_file = tmpdir.join("json_log.txt")
+    log_file.write("\n".join([json_log_no_brace] * 25))
+
+    Command().handle(filename=log_file.strpath, batch_size=5)
+
+    # Only the first malformed lines of the import are printed, all of them are quarantined
+    stderr = capsys.readouterr().err
+    assert stderr.count("Skipping malformed line") == 10
+    assert (
+        "Skipping 15 more malformed lines of batch #1, they're quarantined." in stderr
+    )
+    assert list(
+        QuarantinedLine.objects.order_by("line_number").values_list(
+            "source", "line_number", "reason", "text"
+        )
+    ) == [
+        (log_file.strpath, number, "Invalid JSON", json_log_no_brace)
+        for number in range(1, 26)
+    ]
+
+
+@pytest.mark.django_db
+def test_import_command_without_quarantine(
+    tmpdir, capsys, correct_json_log, json_log_no_brace
+):
+    log_file = tmpdir.join("json_log.txt")
+    log_file.write("\n".join([json_log_no_brace, correct_json_log] * 15))
+
+    command = Command()
+    command.malformed_summary_interval = 0.0
+    command.handle(filename=log_file.strpath, batch_size=2, no_quarantine=True)
+
+    # The summary is printed for every batch with the interval of 0
+    stderr = capsys.readouterr().err
+    assert "Skipping 2 more malformed lines of batch #6, they're dropped." in stderr
+    assert "Skipping 1 more malformed lines of batch #8, they're dropped." in stderr
+    assert QuarantinedLine.objects.count() == 0
+    assert NginxLog.objects.count() == 15
+
+
+@pytest.mark.django_db
+def test_import_command_rotated_files(
+    tmpdir, capsys, correct_json_log, json_log_no_brace
+):
+    tmpdir.join("access.log").write("\n".join([correct_json_log] * 3))
+    tmpdir.join("access.log.1").write(
+        "\n".join([correct_json_log, json_log_no_brace]) + "\n"
+    )
+    tmpdir.join("access.log.2.gz").write_binary(
+        gzip.compress("\n".join([correct_json_log] * 4).encode())
+    )
+
+    Command().handle(filename=[tmpdir.join("access.log*").strpath], batch_size=2)
+
+    stdout = capsys.readouterr().out
+    # Files are imported from the oldest one, each with its own statistics
+    assert [
+        line.split(os.sep)[-1]
+        for line in stdout.splitlines()
+        if line.startswith("Importing")
+    ] == ["access.log.2.gz", "access.log.1", "access.log"]
+    assert [line for line in stdout.splitlines() if line.startswith("Total")] == [
+        "Total 4 records read, 0 skipped and 4 stored.",
+        "Total 2 records read, 1 skipped and 1 stored.",
+        "Total 3 records read, 0 skipped and 3 stored.",
+        "Total 9 records read, 1 skipped and 8 stored.",
+    ]
+    assert NginxLog.objects.count() == 8
+
+
+@pytest.mark.django_db
+def test_import_command_follow(tmpdir, capsys, correct_json_log):
+    log_file = tmpdir.join("access.log")
+    log_file.write((correct_json_log + "\n") * 7)
+    stop_event = threading.Event()
+
+    def append_and_stop():
+        # Wait until the incomplete batch is stored by idle timeout
+        while "incomplete batch #2" not in capsys.readouterr().out:
+            time.sleep(0.01)
+        log_file.write((correct_json_log + "\n") * 2, mode="a")
+        time.sleep(0.2)
+        stop_event.set()
+
+    thread = threading.Thread(target=append_and_stop)
+    thread.start()
+    stats = Command().follow_file(
+        log_file.strpath,
+        "json",
+        5,
+        poll_interval=0.01,
+        idle_timeout=0.05,
+        stop_event=stop_event,
+    )
+    thread.join()
+    assert stats["total"] == 9
+    assert stats["incomplete_batches"] == {2: 2, 3: 2}
+    assert NginxLog.objects.count() == 9
+
+
+@pytest.mark.django_db
+def test_import_command_checkpoints(tmpdir, capsys, correct_json_log):
+    log_file = tmpdir.join("access.log")
+    log_file.write((correct_json_log + "\n") * 7)
+    line_size = len(correct_json_log) + 1
+
+    # The previous import stored 5 lines and was interrupted
+    FileCheckpoint(log_file.strpath).commit(5 * line_size, 5)
+    Command().handle(filename=[log_file.strpath], batch_size=2, checkpoints=True)
+    stdout = capsys.readouterr().out
+    assert "Resuming" in stdout and "from line #6." in stdout
+    assert "Total 2 records read, 0 skipped and 2 stored." in stdout
+    assert NginxLog.objects.count() == 2
+    checkpoint = ImportCheckpoint.objects.get()
+    assert (checkpoint.offset, checkpoint.line_number) == (7 * line_size, 7)
+    assert checkpoint.completed_size == 7 * line_size
+
+    # The unchanged file is skipped
+    Command().handle(filename=[log_file.strpath], batch_size=2, checkpoints=True)
+    assert "it's already imported" in capsys.readouterr().out
+    assert NginxLog.objects.count() == 2
+
+    # Only the appended lines are imported
+    log_file.write(correct_json_log + "\n", mode="a")
+    Command().handle(filename=[log_file.strpath], batch_size=2, checkpoints=True)
+    assert "Total 1 records read" in capsys.readouterr().out
+    assert NginxLog.objects.count() == 3
+
+    # The file is rewritten in place, so it's imported again
+    log_file.write(("\n" + correct_json_log) * 2)
+    Command().handle(filename=[log_file.strpath], batch_size=2, checkpoints=True)
+    assert "Total 3 records read, 1 skipped and 2 stored." in capsys.readouterr().out
+    assert NginxLog.objects.count() == 5
+
+    # Without checkpoints the file is imported again
+    Command().handle(filename=[log_file.strpath], batch_size=2)
+    assert NginxLog.objects.count() == 7
+
+
+@pytest.mark.django_db
+def test_import_command_checkpoint_commits_with_batches(
+    tmpdir, capsys, correct_json_log, monkeypatch
+):
+    log_file = tmpdir.join("access.log")
+    log_file.write((correct_json_log + "\n") * 5)
+    commits = []
+    original_commit = FileCheckpoint.commit
+
+    def commit(self, offset, line_number):
+        commits.append((line_number, NginxLog.objects.count()))
+        original_commit(self, offset, line_number)
+
+    monkeypatch.setattr(FileCheckpoint, "commit", commit)
+    Command().handle(filename=[log_file.strpath], batch_size=2, checkpoints=True)
+    # Every position is saved with the records of the lines before it
+    assert commits == [(2, 2), (4, 4), (5, 5)]
+
+
+@pytest.mark.django_db
+def test_import_command_fingerprints(tmpdir, capsys, correct_json_log):
+    log_file = tmpdir.join("access.log")
+    log_file.write((correct_json_log + "\n") * 3)
+
+    Command().handle(filename=[log_file.strpath], batch_size=2, fingerprint="record")
+    stdout = capsys.readouterr().out
+    assert "Total 3 records read, 0 skipped and 1 stored." in stdout
+    assert "2 duplicate records dropped." in stdout
+
+    # Overlapping logs don't double the records
+    Command().handle(
+        filename=[log_file.strpath],
+        batch_size=2,
+        fingerprint="record",
+    )
+    assert "0 skipped and 0 stored." in capsys.readouterr().out
+    assert NginxLog.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_import_command_auto_batch_size(tmpdir, capsys, settings, correct_json_log):
+    settings.LOG_BATCH_SIZE = 2
+    settings.LOG_BATCH_SIZE_MIN = 2
+    settings.LOG_BATCH_SIZE_MAX = 4
+    # Any batch is stored fast enough to grow the size to the maximum
+    settings.LOG_BATCH_TARGET_LATENCY = 60.0
+    log_file = tmpdir.join("access.log")
+    log_file.write((correct_json_log + "\n") * 11)
+
+    call_command("import", log_file.strpath, "--batch-size", "auto")
+    stdout = capsys.readouterr().out
+    assert "Batch #1: Stored 2 records, the next batch size is 4." in stdout
+    assert "Batch #3: Stored 4 records." in stdout
+    assert "Stored extra 1 records from incomplete batch #4." in stdout
+    assert NginxLog.objects.count() == 11
+
+    with pytest.raises(CommandError):
+        call_command("import", log_file.strpath, "--batch-size", "0")
+
+
+@pytest.mark.django_db
+def test_import_command_stats_json(tmpdir, capsys, correct_json_log):
+    log_file = tmpdir.join("access.log")
+    log_file.write((correct_json_log + "\n") * 5)
+    stats_file = tmpdir.join("stats.json")
+
+    call_command(
+        "import",
+        log_file.strpath,
+        "--batch-size",
+        "2",
+        "--stats-json",
+        stats_file.strpath,
+        # Every batch prints the progress
+        "--progress",
+        "1e-9",
+    )
+    stdout = capsys.readouterr().out
+    assert stdout.count("Progress: ") == 3
+    assert "Progress: 4 lines read, 0 skipped" in stdout
+
+    (stats,) = json.loads(stats_file.read())["files"]
+    assert stats["path"] == log_file.strpath
+    assert (stats["total"], stats["stored"]) == (5, 5)
+    assert set(stats["timings"]["stages"]) == {"read", "parse", "build", "store"}
+    assert stats["timings"]["flush_latency"]["count"] == 3
@@ -128,3 +128,33 @@ def test_import_command_without_extra_no_skipped(
     )
     assert stderr_stat == []
     assert NginxLog.objects.count() == 90
+
+
+@pytest.mark.django_db
+def test_import_command_binary(
+    monkeypatch,
+    capsys,
+    correct_json_log,
+    json_log_malformed_request,
+    json_log_no_brace,
+):
+    stdout_stat, stderr_stat = import_command_tester(
+        monkeypatch,
+        capsys,
+        90,
+        7,
+        correct_json_log,
+        [(11, json_log_malformed_request), (42, json_log_no_brace)],
+        True,
+        binary=True,
+    )
+    assert stdout_stat == (
+        [(i, 7) for i in range(1, 13)],  # 12 batches by 7 records
+        (6, 13),  # 6 extra records from incomplete batch #13
+        (92, 2, 90),  # total 92 lines read, 2 skipped and 90 stored
+    )
+    assert stderr_stat == [
+        (2, 11, json_log_malformed_request),
+        (6, 42, json_log_no_brace),
+    ]
+    assert NginxLog.objects.count() == 90
@@ -0,0 +1,106 @@
+import argparse
+import socket
+import threading
+import time
+
+import pytest
+
+from app.utils import BatchModelWriter
+from app.utils.batch_model_writer import SomeModel
+from nginx_logs.management.commands.listen_syslog import Command, bind_address_argument
+from nginx_logs.models import NginxLog
+from nginx_logs.utils import (
+    SyslogBatchStorer,
+    parse_json_log_record,
+    strip_syslog_header,
+)
+
+
+def test_strip_syslog_header(correct_json_log):
+    message = correct_json_log.encode()
+    assert (
+        strip_syslog_header(b"<190>Oct 18 09:00:00 edge-1 nginx: " + message) == message
+    )
+    assert strip_syslog_header(message) == message
+    assert strip_syslog_header(b"<190>no message") == b"<190>no message"
+
+
+def test_bind_address_argument():
+    assert bind_address_argument("0.0.0.0:5140") == ("0.0.0.0", 5140)
+    assert bind_address_argument("[::1]:514") == ("::1", 514)
+    with pytest.raises(argparse.ArgumentTypeError):
+        bind_address_argument("5140")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_listen_syslog_command(capsys, correct_json_log, json_log_no_brace):
+    command = Command()
+    stop_event = threading.Event()
+    ready_event = threading.Event()
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(
+            command.listen(
+                "127.0.0.1",
+                0,
+                3,
+                flush_interval=0.1,
+                stats_interval=0.1,
+                stop_event=stop_event,
+                ready_event=ready_event,
+            )
+        )
+    )
+    thread.start()
+    try:
+        assert ready_event.wait(5)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as client:
+            for message in [correct_json_log] * 4 + [json_log_no_brace]:
+                client.sendto(
+                    f"<190>Oct 18 09:00:00 edge-1 nginx: {message}".encode(),
+                    command.address,
+                )
+        # The incomplete batch is stored by the flush interval, it's seen in the periodic statistics.
+        # DB isn't polled, as SQLite would fail the concurrent writes
+        stdout = ""
+        deadline = time.monotonic() + 5
+        while "Stored 4 records" not in stdout and time.monotonic() < deadline:
+            time.sleep(0.01)
+            stdout += capsys.readouterr().out
+    finally:
+        stop_event.set()
+        thread.join()
+
+    assert results == [
+        {"packets": 5, "malformed": 1, "stored": 4, "dropped": 0, "failed": 0}
+    ]
+    assert NginxLog.objects.count() == 4
+    stdout += capsys.readouterr().out
+    assert "packets/s" in stdout
+    assert "Stored 4 records, dropped 0, failed to store 0." in stdout
+
+
+class BlockedWriter(BatchModelWriter[SomeModel]):
+    """Doesn't store anything until it's released."""
+
+    entered = threading.Event()
+    released = threading.Event()
+
+    def _write_batch(self, records):
+        self.entered.set()
+        self.released.wait(5)
+        return 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_syslog_batch_storer_drops_batches(correct_json_log):
+    storer = SyslogBatchStorer(2, queue_size=1, writer_class=BlockedWriter)
+    record = parse_json_log_record(correct_json_log)
+    assert storer.submit([record, record])
+    assert BlockedWriter.entered.wait(5)
+    # One batch waits in the queue and the next one is dropped
+    assert storer.submit([record, record])
+    assert not storer.submit([record, record])
+    BlockedWriter.released.set()
+    storer.close()
+    assert storer.stats == {"stored": 4, "dropped": 2, "failed": 0}
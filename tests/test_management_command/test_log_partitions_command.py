@@ -0,0 +1,12 @@
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    connection.vendor == "postgresql", reason="Checks the error of other databases"
+)
+def test_log_partitions_command_needs_postgresql():
+    with pytest.raises(CommandError, match="PostgreSQL"):
+        call_command("log_partitions", interval="day")
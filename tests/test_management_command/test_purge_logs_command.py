@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from nginx_logs.management.commands.purge_logs import Command
+from nginx_logs.models import NginxLog
+
+
+@pytest.mark.django_db
+def test_purge_logs_command(capsys, saved_nginx_log_factory):
+    now = timezone.now()
+    for days in (1, 89, 91, 120, 365):
+        saved_nginx_log_factory(date=now - timedelta(days=days))
+
+    Command().handle(older_than="90d", dry_run=True)
+    assert "3 records are older than" in capsys.readouterr().out
+    assert NginxLog.objects.count() == 5
+
+    Command().handle(older_than="90d", chunk_size=2)
+    output = capsys.readouterr().out
+    assert "Chunk #2: Deleted 1 records, 3 in total" in output
+    assert "0 partitions dropped, 3 records deleted" in output
+    assert NginxLog.objects.count() == 2
+
+
+def test_purge_logs_command_errors():
+    with pytest.raises(CommandError, match="Invalid age"):
+        call_command("purge_logs", older_than="ninety days")
+    with pytest.raises(CommandError, match="positive"):
+        call_command("purge_logs", older_than="90d", chunk_size=-1)
@@ -0,0 +1,31 @@
+import pytest
+
+from nginx_logs.management.commands.reprocess_quarantine import Command
+from nginx_logs.models import NginxLog, QuarantinedLine
+
+
+@pytest.mark.django_db
+def test_reprocess_quarantine_command(capsys, correct_json_log, json_log_no_brace):
+    for line_number in range(1, 6):
+        QuarantinedLine.objects.create(
+            source="/var/log/nginx/access.log",
+            line_number=line_number,
+            batch_number=1,
+            reason="Rejected by the parser",
+            text=json_log_no_brace if line_number == 3 else correct_json_log,
+        )
+    QuarantinedLine.objects.create(
+        source="-", reason="Rejected by the parser", text=correct_json_log
+    )
+
+    Command().handle(source="/var/log/nginx/access.log", batch_size=2)
+
+    output = capsys.readouterr().out
+    assert "Batch #3: Stored 1 records." in output
+    assert "Reprocessed 5 quarantined lines: 4 stored, 1 still malformed." in output
+    assert NginxLog.objects.count() == 4
+    # The malformed line and the lines of other sources stay in quarantine
+    assert sorted(QuarantinedLine.objects.values_list("source", "line_number")) == [
+        ("-", None),
+        ("/var/log/nginx/access.log", 3),
+    ]
@@ -1,6 +1,12 @@
+from datetime import datetime, timezone
+
 import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
 
-from nginx_logs.models import NginxLog
+from nginx_logs.fields import HTTP_METHODS
+from nginx_logs.models import NginxLog, Uri
+from nginx_logs.utils import uri_id
 
 
 @pytest.mark.django_db
@@ -10,3 +16,50 @@ def test_string_representation(nginx_log):
         == f"{nginx_log.date} {nginx_log.ip} -> {nginx_log.method} {nginx_log.uri} ({nginx_log.status}) - {nginx_log.bytes_sent} bytes"
     )
     assert NginxLog.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_http_method_is_stored_as_code(nginx_log):
+    nginx_log.method = "PATCH"
+    nginx_log.save()
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT method FROM {NginxLog._meta.db_table}")
+        assert cursor.fetchone() == (HTTP_METHODS.index("PATCH"),)
+    assert NginxLog.objects.get(method="PATCH").method == "PATCH"
+    assert not NginxLog.objects.filter(method="GET").exists()
+
+    # A method which isn't in the list is stored as "-"
+    nginx_log.method = "BREW"
+    nginx_log.save()
+    nginx_log.refresh_from_db()
+    assert nginx_log.method == "-"
+    assert NginxLog.objects.filter(method="BREW").get() == nginx_log
+
+
+@pytest.mark.django_db(transaction=True)
+def test_uri_migration():
+    executor = MigrationExecutor(connection)
+    executor.migrate([("nginx_logs", "0005_nginxlog_optional_fields")])
+    apps = executor.loader.project_state(
+        ("nginx_logs", "0005_nginxlog_optional_fields")
+    ).apps
+    OldNginxLog = apps.get_model("nginx_logs", "NginxLog")
+    OldNginxLog.objects.bulk_create(
+        OldNginxLog(
+            ip="10.0.0.1",
+            date=datetime(2024, 9, 1, tzinfo=timezone.utc),
+            method="GET",
+            uri=f"/{i % 3}",
+            status=200,
+            bytes_sent=1,
+        )
+        for i in range(7)
+    )
+
+    executor = MigrationExecutor(connection)
+    executor.migrate(executor.loader.graph.leaf_nodes())
+    assert Uri.objects.count() == 3
+    assert list(
+        NginxLog.objects.order_by("pk").values_list("uri_id", "uri__value")
+    ) == [(uri_id(f"/{i % 3}"), f"/{i % 3}") for i in range(7)]
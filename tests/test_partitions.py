@@ -0,0 +1,130 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from nginx_logs.models import NginxLog
+from nginx_logs.utils.partitions import (
+    LogPartitions,
+    next_period_start,
+    partition_name,
+    period_start,
+)
+
+
+@pytest.fixture
+def restored_table():
+    """Create the unpartitioned table again after a test committing the conversion."""
+    yield
+    with connection.schema_editor() as schema_editor:
+        schema_editor.execute(
+            f"DROP TABLE {schema_editor.quote_name(NginxLog._meta.db_table)}"
+        )
+        schema_editor.create_model(NginxLog)
+
+
+def test_partition_periods():
+    moment = datetime(2024, 12, 31, 23, 30, tzinfo=timezone(timedelta(hours=-3)))
+    # Periods are in UTC
+    assert period_start(moment, "day") == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert period_start(date(2024, 2, 29), "month") == datetime(
+        2024, 2, 1, tzinfo=timezone.utc
+    )
+    start = period_start(moment, "month")
+    assert next_period_start(start, "month") == datetime(
+        2025, 2, 1, tzinfo=timezone.utc
+    )
+    assert next_period_start(
+        datetime(2024, 1, 31, tzinfo=timezone.utc), "day"
+    ) == datetime(2024, 2, 1, tzinfo=timezone.utc)
+    assert partition_name(start, "month") == "nginx_logs_nginxlog_p2025_01"
+    assert partition_name(start, "day") == "nginx_logs_nginxlog_p2025_01_01"
+
+
+def test_partitioning_needs_postgresql():
+    with pytest.raises(ValueError, match="interval"):
+        LogPartitions("week")
+    if connection.vendor != "postgresql":
+        with pytest.raises(ValueError, match="PostgreSQL"):
+            LogPartitions("month")
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Partitioning needs PostgreSQL"
+)
+def test_log_partitions(saved_nginx_log_factory):
+    september = datetime(2024, 9, 10, tzinfo=timezone.utc)
+    saved_nginx_log_factory(date=september)
+    partitions = LogPartitions("month")
+    assert not partitions.is_partitioned()
+
+    assert partitions.convert() == 1
+    assert partitions.is_partitioned()
+    assert [partition.name for partition in partitions.partitions()] == [
+        "nginx_logs_nginxlog_p2024_09",
+        "nginx_logs_nginxlog_default",
+    ]
+
+    # Records without a partition are kept by the default one until it's attached
+    saved_nginx_log_factory(date=september.replace(month=7))
+    saved_nginx_log_factory(date=september.replace(month=7, day=20))
+    assert partitions.attach_missing() == [("nginx_logs_nginxlog_p2024_07", 2)]
+    assert partitions.ensure_partitions(september, 2) == [
+        "nginx_logs_nginxlog_p2024_10"
+    ]
+    assert NginxLog.objects.filter(date__lt=september).count() == 2
+    assert NginxLog.objects.count() == 3
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Partitioning needs PostgreSQL"
+)
+def test_drop_partitions_before(saved_nginx_log_factory, restored_table):
+    for month in (7, 8, 9):
+        saved_nginx_log_factory(date=datetime(2024, month, 10, tzinfo=timezone.utc))
+    partitions = LogPartitions("month")
+    partitions.convert()
+
+    dropped, locked = partitions.drop_before(datetime(2024, 8, 20, tzinfo=timezone.utc))
+    # The partition containing the cutoff is kept, its old records are deleted by chunks
+    assert [partition.name for partition in dropped] == ["nginx_logs_nginxlog_p2024_07"]
+    assert locked == []
+    assert NginxLog.objects.count() == 2
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="Partitioning needs PostgreSQL"
+)
+def test_migrations_of_partitioned_table(saved_nginx_log_factory, restored_table):
+    saved_nginx_log_factory(date=datetime(2024, 9, 10, tzinfo=timezone.utc))
+    LogPartitions("month").convert()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT attidentity FROM pg_attribute "
+            "WHERE attrelid = %s::regclass AND attname = 'id'",
+            [NginxLog._meta.db_table],
+        )
+        assert cursor.fetchone() == ("d",)
+        constraints = connection.introspection.get_constraints(
+            cursor, NginxLog._meta.db_table
+        )
+    assert {index.name for index in NginxLog._meta.indexes} <= constraints.keys()
+    assert [
+        constraint["foreign_key"]
+        for constraint in constraints.values()
+        if constraint["foreign_key"]
+    ] == [("nginx_logs_uri", "id")]
+
+    # The migrations of the indexes and the fields are applied to the partitioned table
+    call_command("migrate", "nginx_logs", "0009", verbosity=0)
+    # The table is converted only if it matches the model
+    with pytest.raises(ValueError, match="migrations"):
+        LogPartitions("month").convert()
+    call_command("migrate", "nginx_logs", verbosity=0)
+    record = saved_nginx_log_factory(date=datetime(2024, 9, 11, tzinfo=timezone.utc))
+    assert NginxLog.objects.filter(pk__lt=record.pk).count() == 1
@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from nginx_logs.models import NginxLog, Uri
+from nginx_logs.utils import delete_records_before, parse_age
+
+
+def test_parse_age():
+    assert parse_age("90d") == timedelta(days=90)
+    assert parse_age("12h") == timedelta(hours=12)
+    assert parse_age("2w") == timedelta(weeks=2)
+    for value in ("", "90", "d", "-1d", "1.5d", "90 days"):
+        with pytest.raises(ValueError, match="Invalid age"):
+            parse_age(value)
+
+
+@pytest.mark.django_db
+def test_delete_records_before(saved_nginx_log_factory):
+    cutoff = datetime(2024, 9, 1, tzinfo=timezone.utc)
+    for day in range(7):
+        saved_nginx_log_factory(date=cutoff + timedelta(days=day - 5))
+    uris = Uri.objects.count()
+
+    assert list(delete_records_before(cutoff, chunk_size=2)) == [2, 2, 1]
+    assert sorted(NginxLog.objects.values_list("date", flat=True)) == [
+        cutoff,
+        cutoff + timedelta(days=1),
+    ]
+    # The URIs may be referred to by importers, so they are kept
+    assert Uri.objects.count() == uris
@@ -0,0 +1,140 @@
+import pytest
+
+from nginx_logs.models import NginxLog, QuarantinedLine
+from nginx_logs.utils.checkpoints import FileCheckpoint
+from nginx_logs.utils.json_log_parsing import parse_json_log_record
+from nginx_logs.utils.sharded_import import (
+    import_file_sharded,
+    make_shards,
+    merge_shard_stats,
+    split_file,
+)
+
+
+@pytest.fixture
+def log_lines(correct_json_log, json_log_malformed_request, json_log_no_brace):
+    lines = [correct_json_log] * 50
+    lines[10] = json_log_malformed_request
+    lines[41] = json_log_no_brace
+    return lines
+
+
+@pytest.mark.parametrize("parts", [1, 2, 3, 7, 100])
+def test_file_splitting(tmpdir, log_lines, parts):
+    log_file = tmpdir.join("log.txt")
+    log_file.write("\n".join(log_lines))
+    content = log_file.read()
+
+    ranges = split_file(log_file.strpath, parts)
+    assert 1 <= len(ranges) <= parts
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == len(content)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        # Ranges are aligned on line boundaries
+        assert content[start - 1] == "\n"
+
+    shards = make_shards(log_file.strpath, parts)
+    first_lines = [content[: shard.start].count("\n") + 1 for shard in shards]
+    assert [shard.first_line_number for shard in shards] == first_lines
+
+
+@pytest.mark.django_db
+def test_sharded_import(tmpdir, log_lines):
+    log_file = tmpdir.join("log.txt")
+    log_file.write("\n".join(log_lines))
+
+    results = list(
+        import_file_sharded(
+            log_file.strpath, 3, parse_json_log_record, 7, map, quarantine="log.txt"
+        )
+    )
+    assert len(results) == 3
+    # Line numbers are global
+    assert [
+        line_number
+        for result in results
+        for *_, malformed_lines in result.parsed_batches
+        for line_number, _ in malformed_lines
+    ] == [11, 42]
+
+    stats = merge_shard_stats(results)
+    assert stats["total"] == 50
+    assert stats["skipped"] == 2
+    assert stats["stored"] == 48
+    assert stats["quarantined"] == 2
+    assert NginxLog.objects.count() == 48
+    assert sorted(QuarantinedLine.objects.values_list("line_number", flat=True)) == [
+        11,
+        42,
+    ]
+    # Batch numbers of incomplete batches are global
+    batches = 0
+    expected_incomplete = {}
+    for result in results:
+        for batch_number, records_count in result.stats["incomplete_batches"].items():
+            expected_incomplete[batches + batch_number] = records_count
+        batches += result.batches
+    assert stats["incomplete_batches"] == expected_incomplete
+
+
+@pytest.mark.django_db
+def test_sharded_import_resumes_shards(tmpdir, correct_json_log):
+    log_file = tmpdir.join("log.txt")
+    log_file.write((correct_json_log + "\n") * 30)
+    checkpoint = FileCheckpoint(log_file.strpath)
+    shards = make_shards(log_file.strpath, 3)
+    checkpoint.save_shards(shards)
+    parsed_lines = 0
+
+    def interrupted_parser(line):
+        nonlocal parsed_lines
+        parsed_lines += 1
+        if parsed_lines > shards[1].first_line_number + 4:
+            raise RuntimeError("Interrupted")
+        return parse_json_log_record(line)
+
+    with pytest.raises(RuntimeError):
+        list(
+            import_file_sharded(
+                log_file.strpath,
+                3,
+                interrupted_parser,
+                4,
+                map,
+                shards=checkpoint.shards,
+                on_shard_commit=checkpoint.shard_committer(),
+            )
+        )
+    # The first shard and the first batch of the second one are stored
+    stored = shards[1].first_line_number - 1 + 4
+    assert NginxLog.objects.count() == stored
+
+    checkpoint = FileCheckpoint(log_file.strpath)
+    assert not checkpoint.is_complete
+    assert [
+        (shard.number, shard.first_line_number, shard.end)
+        for shard in checkpoint.shards
+    ] == [
+        (2, stored + 1, shards[1].end),
+        (3, shards[2].first_line_number, 30 * (len(correct_json_log) + 1)),
+    ]
+    results = list(
+        import_file_sharded(
+            log_file.strpath,
+            3,
+            parse_json_log_record,
+            4,
+            map,
+            shards=checkpoint.shards,
+            on_shard_commit=checkpoint.shard_committer(),
+        )
+    )
+    checkpoint.complete_shards()
+    assert merge_shard_stats(results)["total"] == 30 - stored
+    assert NginxLog.objects.count() == 30
+
+    checkpoint = FileCheckpoint(log_file.strpath)
+    assert checkpoint.is_complete
+    assert checkpoint.line_number == 30
+    assert not checkpoint.shards